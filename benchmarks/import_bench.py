@@ -0,0 +1,117 @@
+"""插件加载耗时与内存基准
+
+在独立子进程中以 `python -X importtime` 导入插件主模块，统计导入耗时、
+导入前后的 RSS 增量，以及是否提前导入了本应延迟加载的重量级依赖，
+并与 import_budget.json 中的预算比较，超出预算时以非零状态码退出。
+
+需要在安装了 AstrBot 的环境中运行：
+
+    python benchmarks/import_bench.py [--repeat 5] [--json]
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+PLUGIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUDGET_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "import_budget.json")
+
+CHILD_CODE = r"""
+import sys, time, json
+
+def rss_kb():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    return 0
+
+sys.path.insert(0, {parent!r})
+# 先导入宿主框架，只统计插件自身带来的开销
+import astrbot.api.all
+rss_before = rss_kb()
+started = time.perf_counter()
+__import__({module!r})
+elapsed_ms = (time.perf_counter() - started) * 1000
+print(json.dumps({{
+    "import_ms": elapsed_ms,
+    "rss_delta_kb": rss_kb() - rss_before,
+    "loaded": sorted(name for name in {watched!r} if name in sys.modules),
+}}))
+"""
+
+
+def parse_importtime(stderr: str, limit: int = 10):
+    """解析 -X importtime 输出，返回自身耗时最高的模块"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|")
+            rows.append((int(self_us), int(cumulative_us), name.strip()))
+        except ValueError:
+            continue
+    rows.sort(reverse=True)
+    return rows[:limit]
+
+
+def run_once(budget: dict):
+    parent, package = os.path.split(PLUGIN_DIR)
+    code = CHILD_CODE.format(parent=parent, module=f"{package}.main", watched=budget["lazy_modules"])
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True, text=True, cwd=parent,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr else "导入失败")
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    result["slowest"] = parse_importtime(proc.stderr)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="插件加载耗时与内存基准")
+    parser.add_argument("--repeat", type=int, default=5, help="重复次数，取中位数")
+    parser.add_argument("--json", action="store_true", help="以JSON输出结果")
+    args = parser.parse_args()
+
+    with open(BUDGET_FILE, "r", encoding="utf-8") as f:
+        budget = json.load(f)
+
+    runs = [run_once(budget) for _ in range(max(1, args.repeat))]
+    summary = {
+        "import_ms": statistics.median(r["import_ms"] for r in runs),
+        "rss_delta_mb": statistics.median(r["rss_delta_kb"] for r in runs) / 1024,
+        "eager_heavy_modules": sorted({name for r in runs for name in r["loaded"]}),
+    }
+
+    violations = []
+    if summary["import_ms"] > budget["max_import_ms"]:
+        violations.append(f"导入耗时 {summary['import_ms']:.1f}ms 超出预算 {budget['max_import_ms']}ms")
+    if summary["rss_delta_mb"] > budget["max_rss_delta_mb"]:
+        violations.append(f"RSS 增量 {summary['rss_delta_mb']:.1f}MB 超出预算 {budget['max_rss_delta_mb']}MB")
+    if summary["eager_heavy_modules"]:
+        violations.append(f"以下模块应延迟加载却在导入时被加载: {', '.join(summary['eager_heavy_modules'])}")
+    summary["violations"] = violations
+
+    if args.json:
+        print(json.dumps(summary, ensure_ascii=False, indent=2))
+    else:
+        print(f"导入耗时(中位数): {summary['import_ms']:.1f} ms")
+        print(f"RSS 增量(中位数): {summary['rss_delta_mb']:.1f} MB")
+        print("自身耗时最高的模块:")
+        for self_us, cumulative_us, name in runs[-1]["slowest"]:
+            print(f"  {self_us / 1000:8.2f} ms  (累计 {cumulative_us / 1000:8.2f} ms)  {name}")
+        for violation in violations:
+            print(f"❌ {violation}")
+        if not violations:
+            print("✅ 在预算之内")
+
+    sys.exit(1 if violations else 0)
+
+
+if __name__ == "__main__":
+    main()
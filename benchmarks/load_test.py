@@ -0,0 +1,339 @@
+"""端到端压测
+
+在进程内加载插件，用模拟的消息事件以 N 个并发会话驱动各指令处理器
+（top5战队、近期比赛、比赛结果 + 比赛详情、搜索选手 + 选手数据、战队信息），
+HLTV 请求全部发往本地模拟服务器（mock_hltv.py）。结束后输出吞吐量、
+各指令的尾延迟、峰值 RSS（含浏览器子进程）和浏览器进程数，用于评估部署规格
+以及验证扩展性相关的改动。
+
+需要在安装了 AstrBot、playwright 和 aiohttp 的环境中运行，并先录制好页面：
+
+    python benchmarks/mock_hltv.py record
+    python benchmarks/load_test.py --sessions 20 --duration 120 --latency 0.3
+
+不指定 --base-url 时会自动在子进程中启动模拟服务器。
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import importlib
+import subprocess
+from types import SimpleNamespace
+
+PLUGIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MOCK_SERVER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mock_hltv.py")
+
+# 场景 -> [(指标名, 处理器名, 消息文本, 关键字参数)]，同一场景内的步骤按顺序执行
+SCENARIOS = {
+    "top_teams": [("top5战队", "query_top_teams", "/top5战队", {})],
+    "matches": [("近期比赛", "query_matches", "/近期比赛", {})],
+    "results": [
+        ("比赛结果", "query_results", "/比赛结果", {}),
+        ("翻页", "turn_page", "下一页", {}),
+        # 模拟服务器对任意比赛ID都返回同一个录制的比赛页
+        ("比赛详情", "handle_match_details", "比赛 2370000", {}),
+    ],
+    "player": [
+        ("搜索选手", "search_player_by_name", "/搜索选手 s1mple", {}),
+        ("选手数据", "handle_player_stats", "选手 1", {}),
+    ],
+    "team": [("战队信息", "query_team_info", "/战队信息 Vitality", {"team_name": "Vitality"})],
+}
+
+
+class FakeEvent:
+    """只实现插件用到的 AstrMessageEvent 接口"""
+
+    def __init__(self, session_id: str, text: str):
+        self.session_id = session_id
+        self.message_str = text
+        self.message_obj = SimpleNamespace(message_str=text)
+        self.unified_msg_origin = f"loadtest:FriendMessage:{session_id}"
+
+    def get_session_id(self):
+        return self.session_id
+
+    def get_messages(self):
+        return [SimpleNamespace(text=self.message_str)]
+
+    def plain_result(self, text):
+        return ("plain", text)
+
+    def chain_result(self, chain):
+        return ("chain", chain)
+
+
+class FakeContext:
+    """插件主动推送（订阅通知等）的消息直接丢弃"""
+
+    def __init__(self):
+        self.sent = 0
+
+    async def send_message(self, umo, chain):
+        self.sent += 1
+        return True
+
+
+def reply_failed(result) -> bool:
+    kind, payload = result
+    text = payload if kind == "plain" else "".join(getattr(c, "text", "") for c in payload)
+    return str(text).lstrip().startswith("❌")
+
+
+# ---------- 进程采样 ----------
+
+def _children_map():
+    children = {}
+    for name in os.listdir("/proc"):
+        if not name.isdigit():
+            continue
+        try:
+            with open(f"/proc/{name}/stat", "r") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(name))
+    return children
+
+
+def _rss_kb(pid: int) -> int:
+    try:
+        with open(f"/proc/{pid}/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def _is_browser(pid: int) -> bool:
+    """Chromium 主进程（渲染、GPU 等子进程的命令行带 --type=）"""
+    try:
+        with open(f"/proc/{pid}/cmdline", "rb") as f:
+            cmdline = f.read().replace(b"\0", b" ")
+    except OSError:
+        return False
+    return b"chrom" in cmdline.lower() and b"--type=" not in cmdline
+
+
+def sample_process_tree(root: int):
+    """返回 (本进程RSS, 含子进程的总RSS, 浏览器进程数)，单位 KB"""
+    children = _children_map()
+    total = own = _rss_kb(root)
+    browsers = 0
+    stack = list(children.get(root, []))
+    while stack:
+        pid = stack.pop()
+        total += _rss_kb(pid)
+        browsers += _is_browser(pid)
+        stack.extend(children.get(pid, []))
+    return own, total, browsers
+
+
+class Sampler:
+    def __init__(self, interval: float = 0.5):
+        self.interval = interval
+        self.peak_own_kb = 0
+        self.peak_total_kb = 0
+        self.peak_browsers = 0
+
+    async def run(self):
+        pid = os.getpid()
+        while True:
+            own, total, browsers = sample_process_tree(pid)
+            self.peak_own_kb = max(self.peak_own_kb, own)
+            self.peak_total_kb = max(self.peak_total_kb, total)
+            self.peak_browsers = max(self.peak_browsers, browsers)
+            await asyncio.sleep(self.interval)
+
+
+# ---------- 压测 ----------
+
+def load_plugin_class():
+    parent, package = os.path.split(PLUGIN_DIR)
+    sys.path.insert(0, parent)
+    return importlib.import_module(f"{package}.main").HLTVQuery
+
+
+async def run_command(plugin, session_id, label, handler, text, kwargs, samples):
+    event = FakeEvent(session_id, text)
+    started = time.perf_counter()
+    first_reply = None
+    failed = False
+    try:
+        async for result in getattr(plugin, handler)(event, **kwargs):
+            if first_reply is None:
+                first_reply = time.perf_counter() - started
+            failed = failed or reply_failed(result)
+    except Exception:
+        failed = True
+    elapsed = time.perf_counter() - started
+    samples.append((label, elapsed, first_reply if first_reply is not None else elapsed, failed))
+
+
+async def session_loop(plugin, index, deadline, rng, samples):
+    session_id = f"loadtest_{index}"
+    names = sorted(SCENARIOS)
+    while time.monotonic() < deadline:
+        for label, handler, text, kwargs in SCENARIOS[rng.choice(names)]:
+            await run_command(plugin, session_id, label, handler, text, kwargs, samples)
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(q * (len(ordered) - 1)))))]
+
+
+def build_report(samples, duration, sampler, plugin, mock_stats):
+    by_label = {}
+    for label, elapsed, first, failed in samples:
+        by_label.setdefault(label, []).append((elapsed, first, failed))
+    commands = {}
+    for label, rows in sorted(by_label.items()):
+        latencies = [r[0] for r in rows]
+        commands[label] = {
+            "count": len(rows),
+            "errors": sum(r[2] for r in rows),
+            "p50": percentile(latencies, 0.5),
+            "p95": percentile(latencies, 0.95),
+            "p99": percentile(latencies, 0.99),
+            "max": max(latencies),
+            "first_reply_p95": percentile([r[1] for r in rows], 0.95),
+        }
+    all_latencies = [s[1] for s in samples]
+    return {
+        "duration_s": duration,
+        "commands_total": len(samples),
+        "errors_total": sum(s[3] for s in samples),
+        "throughput_per_s": len(samples) / duration if duration else 0.0,
+        "p50": percentile(all_latencies, 0.5) if samples else 0.0,
+        "p99": percentile(all_latencies, 0.99) if samples else 0.0,
+        "commands": commands,
+        "peak_rss_mb": sampler.peak_own_kb / 1024,
+        "peak_rss_with_browsers_mb": sampler.peak_total_kb / 1024,
+        "peak_browser_processes": sampler.peak_browsers,
+        "browser_launches": plugin.browser_manager.launches,
+        "mock_server": mock_stats,
+    }
+
+
+def print_report(report):
+    print(f"持续时间: {report['duration_s']:.1f} 秒，指令数: {report['commands_total']}，失败: {report['errors_total']}")
+    print(f"吞吐量: {report['throughput_per_s']:.2f} 指令/秒，总体 p50 / p99: {report['p50']:.2f} / {report['p99']:.2f} 秒")
+    print("各指令 (次数 | 失败 | p50 / p95 / p99 / max 秒 | 首条回复 p95):")
+    for label, row in report["commands"].items():
+        print(f"  {label}: {row['count']} | {row['errors']} | "
+              f"{row['p50']:.2f} / {row['p95']:.2f} / {row['p99']:.2f} / {row['max']:.2f} | {row['first_reply_p95']:.2f}")
+    print(f"峰值 RSS: {report['peak_rss_mb']:.1f} MB（含浏览器 {report['peak_rss_with_browsers_mb']:.1f} MB）")
+    print(f"浏览器进程峰值: {report['peak_browser_processes']}，浏览器启动次数: {report['browser_launches']}")
+    if report["mock_server"]:
+        print(f"模拟服务器: {report['mock_server']}")
+
+
+async def fetch_mock_stats(base_url):
+    try:
+        from aiohttp import ClientSession
+        async with ClientSession() as session:
+            async with session.get(f"{base_url}/_mock/stats") as response:
+                return await response.json()
+    except Exception:
+        return None
+
+
+async def wait_for_server(base_url, timeout=15):
+    from aiohttp import ClientSession
+    deadline = time.monotonic() + timeout
+    async with ClientSession() as session:
+        while time.monotonic() < deadline:
+            try:
+                async with session.get(f"{base_url}/_mock/stats"):
+                    return
+            except OSError:
+                await asyncio.sleep(0.2)
+    raise RuntimeError(f"模拟服务器 {base_url} 未能启动")
+
+
+async def main_async(args):
+    mock = None
+    base_url = args.base_url
+    if not base_url:
+        base_url = f"http://127.0.0.1:{args.port}"
+        mock = subprocess.Popen([
+            sys.executable, MOCK_SERVER, "serve", "--port", str(args.port),
+            "--latency", str(args.latency), "--jitter", str(args.jitter),
+            "--error-rate", str(args.error_rate), "--throttle-rate", str(args.throttle_rate),
+        ])
+    try:
+        await wait_for_server(base_url)
+        config = {
+            "hltv_base_url": base_url,
+            "warmup_enabled": args.warmup,
+            "browser_max_pages": args.max_pages,
+            "rate_limit_rps": args.rps,
+            "rate_limit_burst": max(3, args.rps),
+            "log_level": args.log_level,
+        }
+        plugin = load_plugin_class()(FakeContext(), config)
+        if args.warmup:
+            await plugin._warmup_task
+
+        sampler = Sampler()
+        sampler_task = asyncio.create_task(sampler.run())
+        samples = []
+        rng = random.Random(args.seed)
+        started = time.monotonic()
+        deadline = started + args.duration
+        await asyncio.gather(*(
+            session_loop(plugin, i, deadline, random.Random(rng.random()), samples)
+            for i in range(args.sessions)
+        ))
+        duration = time.monotonic() - started
+        sampler_task.cancel()
+
+        report = build_report(samples, duration, sampler, plugin, await fetch_mock_stats(base_url))
+        if args.stage_metrics:
+            report["plugin_metrics"] = plugin.metrics.summary()
+        await plugin.terminate()
+        return report
+    finally:
+        if mock:
+            mock.terminate()
+            mock.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="插件端到端压测")
+    parser.add_argument("--sessions", type=int, default=10, help="并发会话数")
+    parser.add_argument("--duration", type=float, default=60, help="压测时长(秒)")
+    parser.add_argument("--base-url", help="已运行的模拟服务器地址，不指定则自动启动")
+    parser.add_argument("--port", type=int, default=8765, help="自动启动模拟服务器时使用的端口")
+    parser.add_argument("--latency", type=float, default=0.2, help="模拟服务器基础延迟(秒)")
+    parser.add_argument("--jitter", type=float, default=0.1, help="模拟服务器随机延迟上限(秒)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="模拟服务器返回 503 的比例")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="模拟服务器返回 429 的比例")
+    parser.add_argument("--max-pages", type=int, default=4, help="插件配置 browser_max_pages")
+    parser.add_argument("--rps", type=float, default=50, help="插件配置 rate_limit_rps（压测时通常放开）")
+    parser.add_argument("--warmup", action="store_true", help="开始前等待插件预热完成")
+    parser.add_argument("--seed", type=int, default=0, help="场景选择的随机种子")
+    parser.add_argument("--log-level", default="WARNING")
+    parser.add_argument("--stage-metrics", action="store_true", help="同时输出插件内部的分阶段耗时")
+    parser.add_argument("--json", action="store_true", help="以JSON输出结果")
+    args = parser.parse_args()
+
+    report = asyncio.run(main_async(args))
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print_report(report)
+        if report.get("plugin_metrics"):
+            print()
+            print(report["plugin_metrics"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""本地模拟 HLTV 服务器
+
+用录制好的页面（benchmarks/fixtures/*.html）代替 hltv.org，可配置响应延迟、
+错误率和限流比例，配合 load_test.py 离线压测插件。
+
+先录制页面（需要 playwright，能访问 hltv.org）：
+
+    python benchmarks/mock_hltv.py record
+
+再启动服务器，并在插件配置中把 hltv_base_url 指向它：
+
+    python benchmarks/mock_hltv.py serve --port 8765 --latency 0.3 --jitter 0.2 --error-rate 0.02
+
+录制的页面只用于本地测试，不要提交到仓库。
+"""
+import os
+import re
+import sys
+import random
+import asyncio
+import argparse
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# URL 路径 -> 页面文件，按顺序匹配；详情页无论ID是多少都返回同一个录制页面
+ROUTES = [
+    (re.compile(r"^/matches/?$"), "matches.html"),
+    (re.compile(r"^/matches/\d+"), "match.html"),
+    (re.compile(r"^/results"), "results.html"),
+    (re.compile(r"^/ranking/teams"), "ranking.html"),
+    (re.compile(r"^/stats/players/\d+"), "player_stats.html"),
+    (re.compile(r"^/stats/teams"), "teams.html"),
+    (re.compile(r"^/stats/?$"), "stats.html"),
+    (re.compile(r"^/team/\d+"), "team.html"),
+    (re.compile(r"^/search"), "search.html"),
+    (re.compile(r"^/$"), "team_stats.html"),  # /?pageid=179&teamid=...
+]
+
+# 静态资源直接返回空响应，避免页面等待 networkidle 时访问外网
+STATIC_SUFFIXES = (".css", ".js", ".png", ".jpg", ".jpeg", ".gif", ".svg", ".webp", ".woff", ".woff2", ".ico")
+
+# 录制时访问的列表页；详情页的地址从列表页中解析出第一条
+LIST_PAGES = {
+    "matches.html": "/matches",
+    "results.html": "/results",
+    "ranking.html": "/ranking/teams/",
+    "stats.html": "/stats",
+    "teams.html": "/stats/teams?minMapCount=0",
+    "search.html": "/search?query=s1mple",
+}
+DETAIL_PAGES = {
+    "match.html": ("results.html", r'href="(/matches/\d+/[\w-]+)"'),
+    "team.html": ("ranking.html", r'href="(/team/\d+/[\w-]+)"'),
+    "player_stats.html": ("stats.html", r'href="(/stats/players/\d+/[\w-]+)"'),
+}
+
+
+def resolve_fixture(path: str):
+    if path.lower().endswith(STATIC_SUFFIXES):
+        return None
+    for pattern, name in ROUTES:
+        if pattern.search(path):
+            return name
+    return None
+
+
+def create_app(latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0, throttle_rate: float = 0.0):
+    from aiohttp import web
+
+    cache = {}
+    stats = {"requests": 0, "errors": 0, "throttled": 0, "missing": 0}
+
+    def load(name):
+        if name not in cache:
+            path = os.path.join(FIXTURE_DIR, name)
+            if not os.path.exists(path):
+                return None
+            with open(path, "r", encoding="utf-8") as f:
+                cache[name] = f.read()
+        return cache[name]
+
+    async def handle(request):
+        path = request.path
+        if path == "/_mock/stats":
+            return web.json_response(stats)
+        if path.lower().endswith(STATIC_SUFFIXES):
+            return web.Response(status=204)
+
+        stats["requests"] += 1
+        delay = latency + random.uniform(0, jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        roll = random.random()
+        if roll < throttle_rate:
+            stats["throttled"] += 1
+            return web.Response(status=429, headers={"Retry-After": "5"}, text="Too Many Requests")
+        if roll < throttle_rate + error_rate:
+            stats["errors"] += 1
+            return web.Response(status=503, text="Service Unavailable")
+
+        name = resolve_fixture(path)
+        body = load(name) if name else None
+        if body is None:
+            stats["missing"] += 1
+            return web.Response(status=404, text=f"没有 {path} 对应的录制页面")
+        return web.Response(text=body, content_type="text/html", headers={"Last-Modified": "Mon, 01 Jan 2024 00:00:00 GMT"})
+
+    app = web.Application()
+    app.router.add_route("GET", "/{tail:.*}", handle)
+    app["stats"] = stats
+    return app
+
+
+async def record(base_url: str):
+    """用浏览器抓取 hltv.org 的真实页面保存为录制页面"""
+    from playwright.async_api import async_playwright
+
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True, args=["--disable-blink-features=AutomationControlled"])
+        page = await browser.new_page(viewport={"width": 1920, "height": 1080})
+
+        async def save(name, path):
+            print(f"录制 {path} -> {name}")
+            await page.goto(base_url + path, wait_until="networkidle", timeout=60000)
+            with open(os.path.join(FIXTURE_DIR, name), "w", encoding="utf-8") as f:
+                f.write(await page.content())
+
+        for name, path in LIST_PAGES.items():
+            await save(name, path)
+
+        for name, (source, pattern) in DETAIL_PAGES.items():
+            with open(os.path.join(FIXTURE_DIR, source), "r", encoding="utf-8") as f:
+                found = re.search(pattern, f.read())
+            if not found:
+                print(f"❌ 没能从 {source} 中找到 {name} 的地址")
+                continue
+            await save(name, found.group(1))
+            if name == "team.html":
+                team_id = re.search(r"/team/(\d+)", found.group(1)).group(1)
+                await save("team_stats.html", f"/?pageid=179&teamid={team_id}")
+
+        await browser.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地模拟 HLTV 服务器")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    serve = sub.add_parser("serve", help="启动模拟服务器")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8765)
+    serve.add_argument("--latency", type=float, default=0.0, help="每个请求的基础延迟(秒)")
+    serve.add_argument("--jitter", type=float, default=0.0, help="在基础延迟上追加 0~jitter 秒的随机延迟")
+    serve.add_argument("--error-rate", type=float, default=0.0, help="返回 503 的比例")
+    serve.add_argument("--throttle-rate", type=float, default=0.0, help="返回 429 的比例")
+
+    rec = sub.add_parser("record", help="从 hltv.org 录制页面")
+    rec.add_argument("--base-url", default="https://www.hltv.org")
+
+    args = parser.parse_args()
+    if args.command == "record":
+        asyncio.run(record(args.base_url.rstrip("/")))
+        return
+
+    from aiohttp import web
+
+    missing = [name for _, name in ROUTES if not os.path.exists(os.path.join(FIXTURE_DIR, name))]
+    if missing:
+        print(f"⚠️ 缺少录制页面: {', '.join(missing)}，请先运行 record", file=sys.stderr)
+    app = create_app(args.latency, args.jitter, args.error_rate, args.throttle_rate)
+    web.run_app(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""数据记录内存基准
+
+分别用旧的字典结构和 records.py 中的 __slots__ 记录构建
+10k 支战队和 100k 行选手-比赛数据，用 tracemalloc 统计两者常驻内存的差异。
+模拟抓取时每条数据都是新解析出来的字符串（不共享对象）。
+
+    python benchmarks/records_bench.py [--teams 10000] [--rows 100000] [--json]
+"""
+import os
+import sys
+import json
+import random
+import argparse
+import tracemalloc
+import importlib.util
+
+PLUGIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_records():
+    spec = importlib.util.spec_from_file_location("hltv_records", os.path.join(PLUGIN_DIR, "records.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def fresh(text: str) -> str:
+    """返回内容相同但不共享的新字符串，模拟每次从 HTML 中解析出的文本"""
+    return "".join(list(text))
+
+
+def team_rows(count: int, rng):
+    for team_id in range(count):
+        name = f"Team {team_id:05d} {rng.choice(['Esports', 'Gaming', 'Club', ''])}".strip()
+        slug = name.lower().replace(" ", "-")
+        yield team_id, name, slug
+
+
+def match_rows(count: int, rng, players: int = 5000):
+    nicknames = [f"player{idx:04d}" for idx in range(players)]
+    for _ in range(count):
+        player_id = rng.randrange(players)
+        yield player_id, [
+            nicknames[player_id],
+            str(rng.randint(5, 35)),
+            str(rng.randint(5, 30)),
+            f"{rng.uniform(40, 120):.1f}",
+            f"{rng.uniform(40, 90):.1f}%",
+            f"{rng.uniform(0.5, 1.8):.2f}",
+        ]
+
+
+def measure(build):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    data = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return after - before, len(data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="数据记录内存基准")
+    parser.add_argument("--teams", type=int, default=10000)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="以JSON输出结果")
+    args = parser.parse_args()
+    records = load_records()
+
+    teams = list(team_rows(args.teams, random.Random(args.seed)))
+    rows = list(match_rows(args.rows, random.Random(args.seed)))
+
+    cases = {
+        "teams": (
+            lambda: [{'id': team_id, 'name': fresh(name), 'url': fresh(f"https://www.hltv.org/stats/teams/{team_id}/{slug}")}
+                     for team_id, name, slug in teams],
+            lambda: [records.TeamRecord(team_id, fresh(name), fresh(slug)) for team_id, name, slug in teams],
+        ),
+        "player_match_rows": (
+            lambda: [{'name': fresh(cells[0]), 'kills': fresh(cells[1]), 'deaths': fresh(cells[2]),
+                      'adr': fresh(cells[3]), 'kast': fresh(cells[4]), 'rating': fresh(cells[5])}
+                     for _, cells in rows],
+            lambda: [records.PlayerMatchStats.from_cells(player_id, [fresh(cell) for cell in cells])
+                     for player_id, cells in rows],
+        ),
+    }
+
+    results = {}
+    for name, (build_dicts, build_records) in cases.items():
+        dict_bytes, count = measure(build_dicts)
+        record_bytes, _ = measure(build_records)
+        results[name] = {
+            "count": count,
+            "dict_mb": dict_bytes / 2 ** 20,
+            "record_mb": record_bytes / 2 ** 20,
+            "dict_bytes_per_item": dict_bytes / count,
+            "record_bytes_per_item": record_bytes / count,
+            "reduction": 1 - record_bytes / dict_bytes if dict_bytes else 0.0,
+        }
+
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+        return
+    for name, row in results.items():
+        print(f"{name} ({row['count']} 条):")
+        print(f"  字典: {row['dict_mb']:.1f} MB ({row['dict_bytes_per_item']:.0f} 字节/条)")
+        print(f"  记录: {row['record_mb']:.1f} MB ({row['record_bytes_per_item']:.0f} 字节/条)")
+        print(f"  减少: {row['reduction']:.0%}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,277 @@
+import os
+import json
+import time
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
+from .lazy import async_playwright
+from .procfs import tree_rss
+
+logger = logging.getLogger(__name__)
+
+LAUNCH_ARGS = [
+    '--disable-web-security',
+    '--disable-features=IsolateOrigins,site-per-process',
+    '--no-sandbox',
+    '--disable-setuid-sandbox',
+    '--disable-dev-shm-usage',
+]
+
+# 所有上下文共用同一个 UA：Cloudflare 的 cf_clearance 与 UA 绑定，换 UA 后保存的凭据会失效
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+# 这些 cookie 过期后保存的状态就没有意义了，需要重新获取
+ESSENTIAL_COOKIES = ("cf_clearance", "CookieConsent")
+
+
+class BrowserManager:
+    """共享的 Chromium 实例
+
+    整个插件只启动一次浏览器，各指令通过 acquire() 借用，
+    同时借用的数量受 max_pages 限制，避免突发请求打开过多页面。
+
+    storage_path 不为空时，Cloudflare 验证和 cookie 同意状态（playwright storage_state）
+    会保存到磁盘，新建的上下文和重启后的插件都直接复用，过期或被拒绝时重新获取。
+
+    长时间运行的 Chromium 会随着广告脚本不断占用内存，浏览器在创建 recycle_after 个上下文、
+    运行 recycle_age 秒或进程树常驻内存超过 memory_limit 字节后被回收：
+    不再借出新的页面，等进行中的页面归还后重启。
+    """
+
+    def __init__(self, max_pages: int = 4, metrics=None, storage_path: str = None,
+                 storage_max_age: float = 6 * 3600, storage_refresh: float = 600,
+                 recycle_after: int = 200, recycle_age: float = 3600, memory_limit: float = 0,
+                 drain_timeout: float = 120, watch_interval: float = 30):
+        self.max_pages = max(1, max_pages)
+        self._semaphore = asyncio.Semaphore(self.max_pages)
+        self._lock = asyncio.Lock()
+        self._playwright = None
+        self._browser = None
+        self.active = 0
+        self.launches = 0
+        self.metrics = metrics
+        self.storage_path = storage_path
+        self.storage_max_age = storage_max_age   # 状态文件最长使用时间
+        self.storage_refresh = storage_refresh   # 两次保存之间的最短间隔
+        self._storage = None                     # 已加载的状态，避免每个上下文都读文件
+        self._storage_saved_at = 0.0
+        # 回收策略，各项为 0 时不启用
+        self.recycle_after = recycle_after
+        self.recycle_age = recycle_age
+        self.memory_limit = memory_limit
+        self.drain_timeout = drain_timeout
+        self.watch_interval = watch_interval
+        self.started_at = 0.0
+        self.contexts_since_launch = 0
+        self.rss = None                          # 最近一次读取的浏览器进程树常驻内存(字节)
+        self.recycles = {}                       # 回收原因 -> 次数
+        self._draining = False
+        self._resumed = asyncio.Event()
+        self._resumed.set()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._watch_task = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._browser is not None and self._browser.is_connected()
+
+    async def start(self):
+        """启动浏览器（已启动时直接返回）"""
+        if self.is_running:
+            return self._browser
+        async with self._lock:
+            if self.is_running:
+                return self._browser
+            if self._browser is not None:
+                logger.warning("浏览器连接已断开，正在重新启动")
+                await self._shutdown()
+            started = time.perf_counter()
+            self._playwright = await async_playwright().start()
+            self._browser = await self._playwright.chromium.launch(headless=True, args=LAUNCH_ARGS)
+            self.launches += 1
+            self.started_at = time.monotonic()
+            self.contexts_since_launch = 0
+            if self._watch_task is None or self._watch_task.done():
+                self._watch_task = asyncio.get_running_loop().create_task(self._watch_memory())
+            if self.metrics:
+                self.metrics.observe("browser.launch", time.perf_counter() - started)
+            logger.info("共享浏览器已启动")
+            return self._browser
+
+    @asynccontextmanager
+    async def acquire(self):
+        """借用共享浏览器，调用方负责关闭自己创建的 context 和 page"""
+        async with self._semaphore:
+            # 需要回收时先等回收完成，回收期间不借出新的页面
+            while True:
+                if self._draining:
+                    await self._resumed.wait()
+                    continue
+                reason = self._recycle_reason()
+                if not reason:
+                    break
+                await self.recycle(reason)
+            browser = await self.start()
+            self.active += 1
+            self._idle.clear()
+            try:
+                yield browser
+            finally:
+                self.active -= 1
+                if self.active == 0:
+                    self._idle.set()
+
+    # ---------- 回收 ----------
+
+    def _recycle_reason(self):
+        if self._draining or not self.is_running:
+            return None
+        if self.recycle_after and self.contexts_since_launch >= self.recycle_after:
+            return "contexts"
+        if self.recycle_age and time.monotonic() - self.started_at >= self.recycle_age:
+            return "age"
+        if self.memory_limit and self.rss and self.rss > self.memory_limit:
+            return "memory"
+        return None
+
+    async def recycle(self, reason: str):
+        """等进行中的页面全部归还后关闭浏览器，下一次借用时重新启动"""
+        if self._draining:
+            await self._resumed.wait()
+            return
+        self._draining = True
+        self._resumed.clear()
+        try:
+            logger.info("回收浏览器（%s），等待 %d 个进行中的页面完成", reason, self.active)
+            try:
+                await asyncio.wait_for(self._idle.wait(), self.drain_timeout)
+            except asyncio.TimeoutError:
+                logger.warning("等待页面完成超时（%d 个仍在进行），强制重启浏览器", self.active)
+            async with self._lock:
+                await self._shutdown()
+            self.rss = None
+            self.recycles[reason] = self.recycles.get(reason, 0) + 1
+            if self.metrics:
+                self.metrics.inc("browser.recycles", reason=reason)
+        finally:
+            self._draining = False
+            self._resumed.set()
+
+    async def _watch_memory(self):
+        """定期读取浏览器进程树的内存，超过上限时回收"""
+        while True:
+            await asyncio.sleep(self.watch_interval)
+            if not self.is_running or self._draining:
+                continue
+            try:
+                rss = await asyncio.to_thread(tree_rss, "playwright")
+            except Exception as e:
+                logger.debug("读取浏览器内存失败: %s", e)
+                continue
+            if rss is None:
+                return  # 不支持 /proc 的平台
+            self.rss = rss
+            if self.memory_limit and rss > self.memory_limit:
+                logger.warning("浏览器内存 %.0f MB 超过上限 %.0f MB", rss / 2 ** 20, self.memory_limit / 2 ** 20)
+                await self.recycle("memory")
+
+    def stats(self) -> dict:
+        return {
+            "active": self.active,
+            "launches": self.launches,
+            "contexts": self.contexts_since_launch,
+            "browser_rss": self.rss,
+            "recycles": dict(self.recycles),
+        }
+
+    # ---------- 浏览器状态持久化 ----------
+
+    def _storage_valid(self, state: dict, saved_at: float) -> bool:
+        now = time.time()
+        if now - saved_at > self.storage_max_age:
+            return False
+        for cookie in state.get("cookies", []):
+            expires = cookie.get("expires", -1)
+            if cookie.get("name") in ESSENTIAL_COOKIES and 0 < expires < now:
+                return False
+        return True
+
+    def storage_state(self):
+        """返回可用于 new_context 的已保存状态，没有或已过期时返回 None"""
+        if not self.storage_path:
+            return None
+        if self._storage is None and os.path.exists(self.storage_path):
+            try:
+                with open(self.storage_path, "r", encoding="utf-8") as f:
+                    self._storage = json.load(f)
+                self._storage_saved_at = os.path.getmtime(self.storage_path)
+            except Exception as e:
+                logger.warning("读取浏览器状态失败: %s", e)
+                self._storage = None
+        if self._storage is not None and not self._storage_valid(self._storage, self._storage_saved_at):
+            logger.info("保存的浏览器状态已过期，将重新获取")
+            self.discard_storage()
+        return self._storage
+
+    async def new_context(self, browser, **kwargs):
+        """创建带有共享 UA 和已保存状态的上下文"""
+        kwargs.setdefault("user_agent", USER_AGENT)
+        state = self.storage_state()
+        if state is not None:
+            kwargs.setdefault("storage_state", state)
+        if self.metrics:
+            self.metrics.inc("browser.contexts", storage="reused" if state is not None else "fresh")
+        self.contexts_since_launch += 1
+        return await browser.new_context(**kwargs)
+
+    async def save_storage(self, context, force: bool = False):
+        """页面成功加载后保存上下文状态，同一时间段内只保存一次"""
+        if not self.storage_path:
+            return
+        if not force and self._storage is not None and time.time() - self._storage_saved_at < self.storage_refresh:
+            return
+        try:
+            state = await context.storage_state()
+            tmp_path = f"{self.storage_path}.{os.getpid()}.tmp"  # 多个工作进程可能同时保存
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(state, f, ensure_ascii=False)
+            os.replace(tmp_path, self.storage_path)
+            self._storage = state
+            self._storage_saved_at = time.time()
+            logger.debug("浏览器状态已保存，共 %d 个cookie", len(state.get("cookies", [])))
+        except Exception as e:
+            logger.warning("保存浏览器状态失败: %s", e)
+
+    def discard_storage(self):
+        """丢弃保存的状态（过期或被 Cloudflare 拒绝时），下个上下文重新验证"""
+        self._storage = None
+        self._storage_saved_at = 0.0
+        if self.storage_path and os.path.exists(self.storage_path):
+            try:
+                os.remove(self.storage_path)
+            except OSError as e:
+                logger.debug("删除浏览器状态文件失败: %s", e)
+
+    async def _shutdown(self):
+        try:
+            if self._browser is not None:
+                await self._browser.close()
+        except Exception as e:
+            logger.debug("关闭浏览器失败: %s", e)
+        try:
+            if self._playwright is not None:
+                await self._playwright.stop()
+        except Exception as e:
+            logger.debug("停止playwright失败: %s", e)
+        self._browser = None
+        self._playwright = None
+
+    async def close(self):
+        if self._watch_task is not None:
+            self._watch_task.cancel()
+            self._watch_task = None
+        async with self._lock:
+            await self._shutdown()
+            logger.info("共享浏览器已关闭")
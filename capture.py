@@ -0,0 +1,138 @@
+"""页面加载和截图的公共步骤
+
+主进程（browser_workers 为 0 时）和浏览器工作进程（见 workers.py）都使用这里的配置和函数，
+两种模式下上下文参数、cookie 处理和截图区域完全一致。这里只依赖 playwright 的页面对象，
+不能导入 AstrBot 相关的模块。
+"""
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 列表页只取 HTML，不需要额外的上下文配置
+FETCH_CONTEXT = {
+    "viewport": {'width': 1920, 'height': 1080},
+}
+
+# 需要截图的详情页
+CAPTURE_CONTEXT = {
+    "viewport": {'width': 1920, 'height': 1080},
+    "ignore_https_errors": True,
+    "accept_downloads": True,
+    "java_script_enabled": True,
+    "bypass_csp": True,
+    "permissions": ['notifications', 'geolocation'],
+    "extra_http_headers": {
+        'Accept': '*/*',
+        'Accept-Language': 'en-US,en;q=0.9',
+        'Accept-Encoding': 'gzip, deflate, br',
+    },
+}
+
+# 页面脚本执行前写入 cookie 同意状态，隐藏 webdriver 标记
+CONSENT_SCRIPT = """
+    Object.defineProperty(navigator, 'webdriver', {get: () => undefined});
+    window.localStorage.setItem('CookieConsent', JSON.stringify({
+        accepted: true,
+        necessary: true,
+        preferences: true,
+        statistics: true,
+        marketing: true
+    }));
+"""
+
+# 截图前用 CSS 隐藏 cookie 弹窗，不改动页面结构
+HIDE_BANNERS_SCRIPT = """() => {
+    const style = document.createElement('style');
+    style.textContent = `
+        #CybotCookiebotDialog,
+        .CookieDeclaration,
+        #CybotCookiebotDialogBodyUnderlay,
+        .cookiebot-overlay,
+        [class*="cookie-notice"],
+        [class*="cookie-banner"],
+        [id*="cookie-banner"],
+        [id*="cookie-notice"] {
+            display: none !important;
+            visibility: hidden !important;
+            opacity: 0 !important;
+            z-index: -9999 !important;
+        }
+    `;
+    document.head.appendChild(style);
+}"""
+
+# 只取 HTML 时直接移除 cookie 相关元素
+REMOVE_BANNERS_SCRIPT = """() => {
+    const cookiebot = document.getElementById('CybotCookiebotDialog');
+    if (cookiebot) cookiebot.remove();
+
+    const cookieBanner = document.querySelector('.CookieDeclaration');
+    if (cookieBanner) cookieBanner.remove();
+
+    const possibleSelectors = [
+        '#CybotCookiebotDialogBodyUnderlay',
+        '.cookiebot-overlay',
+        '[class*="cookie-notice"]',
+        '[class*="cookie-banner"]',
+        '[id*="cookie-banner"]',
+        '[id*="cookie-notice"]'
+    ];
+
+    possibleSelectors.forEach(selector => {
+        const elements = document.querySelectorAll(selector);
+        elements.forEach(el => el.remove());
+    });
+
+    window.CookieConsent = {
+        consent: {
+            stamp: '0',
+            necessary: true,
+            preferences: true,
+            statistics: true,
+            marketing: true
+        }
+    };
+}"""
+
+# 等待截图区域出现的默认最长时间(毫秒)，调用方一般传入按页面类型计算的超时
+SECTION_TIMEOUT = 45000
+
+
+async def open_page(manager, browser, options: dict, timeout: int = None):
+    """用 BrowserManager 创建上下文和页面，返回 (context, page)"""
+    context = await manager.new_context(browser, **options)
+    try:
+        page = await context.new_page()
+        await page.add_init_script(CONSENT_SCRIPT)
+        if timeout:
+            page.set_default_timeout(timeout)
+    except BaseException:
+        await context.close()
+        raise
+    return context, page
+
+
+async def close_page(context, page):
+    try:
+        await page.close()
+    finally:
+        await context.close()
+
+
+async def prepare_capture(page, settle: float = 0):
+    """导航完成后额外等待 settle 秒，再隐藏 cookie 弹窗"""
+    if settle:
+        await asyncio.sleep(settle)
+    await page.evaluate(HIDE_BANNERS_SCRIPT)
+
+
+async def find_section(page, selector: str, wait: bool, timeout: int = SECTION_TIMEOUT):
+    """查找截图区域，wait 为真时最多等待 timeout 毫秒；找不到返回 None"""
+    try:
+        if wait:
+            return await page.wait_for_selector(selector, timeout=timeout)
+        return await page.query_selector(selector)
+    except Exception as e:
+        logger.warning("等待元素 %s 失败: %s", selector, e)
+        return None
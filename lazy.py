@@ -0,0 +1,62 @@
+"""重量级依赖的延迟加载
+
+playwright、bs4/lxml、PIL 和 tzlocal 只在第一次真正使用时才导入，
+AstrBot 加载插件时不再为从未执行的查询支付导入时间和内存。
+"""
+import zoneinfo
+import importlib
+import functools
+
+HLTV_COOKIE_TIMEZONE = "Europe/Copenhagen"
+
+
+class LazyModule:
+    """模块代理，第一次访问属性时才真正导入模块"""
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+
+    def _load(self):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return self._module
+
+    @property
+    def loaded(self) -> bool:
+        return self._module is not None
+
+    def __getattr__(self, item):
+        return getattr(self._load(), item)
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<LazyModule {self._name} ({state})>"
+
+
+PILImage = LazyModule("PIL.Image")
+_bs4 = LazyModule("bs4")
+_playwright_api = LazyModule("playwright.async_api")
+
+
+def BeautifulSoup(*args, **kwargs):
+    """等价于 bs4.BeautifulSoup，首次调用时才导入 bs4"""
+    return _bs4.BeautifulSoup(*args, **kwargs)
+
+
+def async_playwright():
+    """等价于 playwright.async_api.async_playwright，首次调用时才导入 playwright"""
+    return _playwright_api.async_playwright()
+
+
+@functools.lru_cache(maxsize=None)
+def hltv_zoneinfo():
+    """HLTV 页面时间所使用的时区"""
+    return zoneinfo.ZoneInfo(HLTV_COOKIE_TIMEZONE)
+
+
+@functools.lru_cache(maxsize=None)
+def local_zoneinfo():
+    """机器本地时区，首次调用时才导入 tzlocal"""
+    import tzlocal
+    return zoneinfo.ZoneInfo(tzlocal.get_localzone_name())
@@ -0,0 +1,239 @@
+import os
+import re
+import json
+import asyncio
+import logging
+
+from .player_index import fold_text
+
+logger = logging.getLogger(__name__)
+
+HLTV_BASE_URL = "https://www.hltv.org"
+
+
+def parse_match_id(href: str):
+    """从 /matches/<id>/<slug> 链接中解析比赛ID"""
+    found = re.search(r"/matches/(\d+)", href or "")
+    return int(found.group(1)) if found else None
+
+
+def parse_live_matches(page) -> dict:
+    """解析 /matches/ 页面的直播区块，返回 {比赛ID: {'url', 'team1', 'team2', 'event'}}"""
+    live = {}
+    section = page.find("div", {"class": "liveMatchesSection"}) or page.find("div", {"class": "liveMatchesContainer"})
+    if not section:
+        return live
+    for match in section.find_all("div", {"class": "liveMatch"}):
+        try:
+            link = match.find("a", href=True)
+            match_id = parse_match_id(link["href"]) if link else None
+            if not match_id:
+                continue
+            teams = match.find_all("div", {"class": "matchTeamName"}) or match.find_all("div", {"class": "matchTeam"})
+            if len(teams) < 2:
+                continue
+            event_element = match.find("div", {"class": "matchEventName"}) or match.find("div", {"class": "matchEvent"})
+            live[match_id] = {
+                'url': link["href"],
+                'team1': teams[0].text.strip(),
+                'team2': teams[1].text.strip(),
+                'event': event_element.text.strip() if event_element else "",
+            }
+        except Exception as e:
+            logger.error("解析直播比赛时出错: %s", e)
+    return live
+
+
+def parse_match_state(page) -> dict:
+    """解析比赛页面的当前状态: 大比分、各地图比分以及是否结束"""
+    state = {'score': None, 'maps': [], 'over': False}
+
+    countdown = page.find("div", {"class": "countdown"})
+    if countdown and "over" in countdown.text.lower():
+        state['over'] = True
+
+    teams_box = page.find("div", {"class": "teamsBox"})
+    if teams_box:
+        scores = []
+        for gradient in ("team1-gradient", "team2-gradient"):
+            holder = teams_box.find("div", {"class": gradient})
+            score = holder.find("div", {"class": ["won", "lost", "tie"]}) if holder else None
+            scores.append(score.text.strip() if score else "")
+        if all(scores):
+            state['score'] = tuple(scores)
+
+    for holder in page.find_all("div", {"class": "mapholder"}):
+        map_name = holder.find("div", {"class": "mapname"})
+        map_scores = [s.text.strip() for s in holder.find_all("div", {"class": "results-team-score"})]
+        if not map_name or len(map_scores) < 2 or "-" in map_scores[:2]:
+            continue
+        # 只有带有 played 标记的地图才视为已结束
+        finished = holder.find("div", {"class": "played"}) is not None
+        state['maps'].append([map_name.text.strip(), map_scores[0], map_scores[1], finished])
+    # 后一张地图已开打或整场结束时，前面的地图必然已结束
+    for idx, map_state in enumerate(state['maps']):
+        if state['over'] or idx < len(state['maps']) - 1:
+            map_state[3] = True
+    state['maps'] = [tuple(m) for m in state['maps']]
+    return state
+
+
+class LiveTracker:
+    """直播比赛追踪器
+
+    所有订阅共用一个后台轮询任务：每轮只请求一次 /matches/ 页面，
+    并只为包含被订阅战队的直播比赛请求比赛页面，
+    网络开销与被追踪的比赛数成正比，而与用户数和查询次数无关。
+    """
+
+    def __init__(self, fetch_page, notify, path: str = None, interval: float = 60, base_url: str = HLTV_BASE_URL):
+        self.fetch_page = fetch_page      # async (url) -> BeautifulSoup | None
+        self.notify = notify              # async (会话列表, 文本) -> None
+        self.base_url = base_url.rstrip("/")
+        self.path = path
+        self.interval = max(15, interval)
+        self.subscriptions = {}           # 折叠后的战队名 -> {会话: 战队显示名}
+        self.tracked = {}                 # 比赛ID -> {'info', 'state'}
+        self.finished = set()             # 已推送最终比分但仍在直播区块中的比赛ID
+        self._task = None
+
+    # ---------- 订阅管理 ----------
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.subscriptions = json.load(f)
+        except Exception as e:
+            logger.error("读取订阅文件失败: %s", e)
+
+    def save(self):
+        if not self.path:
+            return
+        try:
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump(self.subscriptions, f, ensure_ascii=False)
+        except Exception as e:
+            logger.error("保存订阅文件失败: %s", e)
+
+    def subscribe(self, session: str, team_name: str) -> bool:
+        key = fold_text(team_name)
+        if not key:
+            return False
+        sessions = self.subscriptions.setdefault(key, {})
+        if session in sessions:
+            return False
+        sessions[session] = team_name
+        self.save()
+        self.start()
+        return True
+
+    def unsubscribe(self, session: str, team_name: str) -> bool:
+        key = fold_text(team_name)
+        sessions = self.subscriptions.get(key)
+        if not sessions or session not in sessions:
+            return False
+        del sessions[session]
+        if not sessions:
+            del self.subscriptions[key]
+        self.save()
+        return True
+
+    def subscribed_teams(self, session: str) -> list:
+        return [sessions[session] for sessions in self.subscriptions.values() if session in sessions]
+
+    def sessions_for(self, info: dict) -> set:
+        sessions = set()
+        for team in (info['team1'], info['team2']):
+            sessions.update(self.subscriptions.get(fold_text(team), {}))
+        return sessions
+
+    # ---------- 后台轮询 ----------
+
+    def start(self):
+        """在存在订阅时启动唯一的后台轮询任务"""
+        if self._task and not self._task.done():
+            return
+        if not self.subscriptions:
+            return
+        self._task = asyncio.get_running_loop().create_task(self._run())
+        logger.info("直播比赛轮询任务已启动")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while self.subscriptions:
+            try:
+                await self.poll_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("轮询直播比赛时出错: %s", e)
+                logger.debug("异常详情: ", exc_info=True)
+            await asyncio.sleep(self.interval)
+        logger.info("没有任何订阅，直播比赛轮询任务已停止")
+
+    async def poll_once(self):
+        page = await self.fetch_page(f"{self.base_url}/matches/")
+        if not page:
+            return
+        all_live = parse_live_matches(page)
+        self.finished &= set(all_live)
+        live = {
+            match_id: info for match_id, info in all_live.items()
+            if match_id not in self.finished and self.sessions_for(info)
+        }
+
+        # 已结束（离开直播区块）的比赛再请求一次以获取最终比分
+        for match_id in [m for m in self.tracked if m not in live]:
+            tracked = self.tracked.pop(match_id)
+            if match_id in self.finished:
+                continue
+            state = await self._fetch_state(tracked['info'])
+            await self._emit_final(tracked['info'], state or tracked['state'])
+
+        for match_id, info in live.items():
+            state = await self._fetch_state(info)
+            if state is None:
+                continue
+            if match_id not in self.tracked:
+                self.tracked[match_id] = {'info': info, 'state': state}
+                await self._emit(info, f"🔴 比赛开始: {info['team1']} vs {info['team2']}\n🏆 {info['event']}")
+                continue
+            previous = self.tracked[match_id]['state']
+            self.tracked[match_id]['state'] = state
+            await self._emit_diff(info, previous, state)
+            if state['over']:
+                self.tracked.pop(match_id, None)
+                self.finished.add(match_id)
+                await self._emit_final(info, state)
+
+    async def _fetch_state(self, info: dict):
+        page = await self.fetch_page(f"{self.base_url}{info['url']}")
+        if not page:
+            return None
+        return parse_match_state(page)
+
+    async def _emit(self, info: dict, text: str):
+        sessions = self.sessions_for(info)
+        if sessions:
+            await self.notify(sessions, text)
+
+    async def _emit_diff(self, info: dict, previous: dict, state: dict):
+        finished_before = {m[0] for m in previous['maps'] if m[3]}
+        for map_name, score1, score2, finished in state['maps']:
+            if finished and map_name not in finished_before:
+                await self._emit(info, f"🗺️ 地图结束 {map_name}: {info['team1']} {score1} - {score2} {info['team2']}")
+
+    async def _emit_final(self, info: dict, state: dict):
+        score = state.get('score') if state else None
+        score_text = f"{score[0]} - {score[1]}" if score else "未知"
+        await self._emit(info, f"🏁 比赛结束: {info['team1']} {score_text} {info['team2']}\n🏆 {info['event']}")
@@ -0,0 +1,66 @@
+import time
+import logging
+
+PLUGIN_LOGGER_NAME = __name__.rpartition(".")[0] or "hltv_query"
+
+_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+_DATEFMT = '%Y-%m-%d %H:%M:%S'
+
+
+def setup_logging(level="INFO") -> logging.Logger:
+    """配置插件根日志记录器（可重复调用）
+
+    插件重载时不会重复添加处理器，日志级别由配置决定。
+    """
+    logger = logging.getLogger(PLUGIN_LOGGER_NAME)
+    if isinstance(level, str):
+        level = logging.getLevelName(level.upper())
+    if not isinstance(level, int):
+        level = logging.INFO
+    logger.setLevel(level)
+
+    if not any(getattr(handler, "_hltv_handler", False) for handler in logger.handlers):
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter(_FORMAT, datefmt=_DATEFMT))
+        handler._hltv_handler = True
+        logger.addHandler(handler)
+    return logger
+
+
+class RateLimitedLogger:
+    """按键限流的日志记录器，用于循环中逐条输出的日志
+
+    每个键在 interval 秒内最多输出 burst 条，其余被计数，
+    下一个窗口第一次输出时附带被省略的条数。
+    """
+
+    def __init__(self, logger: logging.Logger, interval: float = 10.0, burst: int = 5):
+        self.logger = logger
+        self.interval = interval
+        self.burst = burst
+        self._windows = {}  # 键 -> [窗口开始时间, 已输出条数, 被省略条数]
+
+    def log(self, level: int, key: str, msg: str, *args):
+        if not self.logger.isEnabledFor(level):
+            return
+        now = time.monotonic()
+        window = self._windows.get(key)
+        if window is None or now - window[0] >= self.interval:
+            suppressed = window[2] if window else 0
+            window = self._windows[key] = [now, 0, 0]
+            if suppressed:
+                self.logger.log(level, "(%s: 上个周期省略了 %d 条日志)", key, suppressed)
+        if window[1] >= self.burst:
+            window[2] += 1
+            return
+        window[1] += 1
+        self.logger.log(level, msg, *args)
+
+    def debug(self, key: str, msg: str, *args):
+        self.log(logging.DEBUG, key, msg, *args)
+
+    def info(self, key: str, msg: str, *args):
+        self.log(logging.INFO, key, msg, *args)
+
+    def warning(self, key: str, msg: str, *args):
+        self.log(logging.WARNING, key, msg, *args)
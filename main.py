@@ -3,24 +3,142 @@ import logging
 import json
 import re
 import asyncio
-from playwright.async_api import async_playwright
-from bs4 import BeautifulSoup
-import zoneinfo
-import tzlocal
-from python_utils import converters
-import cloudscraper
 import time
-from PIL import Image as PILImage
+import zlib
+import tracemalloc
+from datetime import datetime
+from contextlib import AsyncExitStack
+from urllib.parse import urlsplit
 
-from astrbot.api.event import filter, AstrMessageEvent
+from astrbot.api.event import filter, AstrMessageEvent, MessageChain
 from astrbot.api.star import Context, Star, register
 from astrbot.api.message_components import Plain, Image
 from astrbot.api.all import *
 
-HLTV_COOKIE_TIMEZONE = "Europe/Copenhagen"
-HLTV_ZONEINFO = zoneinfo.ZoneInfo(HLTV_COOKIE_TIMEZONE)
-LOCAL_TIMEZONE_NAME = tzlocal.get_localzone_name()
-LOCAL_ZONEINFO = zoneinfo.ZoneInfo(LOCAL_TIMEZONE_NAME)
+from .player_index import PlayerIndex, parse_player_href, fold_text
+from .live_tracker import LiveTracker, HLTV_BASE_URL
+from .schedule import ScheduleStore, parse_schedule
+from .ranking_history import RankingHistory, parse_ranking, ranking_week
+from .match_history import MatchHistory, backfill_history, outcome
+from .records import (
+    TeamRecord, PlayerRecord, PlayerMatchStats, MatchStats, MatchResult, parse_float, parse_int, format_number,
+)
+from .pagination import CursorStore, MATCH_ID_PATTERN
+from .page_cache import PageCache, region_fingerprint, STALE_REFRESHING, STALE_UNAVAILABLE, STALE_FAILED
+from .browser import BrowserManager
+from .capture import (
+    FETCH_CONTEXT, CAPTURE_CONTEXT, REMOVE_BANNERS_SCRIPT,
+    open_page, close_page, prepare_capture, find_section,
+)
+from .workers import WorkerPool
+# bs4/lxml、PIL、playwright、tzlocal 均在首次使用时才导入
+from .lazy import BeautifulSoup, PILImage, hltv_zoneinfo, local_zoneinfo
+from .log import setup_logging, RateLimitedLogger
+from .metrics import Metrics, timed_command, COMMAND_NAMES
+from .profiling import CommandProfiler
+from .memdiag import MemoryDiagnostics
+from .ratelimit import RateLimiter
+from .resilience import RetryPolicy, BreakerRegistry, FetchError, AdaptiveTimeouts, Deadline, DeadlineExceeded
+
+# 列表页缓存策略：ttl 为新鲜期，max_stale 为过期后仍可先返回旧数据的最长时间，
+# swr 为是否启用 stale-while-revalidate；超过 ttl + max_stale 后请求会等待刷新
+DEFAULT_CACHE_POLICY = {"ttl": 300, "max_stale": 1800, "swr": True}
+CACHE_POLICIES = {
+    "ranking": {"ttl": 600, "max_stale": 6 * 3600, "swr": True},
+    "matches": {"ttl": 120, "max_stale": 900, "swr": True},
+    "results": {"ttl": 120, "max_stale": 900, "swr": True},
+    "top_players": {"ttl": 1800, "max_stale": 12 * 3600, "swr": True},
+    "team": {"ttl": 1800, "max_stale": 0, "swr": False},
+}
+
+def page_type(url: str) -> str:
+    """按URL路径归类页面类型，用于指标标签等"""
+    parts = urlsplit(url)
+    path = parts.path + (f"?{parts.query}" if parts.query else "")
+    if path.split("?")[0].rstrip("/") == "/matches":
+        return "matches"
+    for prefix, kind in (
+        ("/ranking", "ranking"),
+        ("/matches/", "match"),
+        ("/results", "results"),
+        ("/stats/players/", "player"),
+        ("/stats/teams", "teams"),
+        ("/stats", "stats"),
+        ("/search", "search"),
+        ("/team/", "team"),
+        ("/?pageid=179", "team"),
+        ("/player/", "player"),
+    ):
+        if path.startswith(prefix):
+            return kind
+    return "other"
+
+
+def team_slug(team) -> str:
+    """战队链接中的名称部分，优先取战队列表中记录的 slug，不能直接用带空格的显示名"""
+    if team.slug and not team.slug.isdigit():
+        return team.slug
+    return re.sub(r"[^a-z0-9]+", "-", team.name.lower()).strip("-") or str(team.id)
+
+
+def match_path(match) -> str:
+    """把比赛ID或比赛链接统一为 /matches/<id>/<slug> 形式的路径"""
+    if isinstance(match, int) or str(match).isdigit():
+        # HLTV 会把任意 slug 重定向到正确的比赛页
+        return f"/matches/{match}/match"
+    parts = urlsplit(str(match))
+    return parts.path + (f"?{parts.query}" if parts.query else "")
+
+
+def split_full_name(alt: str) -> str:
+    """把 "Mathieu 'ZywOo' Herbaut" 形式的图片说明转换为 "Mathieu Herbaut" """
+    parts = alt.split("'")
+    if len(parts) < 3:
+        return alt.strip()
+    return f"{parts[0].strip()} {parts[2].strip()}".strip()
+
+
+WEEKDAYS = ["周一", "周二", "周三", "周四", "周五", "周六", "周日"]
+
+# 本地数据（选手索引、排名历史、比赛历史）有变化后延迟写盘的秒数，期间的变化合并为一次写入
+STORE_SAVE_DELAY = 30
+
+# 结果页每页的比赛数，向后翻页时作为 offset 的步长
+RESULTS_PAGE_SIZE = 100
+
+# 返回过期数据时附带的说明，按过期原因区分
+STALE_NOTES = {
+    STALE_REFRESHING: "正在后台更新",
+    STALE_UNAVAILABLE: "HLTV 暂时不可用，显示缓存数据",
+    STALE_FAILED: "更新失败，显示缓存数据",
+}
+
+# 分段发送的截图区域: (文件后缀, 选择器, 说明, 是否等待元素出现)
+MATCH_SECTIONS = [
+    ("teams", ".standard-box.teamsBox", "⚔️ 比分", True),
+    ("score", ".flexbox-column", "🗺️ 地图比分", False),
+    ("stats", "div#all-content.stats-content", "📈 比赛数据", False),
+]
+TEAM_SECTIONS = [
+    ("bodyshot", ".bodyshot-team-bg", "横幅", False),
+    ("profile", ".standard-box.profileTopBox.clearfix", "简介", False),
+    ("trophy", ".trophySection", "奖杯", False),
+]
+PLAYER_SECTIONS = [
+    ("summary", ".playerSummaryStatBox", "📊 数据概览", True),
+    ("role_stats", ".role-stats-container.standard-box", "🎯 角色数据", True),
+    ("stats", ".statistics", "📈 详细数据", False),
+]
+
+
+# 各页面用于计算内容指纹的关键区域 (起始标记, 结束标记)，排除侧边栏和广告
+PAGE_REGIONS = {
+    "ranking": ('class="ranking"', 'class="rightCol"'),
+    "matches": ('class="upcomingMatchesWrapper"', 'class="rightCol"'),
+    "results": ('class="results-holder', 'class="rightCol"'),
+    "stats": ('class="stats-section', 'class="rightCol"'),
+    "team": ('class="teamProfile', 'class="rightCol"'),
+}
 
 @register(
     name="hltv_query",  # 插件名称要与文件夹名称一致
@@ -32,6 +150,8 @@ class HLTVQuery(Star):
     def __init__(self, context: Context, config: dict = None):
         super().__init__(context)
         self.config = config or {}
+        # 可指向本地的模拟服务器，用于压测（见 benchmarks/mock_hltv.py）
+        self.base_url = (self.config.get("hltv_base_url") or HLTV_BASE_URL).rstrip("/")
         
         # 修改 teams_file 路径
         self.teams_file = os.path.join(os.path.dirname(__file__), "teams.txt")
@@ -64,6 +184,12 @@ class HLTVQuery(Star):
                 "usage": "/top30",
                 "category": "战队"
             },
+            "排名变化": {
+                "command": "/排名变化 [数量|战队名称]",
+                "desc": "世界排名相对上周的名次、积分变化和连续升降周数",
+                "usage": "/排名变化 10",
+                "category": "战队"
+            },
             "战队信息": {
                 "command": "/战队信息 [战队名称]",
                 "desc": "查询指定战队的详细统计数据",
@@ -74,16 +200,40 @@ class HLTVQuery(Star):
             # 比赛相关指令 
             "比赛": {
                 "command": "/比赛",
-                "desc": "查询HLTV近期即将进行的比赛(10场)",
+                "desc": "分页查询HLTV近期即将进行的比赛",
                 "usage": "/比赛",
                 "category": "比赛"  
             },
+            "战队赛程": {
+                "command": "/战队赛程 [战队名称]",
+                "desc": "查询指定战队接下来的比赛，时间为本地时间",
+                "usage": "/战队赛程 Vitality",
+                "category": "比赛"
+            },
+            "今日比赛": {
+                "command": "/今日比赛",
+                "desc": "查询今天（本地时间）的全部比赛",
+                "usage": "/今日比赛",
+                "category": "比赛"
+            },
             "结果": {
                 "command": "/结果", 
-                "desc": "查询HLTV近期比赛结果(10场)\n在显示结果后30秒内输入编号(1-10)可查看详细数据",
+                "desc": "分页查询HLTV近期比赛结果\n输入 下一页/上一页 翻页，输入 比赛 <比赛ID> 可查看详细数据",
                 "usage": "/结果",
                 "category": "比赛"
             },
+            "交手记录": {
+                "command": "/交手记录 [战队A] [战队B]",
+                "desc": "查询两支战队最近的交手记录，数据来自本地比赛历史",
+                "usage": "/交手记录 Vitality MOUZ",
+                "category": "比赛"
+            },
+            "近期状态": {
+                "command": "/近期状态 [战队名称]",
+                "desc": "查询战队最近10场战绩、连胜连败和近30天胜率",
+                "usage": "/近期状态 Vitality",
+                "category": "比赛"
+            },
 
             # 选手相关指令
             "top选手": {
@@ -106,157 +256,385 @@ class HLTVQuery(Star):
             }
         }
         
-        # 配置日志记录器
+        # 各阶段耗时、缓存命中率、浏览器占用等指标，可通过 /hltv_stats 查看
+        self.metrics = Metrics()
+        # 管理员按需开启的指令剖析，结果文件写入 profiles/，摘要发回开启剖析的会话
+        self.profiler = CommandProfiler(os.path.join(os.path.dirname(__file__), "profiles"), report=self.push_message)
+
+        # 配置日志记录器：级别可配置，插件重载时不会重复添加处理器
+        setup_logging(self.config.get("log_level", "INFO"))
         self.logger = logging.getLogger(__name__)
-        self.logger.setLevel(logging.DEBUG)
-        
-        # 创建控制台处理器
-        console_handler = logging.StreamHandler()
-        console_handler.setLevel(logging.DEBUG)
-        
-        # 创建格式化器
-        formatter = logging.Formatter(
-            '%(asctime)s - %(name)s - %(levelname)s - %(message)s',  # 修改 level别名 为 levelname
-            datefmt='%Y-%m-%d %H:%M:%S'
-        )
-        console_handler.setFormatter(formatter)
-        
-        # 添加处理器到日志记录器
-        self.logger.addHandler(console_handler)
+        # 循环中逐条输出的日志使用限流记录器
+        self.item_logger = RateLimitedLogger(self.logger)
         
         self.team_map = []
-        # 存储最近查询的比赛信息
-        self.recent_matches = {}
-        # 存储用户最后查询结果的时间
-        self.last_result_query = {}
+        self.team_index = {}  # 小写战队名 -> 战队信息，随 team_map 一起构建
+        self._teams_lock = asyncio.Lock()
+        # 每个会话最近一次查询的比赛列表和页码，翻页直接使用已解析的列表
+        self.list_cursors = CursorStore()
+        self.page_size = max(1, self.config.get("list_page_size", 10))
         
         # 添加新属性用于存储搜索结果和查询时间
         self.player_search_results = {}  # 存储用户搜索到的选手信息
         self.last_search_time = {}      # 存储用户最后搜索时间
+
+        # 本地选手索引，由插件见过的所有选手构建，搜索时优先命中本地
+        self.player_index = PlayerIndex(os.path.join(os.path.dirname(__file__), "players.json"))
+        self.player_index.load()
+        self._pending_saves = {}  # 等待写盘的本地数据 -> 定时器
+
+        # 每周世界排名的本地快照，/排名变化 只读这里，不抓取历史排名页面
+        self.ranking_history = RankingHistory(os.path.join(os.path.dirname(__file__), "ranking_history.json"))
+        self.ranking_history.load()
+
+        # 本地比赛历史：结果页和比赛详情页解析出的比赛都会记入，/交手记录、/近期状态 只读这里
+        self.match_history = MatchHistory(os.path.join(os.path.dirname(__file__), "match_history.json"))
+        self.match_history.load()
+        self.backfill_pages = max(0, self.config.get("match_history_backfill_pages", 5))
+        self._backfill_task = None
+
+        # 直播比赛追踪器：所有订阅共用一个后台轮询任务
+        self.live_tracker = LiveTracker(
+            fetch_page=self.get_parsed_page,
+            notify=self.push_message,
+            base_url=self.base_url,
+            path=os.path.join(os.path.dirname(__file__), "subscriptions.json"),
+            interval=self.config.get("live_poll_interval", 60),
+        )
+        self.live_tracker.load()
+        try:
+            self.live_tracker.start()
+        except RuntimeError:
+            # 没有运行中的事件循环时，等到第一次订阅再启动
+            pass
         
+        # 页面缓存：记录内容指纹，未变化时跳过解析
+        self.page_cache = PageCache()
+        # 近期比赛页解析出的赛程索引，随 matches 缓存一起刷新
+        self.schedule = ScheduleStore()
+        self._refresh_tasks = {}
+
         # 添加截图保存路径
         self.screenshot_dir = os.path.join(os.path.dirname(__file__), "screenshots")
         if not os.path.exists(self.screenshot_dir):
             os.makedirs(self.screenshot_dir, exist_ok=True)
 
-    async def get_parsed_page(self, url):
-        """每次请求都使用新的浏览器实例"""
+        # 所有出站请求共用的限流器
+        self.rate_limiter = RateLimiter(
+            rate=self.config.get("rate_limit_rps", 0.5),
+            burst=self.config.get("rate_limit_burst", 3),
+            weights=self.config.get("rate_limit_weights") or None,
+        )
+        self.metrics.gauge("ratelimit_queue", lambda: self.rate_limiter.waiting)
+        self.metrics.gauge("ratelimit_rate", lambda: self.rate_limiter.effective_rate)
+
+        # 统一的重试策略与按页面类型划分的熔断器
+        self.retry_policy = RetryPolicy(
+            attempts=self.config.get("retry_attempts", 3),
+            base_delay=self.config.get("retry_base_delay", 1.0),
+        )
+        self.breakers = BreakerRegistry(
+            failure_threshold=self.config.get("breaker_failure_threshold", 5),
+            recovery_timeout=self.config.get("breaker_recovery_timeout", 60),
+        )
+        self.metrics.gauge("breaker_open", lambda: {
+            (("page", name),): int(state != "closed") for name, state in self.breakers.states().items()
+        })
+
+        # 按页面类型根据最近的加载耗时计算单步超时，每个请求另有总截止时间
+        self.timeouts = AdaptiveTimeouts(
+            factor=self.config.get("timeout_factor", 3.0),
+            floor=self.config.get("timeout_floor", 5),
+            ceiling=self.config.get("timeout_ceiling", 60),
+        )
+        self.metrics.gauge("timeout_seconds", lambda: {
+            (("page", name),): value for name, value in self.timeouts.snapshot().items()
+        })
+
+        # 共享浏览器，所有页面请求复用同一个 Chromium 实例，按次数、时长和内存定期回收
+        recycle = {
+            "recycle_after": self.config.get("browser_recycle_after", 200),
+            "recycle_age": self.config.get("browser_recycle_minutes", 60) * 60,
+            "memory_limit": self.config.get("browser_memory_limit_mb", 2048) * 2 ** 20,
+        }
+        self.browser_manager = BrowserManager(
+            max_pages=self.config.get("browser_max_pages", 4),
+            metrics=self.metrics,
+            storage_path=os.path.join(os.path.dirname(__file__), "browser_state.json"),
+            storage_max_age=self.config.get("browser_state_max_age", 6 * 3600),
+            **recycle,
+        )
+        self.metrics.gauge("browser_active_pages", lambda: self.browser_manager.active)
+        self.metrics.gauge("browser_utilization", lambda: self.browser_manager.active / self.browser_manager.max_pages)
+        self.metrics.gauge("browser_launches", lambda: self.browser_manager.launches)
+
+        # 可选：浏览器放到独立的工作进程中运行，页面加载和截图不占用主进程，可以利用多个CPU核心
+        self.worker_pool = None
+        if self.config.get("browser_workers", 0) > 0:
+            self.worker_pool = WorkerPool(
+                size=self.config.get("browser_workers"),
+                max_pages=self.browser_manager.max_pages,
+                storage_path=self.browser_manager.storage_path,
+                storage_max_age=self.browser_manager.storage_max_age,
+                log_level=self.config.get("log_level", "INFO"),
+                metrics=self.metrics,
+                heartbeat_timeout=self.config.get("worker_heartbeat_timeout", 30),
+                job_timeout=self.config.get("worker_job_timeout", 120),
+                recycle=recycle,
+            )
+            self.metrics.gauge("worker_alive", lambda: self.worker_pool.alive)
+            self.metrics.gauge("worker_in_flight", lambda: self.worker_pool.in_flight)
+            self.metrics.gauge("worker_restarts", lambda: self.worker_pool.restarts)
+            self.metrics.gauge("worker_rss_bytes", lambda: {
+                (("worker", index),): state["rss"] or 0 for index, state in self.worker_pool.snapshot().items()
+            })
+        self.metrics.gauge("browser_rss_bytes", lambda: self.browser_memory()[0])
+        self.metrics.gauge("browser_recycles", lambda: {
+            (("reason", reason),): count for reason, count in self.browser_memory()[1].items()
+        })
+        self.metrics.gauge("cache_hit_ratio", self._cache_hit_ratio)
+        self.metrics.gauge("cache_refreshes", lambda: {
+            (("result", "unchanged"),): self.page_cache.stats["unchanged"],
+            (("result", "changed"),): self.page_cache.stats["changed"],
+        })
+
+        # 可选：tracemalloc 内存诊断，开销较大，默认关闭，也可由管理员用 /hltv_memory 开启
+        self.memory_diagnostics = MemoryDiagnostics(
+            interval=self.config.get("memory_snapshot_interval", 600),
+            alert_mb_per_hour=self.config.get("memory_growth_alert_mb", 50),
+            notify=self.push_message,
+            containers=lambda: {
+                "team_map": len(self.team_map),
+                "team_index": len(self.team_index),
+                "player_search_results": len(self.player_search_results),
+                "last_search_time": len(self.last_search_time),
+                "page_cache": len(self.page_cache.entries),
+                "match_history": len(self.match_history),
+            },
+            directory=os.path.join(os.path.dirname(__file__), "diagnostics"),
+        )
+        self.metrics.gauge("memory_traced_bytes", lambda: tracemalloc.get_traced_memory()[0])
+        if self.config.get("memory_diagnostics", False):
+            try:
+                self.memory_diagnostics.start()
+            except RuntimeError:
+                self.logger.debug("没有运行中的事件循环，跳过内存诊断")
+
+        # 可选：定期将指标以 Prometheus 文本格式写入文件
+        self._metrics_dump_task = None
+        if self.config.get("metrics_file"):
+            try:
+                self._metrics_dump_task = asyncio.get_running_loop().create_task(self._dump_metrics_loop())
+            except RuntimeError:
+                self.logger.debug("没有运行中的事件循环，跳过指标导出")
+
+        # 注册完成后在后台预热，ready 表示预热是否已完成
+        self.ready = False
+        self._warmup_task = None
+        if self.config.get("warmup_enabled", True):
+            try:
+                self._warmup_task = asyncio.get_running_loop().create_task(self.warmup())
+            except RuntimeError:
+                self.logger.debug("没有运行中的事件循环，跳过预热")
+
+    def new_deadline(self) -> Deadline:
+        """一次请求（取页面或截图）的总截止时间"""
+        return Deadline(self.config.get("request_deadline", 90))
+
+    async def get_parsed_page(self, url, deadline: Deadline = None):
+        """获取页面并解析为BeautifulSoup对象"""
+        fetched = await self.fetch_page_content(url, deadline)
+        if not fetched:
+            return None
+        content, _ = fetched
+        try:
+            with self.metrics.span("parse", page=page_type(url)):
+                soup = BeautifulSoup(content, "lxml")
+            if not soup.find():
+                self.logger.error("BeautifulSoup解析结果为空")
+                return None
+            return soup
+        except Exception as e:
+            self.logger.error("解析页面时发生错误: %s", e)
+            self.logger.debug("异常详情: ", exc_info=True)
+            return None
+
+    async def fetch_page_content(self, url, deadline: Deadline = None):
+        """使用共享浏览器获取页面，返回 (页面HTML, 响应头) 或 None"""
+        with self.metrics.span("fetch.total", page=page_type(url)):
+            return await self._fetch_page_content(url, deadline or self.new_deadline())
+
+    async def _fetch_page_content(self, url, deadline: Deadline):
+        kind = page_type(url)
+        # 熔断期间直接失败，不占用浏览器
+        if self.breakers.get(kind).is_open():
+            self.logger.warning("%s 页面熔断中，跳过请求: %s", kind, url)
+            self.metrics.inc("breaker.rejected", page=kind)
+            return None
+        if self.worker_pool:
+            return await self._fetch_remote(url, deadline)
         try:
-            self.logger.info(f"正在请求URL: {url}")
+            self.logger.info("正在请求URL: %s", url)
             
-            async with async_playwright() as playwright:
-                # 每次创建新的浏览器实例
-                browser = await playwright.chromium.launch(
-                    headless=True,
-                )
-                
-                # 创建新的上下文，使用随机用户代理
-                context = await browser.new_context(
-                    user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                    viewport={'width': 1920, 'height': 1080},
-                )
-                
-                # 创建新页面
-                page = await context.new_page()
-                self.logger.debug("已创建新页面")
-                
-                try:
-                    # 在page.goto之前添加
-                    await page.add_init_script("""
-                        Object.defineProperty(navigator, 'webdriver', {get: () => undefined});
-                        window.localStorage.setItem('CookieConsent', JSON.stringify({
-                            accepted: true,
-                            necessary: true,
-                            preferences: true,
-                            statistics: true,
-                            marketing: true
-                        }));
-                    """)
-                    
-                    # 设置超时时间
-                    page.set_default_timeout(60000)
-                    
-                    # 访问页面
-                    self.logger.debug("开始访问页面...")
-                    response = await page.goto(url, wait_until="networkidle")
-                    
-                    if not response or response.status != 200:
-                        self.logger.error(f"页面加载失败：状态码 {response.status if response else 'None'}")
-                        return None
-                    
-                    # 等待页面加载
-                    await page.wait_for_load_state("domcontentloaded")
-                    await asyncio.sleep(2)
-                    
-                    # 页面加载后,截图前添加
-                    await page.evaluate("""() => {
-                        const cookiebot = document.getElementById('CybotCookiebotDialog');
-                        if (cookiebot) cookiebot.remove();
-                        
-                        const cookieBanner = document.querySelector('.CookieDeclaration');
-                        if (cookieBanner) cookieBanner.remove();
-                        
-                        const possibleSelectors = [
-                            '#CybotCookiebotDialogBodyUnderlay',
-                            '.cookiebot-overlay',
-                            '[class*="cookie-notice"]',
-                            '[class*="cookie-banner"]',
-                            '[id*="cookie-banner"]',
-                            '[id*="cookie-notice"]'
-                        ];
-                        
-                        possibleSelectors.forEach(selector => {
-                            const elements = document.querySelectorAll(selector);
-                            elements.forEach(el => el.remove());
-                        });
-                        
-                        window.CookieConsent = {
-                            consent: {
-                                stamp: '0',
-                                necessary: true,
-                                preferences: true,
-                                statistics: true,
-                                marketing: true
-                            }
-                        };
-                    }""")
-                    
-                    # 获取内容
-                    content = await page.content()
-                    
-                    if not content:
-                        self.logger.error("获取到的页面内容为空")
-                        return None
-                        
-                    self.logger.debug(f"页面内容长度: {len(content)}")
-                    
-                    # 解析内容
-                    soup = BeautifulSoup(content, "lxml")
-                    
-                    if not soup.find():
-                        self.logger.error("BeautifulSoup解析结果为空")
-                        return None
-                        
-                    return soup
-                    
-                except Exception as e:
-                    self.logger.error(f"处理页面时发生错误: {str(e)}")
-                    self.logger.debug("异常详情: ", exc_info=True)
+            # 先取限流令牌再占用浏览器槽位（带熔断和重试），页面脚本执行前写入cookie同意状态
+            pages, page, response = await self.open_local(url, FETCH_CONTEXT, "networkidle", None, deadline)
+            self.logger.debug("页面已打开")
+            try:
+                # 等待页面加载
+                with self.metrics.span("fetch.wait", page=kind):
+                    await page.wait_for_load_state(
+                        "domcontentloaded", timeout=self.timeouts.timeout_ms(kind, deadline, "domcontentloaded")
+                    )
+                    await asyncio.sleep(min(2, deadline.remaining()))
+
+                # 移除cookie弹窗
+                await page.evaluate(REMOVE_BANNERS_SCRIPT)
+
+                # 获取内容
+                content = await page.content()
+
+                if not content:
+                    self.logger.error("获取到的页面内容为空")
                     return None
-                finally:
-                    # 关闭所有资源
-                    await page.close()
-                    await context.close()
-                    await browser.close()
-                    self.logger.debug("已关闭所有浏览器资源")
-                    
+
+                self.logger.debug("页面内容长度: %s", len(content))
+                self.metrics.inc("bytes_fetched", len(content.encode("utf-8")), page=kind)
+
+                return content, response.headers
+
+            except Exception as e:
+                self.logger.error("处理页面时发生错误: %s", e)
+                self.logger.debug("异常详情: ", exc_info=True)
+                return None
+            finally:
+                # 关闭页面资源并归还浏览器槽位，浏览器保持运行供后续请求复用
+                await pages.aclose()
+                self.logger.debug("已关闭页面资源")
+
         except Exception as e:
-            self.logger.error(f"请求或解析页面时发生错误: {str(e)}")
+            self.logger.error("请求或解析页面时发生错误: %s", e)
             self.logger.debug("异常详情: ", exc_info=True)
             return None
 
+    async def _fetch_remote(self, url, deadline: Deadline):
+        """在浏览器工作进程中获取页面，返回值与 _fetch_page_content 相同"""
+        try:
+            self.logger.info("正在请求URL: %s (工作进程)", url)
+            job, page = await self.open_remote("fetch", url, {}, deadline)
+            await job.aclose()
+            content = zlib.decompress(page["html"]).decode("utf-8")
+            if not content:
+                self.logger.error("获取到的页面内容为空")
+                return None
+            self.metrics.inc("bytes_fetched", len(content.encode("utf-8")), page=page_type(url))
+            return content, page["headers"]
+        except Exception as e:
+            self.logger.error("请求或解析页面时发生错误: %s", e)
+            self.logger.debug("异常详情: ", exc_info=True)
+            return None
+
+    def get_cache_policy(self, key):
+        """获取某个缓存键的策略，配置中的 cache_policy 可按指令覆盖默认值"""
+        # team:<ID> 这类按对象区分的键共用同一个策略
+        name = key.split(":", 1)[0]
+        policy = dict(CACHE_POLICIES.get(name, DEFAULT_CACHE_POLICY))
+        overrides = (self.config.get("cache_policy") or {}).get(name) or {}
+        policy.update({k: v for k, v in overrides.items() if v is not None})
+        return policy
+
+    async def get_cached(self, key, url, render, region=None):
+        """获取经过缓存的页面渲染结果，返回 (结果, 过期说明或None)
+
+        - 缓存未过期时直接返回；
+        - 过期但未超过最大过期时长时，立即返回旧数据，并由唯一的后台任务刷新（stale-while-revalidate）；
+        - 超过最大过期时长或没有缓存时，等待刷新完成；HLTV 熔断中或刷新失败时退回旧数据。
+        过期说明为 Staleness，记录旧数据的获取时间和原因，由 with_freshness 转成提示。
+        刷新时若内容指纹未变化则跳过解析和渲染，只刷新时间戳。
+        render 接收 BeautifulSoup 对象，返回 None 表示解析失败。
+        """
+        policy = self.get_cache_policy(key)
+        entry = self.page_cache.get(key)
+        if entry:
+            age = entry.age()
+            if age < policy["ttl"]:
+                self.page_cache.stats["hits"] += 1
+                return entry.value, None
+            if policy["swr"] and age < policy["ttl"] + policy["max_stale"]:
+                self.page_cache.stats["stale_hits"] += 1
+                self.refresh_cached(key, url, render, region)
+                return entry.value, entry.stale(STALE_REFRESHING)
+            # HLTV 不可用（熔断中）时不再等待，直接返回旧数据
+            if self.breakers.get(page_type(url)).is_open():
+                self.page_cache.stats["stale_hits"] += 1
+                return entry.value, entry.stale(STALE_UNAVAILABLE)
+
+        value = await asyncio.shield(self.refresh_cached(key, url, render, region))
+        if value is None and entry:
+            # 刷新失败时退回旧数据，总比没有结果好
+            self.page_cache.stats["stale_hits"] += 1
+            return entry.value, entry.stale(STALE_FAILED)
+        return value, None
+
+    def refresh_cached(self, key, url, render, region=None):
+        """启动（或复用进行中的）缓存刷新任务，同一个键同时只有一个刷新任务"""
+        task = self._refresh_tasks.get(key)
+        if task and not task.done():
+            return task
+        task = asyncio.get_running_loop().create_task(self._refresh_cached(key, url, render, region))
+        self._refresh_tasks[key] = task
+
+        def _forget(done_task):
+            if self._refresh_tasks.get(key) is done_task:
+                del self._refresh_tasks[key]
+
+        task.add_done_callback(_forget)
+        return task
+
+    async def _refresh_cached(self, key, url, render, region=None):
+        try:
+            fetched = await self.fetch_page_content(url)
+            if not fetched:
+                return None
+            content, headers = fetched
+
+            fingerprint = region_fingerprint(content, region)
+            if self.page_cache.is_unchanged(key, fingerprint, headers):
+                self.logger.debug("页面内容未变化，跳过解析: %s", key)
+                return self.page_cache.touch(key).value
+
+            with self.metrics.span("parse", page=page_type(url)):
+                soup = BeautifulSoup(content, "lxml")
+            with self.metrics.span("render", key=key):
+                value = render(soup)
+            if value is None:
+                return None
+            self.page_cache.store(key, fingerprint, headers, value)
+            self.logger.debug("页面内容已变化，重新解析: %s", key)
+            return value
+        except Exception as e:
+            self.logger.error("刷新缓存 %s 失败: %s", key, e)
+            self.logger.debug("异常详情: ", exc_info=True)
+            return None
+
+    @staticmethod
+    def with_freshness(text: str, stale):
+        """为过期数据添加数据时间和原因标记"""
+        if not stale:
+            return text
+        as_of = time.strftime("%H:%M", time.localtime(stale.fetched_at))
+        return f"{text}\n🕒 数据截至 {as_of}，{STALE_NOTES[stale.reason]}"
+
     async def get_all_teams(self):
         """获取所有队伍信息并保存到文件"""
+        # 已加载过则直接返回，避免重复读取文件导致列表不断增长
+        if self.team_map:
+            return self.team_map
+        async with self._teams_lock:
+            if self.team_map:
+                return self.team_map
+            return await self._load_all_teams()
+
+    async def _load_all_teams(self):
         try:
             # 如果有缓存文件，先尝试读取
             if os.path.exists(self.teams_file):
@@ -266,26 +644,22 @@ class HLTVQuery(Star):
                         for line in f:
                             try:
                                 team_id, team_name, team_url = line.strip().split('|')
-                                team_info = {
-                                    'id': int(team_id),
-                                    'name': team_name,
-                                    'url': team_url
-                                }
-                                self.team_map.append(team_info)
+                                self.team_map.append(TeamRecord(team_id, team_name, team_url.rstrip("/").rsplit("/", 1)[-1]))
                             except Exception as e:
-                                self.logger.error(f"解析缓存行出错: {str(e)}")
+                                self.logger.error("解析缓存行出错: %s", e)
                                 continue
-                    self.logger.info(f"从缓存读取了 {len(self.team_map)} 支战队的信息")
+                    self.logger.info("从缓存读取了 %s 支战队的信息", len(self.team_map))
+                    self.index_teams()
                     return self.team_map
                 except Exception as e:
-                    self.logger.error(f"读取缓存文件失败: {str(e)}")
+                    self.logger.error("读取缓存文件失败: %s", e)
                     # 如果读取失败，清空列表以便重新获取
                     self.team_map = []
 
             # 如果没有缓存或读取失败，从网站获取
             if not self.team_map:
                 self.logger.info("正在从HLTV获取所有战队信息...")
-                teams_page = await self.get_parsed_page("https://www.hltv.org/stats/teams?minMapCount=0")
+                teams_page = await self.get_parsed_page(f"{self.base_url}/stats/teams?minMapCount=0")
                 if not teams_page:
                     self.logger.error("获取战队列表失败")
                     return []
@@ -294,41 +668,391 @@ class HLTVQuery(Star):
                 with open(self.teams_file, 'w', encoding='utf-8') as f:
                     for team in teams_page.find_all("td", {"class": ["teamCol-teams-overview"]}):
                         try:
-                            team_id = int(team.find("a")["href"].split("/")[-2])
-                            team_name = team.find("a").text.strip()
-                            team_url = "https://hltv.org" + team.find("a")["href"]
-                            
-                            # 保存到内存
-                            team_info = {
-                                'id': team_id,
-                                'name': team_name,
-                                'url': team_url
-                            }
+                            link = team.find("a")
+                            team_info = TeamRecord.from_href(link["href"], link.text)
                             self.team_map.append(team_info)
                             
-                            # 写入文件
-                            f.write(f"{team_id}|{team_name}|{team_url}\n")
-                            self.logger.debug(f"添加并保存战队: {team_name} (ID: {team_id})")
+                            # 写入文件（沿用 ID|名称|链接 的格式）
+                            f.write(f"{team_info.id}|{team_info.name}|{self.base_url}{team_info.url}\n")
+                            self.item_logger.debug("team", "添加并保存战队: %s (ID: %s)", team_info.name, team_info.id)
                         except Exception as e:
-                            self.logger.error(f"解析战队信息失败: {str(e)}")
+                            self.logger.error("解析战队信息失败: %s", e)
                             continue
                             
-                self.logger.info(f"成功获取并保存 {len(self.team_map)} 支战队的信息")
+                self.logger.info("成功获取并保存 %s 支战队的信息", len(self.team_map))
+                self.index_teams()
                 
             return self.team_map
             
         except Exception as e:
-            self.logger.error(f"获取战队列表时发生错误: {str(e)}")
+            self.logger.error("获取战队列表时发生错误: %s", e)
             self.logger.debug("异常详情: ", exc_info=True)
             return []
 
+    async def push_message(self, sessions, text: str):
+        """向多个会话主动推送消息"""
+        for session in sessions:
+            try:
+                await self.context.send_message(session, MessageChain().message(text))
+            except Exception as e:
+                self.logger.error("向会话 %s 推送消息失败: %s", session, e)
+
+    async def terminate(self):
+        """插件卸载时停止后台任务并关闭浏览器"""
+        for task in (self._warmup_task, self._metrics_dump_task, self._backfill_task):
+            if task and not task.done():
+                task.cancel()
+        await self.live_tracker.stop()
+        await self.memory_diagnostics.stop()
+        self.flush_stores()
+        if self.worker_pool:
+            await self.worker_pool.close()
+        await self.browser_manager.close()
+
+    def remember_players(self, players):
+        """将见过的选手加入本地索引，有变化时延迟写盘"""
+        try:
+            if self.player_index.add_many(players):
+                self.schedule_save(self.player_index)
+        except Exception as e:
+            self.logger.error("更新选手索引失败: %s", e)
+
+    def schedule_save(self, store):
+        """store 有变化后延迟 STORE_SAVE_DELAY 秒写盘，期间的变化合并为一次写入；没有事件循环时立即写"""
+        if store in self._pending_saves:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            store.save()
+            return
+        self._pending_saves[store] = loop.call_later(STORE_SAVE_DELAY, self.flush_store, store)
+
+    def flush_store(self, store):
+        """立即写入一份本地数据，取消等待中的延迟写盘"""
+        handle = self._pending_saves.pop(store, None)
+        if handle is not None:
+            handle.cancel()
+        try:
+            store.save()
+        except Exception as e:
+            self.logger.error("保存本地数据失败: %s", e)
+
+    def flush_stores(self):
+        """写入所有等待写盘的本地数据，插件卸载时调用"""
+        for store in list(self._pending_saves):
+            self.flush_store(store)
+
+    def index_teams(self):
+        """按小写名称索引 team_map，只在加载战队列表后构建一次
+
+        小写名称相同时保留列表中先出现的战队（统计页中排在前面的一支），后出现的记一条调试日志。
+        """
+        index = {}
+        for team in self.team_map:
+            kept = index.setdefault(team.name.lower(), team)
+            if kept is not team:
+                self.logger.debug("战队名 %s 重名，保留 ID %s，忽略 ID %s", team.name, kept.id, team.id)
+        self.team_index = index
+
+    async def find_team(self, team_name: str):
+        """按名称查找战队，返回 TeamRecord 或 None"""
+        await self.get_all_teams()
+        return self.team_index.get(team_name.lower())
+
+    async def resolve_team_name(self, team_name: str):
+        """把用户输入解析为战队列表中的正式名称
+
+        完全匹配（忽略大小写、重音和符号）优先，其次是唯一的包含匹配；无法确定时返回 None。
+        """
+        try:
+            team = await self.find_team(team_name)
+            if team:
+                return team.name
+            key = fold_text(team_name)
+            if not key:
+                return None
+            teams = await self.get_all_teams()
+        except Exception as e:
+            self.logger.error("解析战队名称失败: %s", e)
+            return None
+        exact = {team.name for team in teams if fold_text(team.name) == key}
+        if exact:
+            return exact.pop() if len(exact) == 1 else None
+        candidates = {team.name for team in teams if key in fold_text(team.name)}
+        return candidates.pop() if len(candidates) == 1 else None
+
     async def find_team_id(self, team_name: str):
         """查找队伍ID"""
-        teams = await self.get_all_teams()
-        for team in teams:
-            if team['name'].lower() == team_name.lower():
-                return team['id']
-        return None
+        team = await self.find_team(team_name)
+        return team.id if team else None
+
+    async def warmup(self):
+        """后台预热：启动共享浏览器、加载战队索引并预取常用列表页"""
+        started = time.time()
+        steps = [
+            ("启动共享浏览器", self.worker_pool.start if self.worker_pool else self.browser_manager.start),
+            ("加载战队索引", self.get_all_teams),
+            ("预取世界排名", lambda: self.get_cached(
+                "ranking", f"{self.base_url}/ranking/teams/", self.render_top_teams,
+                region=PAGE_REGIONS["ranking"])),
+            ("预取近期比赛", self.get_schedule),
+            ("预取比赛结果", lambda: self.get_cached(
+                "results", f"{self.base_url}/results/", self.render_results,
+                region=PAGE_REGIONS["results"])),
+            ("预取TOP选手", self.get_top_players_cached),
+        ]
+        for idx, (name, step) in enumerate(steps, 1):
+            step_started = time.time()
+            try:
+                await step()
+                self.logger.info("预热 [%s/%s] %s 完成，耗时 %.2f秒", idx, len(steps), name, time.time() - step_started)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.logger.error("预热 [%s/%s] %s 失败: %s", idx, len(steps), name, e)
+        self.ready = True
+        self.logger.info("插件预热完成，总耗时 %.2f秒", time.time() - started)
+
+    def browser_memory(self):
+        """浏览器进程树的常驻内存（字节）和按原因统计的回收次数，使用工作进程时为所有进程之和"""
+        if not self.worker_pool:
+            return self.browser_manager.rss or 0, dict(self.browser_manager.recycles)
+        rss, recycles = 0, {}
+        for state in self.worker_pool.snapshot().values():
+            rss += state["browser_rss"] or 0
+            for reason, count in state["recycles"].items():
+                recycles[reason] = recycles.get(reason, 0) + count
+        return rss, recycles
+
+    def _cache_hit_ratio(self) -> float:
+        stats = self.page_cache.stats
+        served = stats["hits"] + stats["stale_hits"]
+        total = served + stats["changed"] + stats["unchanged"]
+        return served / total if total else 0.0
+
+    async def _dump_metrics_loop(self):
+        path = self.config.get("metrics_file")
+        interval = max(5, self.config.get("metrics_dump_interval", 60))
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                self.metrics.dump_prometheus(path)
+            except Exception as e:
+                self.logger.error("写入指标文件失败: %s", e)
+
+    async def open_local(self, url: str, options: dict, wait_until: str = "networkidle", settle_state: str = None,
+                         deadline: Deadline = None):
+        """在共享浏览器中打开页面并导航，限流、熔断和统一重试策略与 open_remote 相同
+
+        每次尝试都先取限流令牌再占用浏览器槽位，失败后关闭页面、归还槽位再按重试策略重来，
+        限流退避期间不会有空闲的页面占着槽位。settle_state 不为空时，导航后还会等待该加载状态。
+        每一步的超时按页面类型的近期加载耗时计算，且不超过 deadline 的剩余时间。
+        返回 (资源栈, 页面, 响应)，调用方用完后 await 资源栈.aclose() 关闭页面并归还槽位；
+        失败时抛出 FetchError / CircuitOpenError / DeadlineExceeded 或 playwright 的异常。
+        """
+        kind = page_type(url)
+
+        async def attempt():
+            await self.throttle(url, deadline)
+            pages = AsyncExitStack()
+            try:
+                browser = await pages.enter_async_context(self.browser_manager.acquire())
+                context, page = await open_page(
+                    self.browser_manager, browser, options, timeout=self.timeouts.timeout_ms(kind, deadline)
+                )
+                pages.push_async_callback(close_page, context, page)
+                started = time.monotonic()
+                with self.metrics.span("fetch.navigate", page=kind):
+                    response = await page.goto(
+                        url, wait_until=wait_until, timeout=self.timeouts.timeout_ms(kind, deadline, "goto")
+                    )
+                self.report_response(response)
+                if response is not None and response.status == 403:
+                    # 多半是 Cloudflare 拒绝了保存的凭据，丢弃后由下一个上下文重新验证
+                    self.browser_manager.discard_storage()
+                if response is None or response.status >= 400:
+                    status = response.status if response else None
+                    self.metrics.inc("fetch.http_errors", page=kind, status=status)
+                    raise FetchError(status, url)
+                if settle_state:
+                    with self.metrics.span("fetch.wait", page=kind):
+                        await page.wait_for_load_state(
+                            settle_state, timeout=self.timeouts.timeout_ms(kind, deadline, settle_state)
+                        )
+                self.timeouts.observe(kind, time.monotonic() - started)
+                await self.browser_manager.save_storage(page.context)
+            except BaseException:
+                await pages.aclose()
+                raise
+            return pages, page, response
+
+        return await self.retry_policy.run(
+            attempt, breaker=self.breakers.get(kind), on_retry=self.retry_logger(url), deadline=deadline
+        )
+
+    async def open_remote(self, job: str, url: str, payload: dict, deadline: Deadline):
+        """在浏览器工作进程中打开页面，限流、熔断、重试和超时与 navigate 相同
+
+        返回 (任务, 页面片段)：页面片段含 status、headers 和压缩后的 html，
+        任务是工作进程片段的异步迭代器（截图等），调用方用完后负责 aclose()。
+        """
+        kind = page_type(url)
+
+        async def attempt():
+            await self.throttle(url, deadline)
+            limits = {"timeout": self.timeouts.timeout_ms(kind, deadline, "goto"), "deadline": deadline.remaining()}
+            job_parts = self.worker_pool.run(job, dict(payload, url=url, **limits), timeout=deadline.remaining())
+            try:
+                with self.metrics.span("fetch.navigate", page=kind):
+                    page = await job_parts.__anext__()
+                status = page["status"]
+                self.report_status(status, page["headers"])
+                if status is None or status >= 400:
+                    self.metrics.inc("fetch.http_errors", page=kind, status=status)
+                    raise FetchError(status, url)
+            except BaseException:
+                await job_parts.aclose()
+                raise
+            self.timeouts.observe(kind, page["elapsed"])
+            return job_parts, page
+
+        return await self.retry_policy.run(
+            attempt, breaker=self.breakers.get(kind), on_retry=self.retry_logger(url), deadline=deadline
+        )
+
+    def retry_logger(self, url: str):
+        kind = page_type(url)
+
+        def on_retry(attempt_no, error, delay):
+            self.metrics.inc("fetch.retries", page=kind)
+            self.logger.warning("第 %s 次访问 %s 失败: %s，%.1f 秒后重试", attempt_no, url, error, delay)
+        return on_retry
+
+    async def throttle(self, url: str, deadline: Deadline = None):
+        """出站请求前经过令牌桶限流，突发请求会被排队并间隔开
+
+        最多等到 deadline，在截止时间前拿不到令牌（如 429 退避中）时抛出 DeadlineExceeded。
+        """
+        kind = page_type(url)
+        try:
+            waited = await self.rate_limiter.acquire(kind, timeout=deadline.remaining() if deadline else None)
+        except asyncio.TimeoutError:
+            self.metrics.inc("ratelimit.timeouts", page=kind)
+            raise DeadlineExceeded(f"等待限流: {url}")
+        self.metrics.observe("ratelimit.wait", waited, page=kind)
+
+    def report_response(self, response):
+        """将响应状态反馈给限流器，429/403 时自适应退避"""
+        if response is None:
+            return
+        self.report_status(response.status, response.headers)
+
+    def report_status(self, status, headers):
+        if status is None:
+            return
+        self.rate_limiter.report(status, headers.get("retry-after"))
+        if status in (403, 429):
+            self.metrics.inc("ratelimit.throttled", status=status)
+
+    def selector_miss(self, selector: str):
+        """记录页面结构解析失败的选择器，HLTV改版时可据此定位"""
+        self.metrics.inc("selector_errors", selector=selector)
+
+    def compose_screenshots(self, image_paths, width, merged_path):
+        """将多张截图缩放到相同宽度后纵向拼接并保存"""
+        with self.metrics.span("merge"):
+            images = []
+            for img_path, _ in image_paths:
+                try:
+                    with PILImage.open(img_path) as img:
+                        img_width, img_height = img.size
+                        new_height = int(img_height * width / img_width)
+                        images.append(img.resize((width, new_height), PILImage.Resampling.LANCZOS))
+                except Exception as e:
+                    self.logger.error("处理图片 %s 时出错: %s", img_path, e)
+
+            merged_image = PILImage.new('RGB', (width, max(1, sum(img.height for img in images))), 'white')
+            current_height = 0
+            for img in images:
+                merged_image.paste(img, (0, current_height))
+                current_height += img.height
+            merged_image.save(merged_path)
+            self.logger.debug("已合并 %s 张图片，尺寸: %s", len(images), merged_image.size)
+        return merged_path
+
+    async def iter_screenshots(self, page, sections, base_filename: str, kind: str, deadline: Deadline = None):
+        """按顺序截取页面各区域，每截好一张就产出 (说明, 图片路径)，找不到的区域跳过
+
+        sections 为 [(文件后缀, 选择器, 说明, 是否等待元素出现)]。
+        等待元素和截图的超时按页面类型计算，超过 deadline 时抛出 DeadlineExceeded。
+        """
+        for suffix, selector, caption, wait in sections:
+            element = await find_section(
+                page, selector, wait, timeout=self.timeouts.timeout_ms(kind, deadline, selector)
+            )
+            if not element:
+                self.selector_miss(selector)
+                continue
+            image_path = os.path.join(self.screenshot_dir, f"{base_filename}_{suffix}.png")
+            screenshot_timeout = self.timeouts.timeout_ms(kind, deadline, selector)
+            try:
+                with self.metrics.span("screenshot", page=kind):
+                    await element.screenshot(path=image_path, timeout=screenshot_timeout)
+            except Exception as e:
+                self.logger.warning("截取元素 %s 失败: %s", selector, e)
+                continue
+            yield caption, image_path
+
+    async def capture(self, url: str, sections, base_filename: str, kind: str, settle: float = 3,
+                      deadline: Deadline = None):
+        """打开详情页并截图：先产出 ("html", 页面内容)，再每截好一张产出 ("image", (说明, 图片路径))
+
+        导航失败或超过 deadline（默认 request_deadline 秒）时抛出异常；
+        配置了浏览器工作进程时在工作进程中完成，截图数据传回后写入截图目录。
+        """
+        deadline = deadline or self.new_deadline()
+        if self.worker_pool:
+            async for item in self._capture_remote(url, sections, base_filename, settle, deadline):
+                yield item
+            return
+        pages, page, _ = await self.open_local(url, CAPTURE_CONTEXT, "domcontentloaded", "networkidle", deadline)
+        try:
+            await prepare_capture(page, min(settle, deadline.remaining()))
+            yield "html", await page.content()
+            async for image in self.iter_screenshots(page, sections, base_filename, kind, deadline):
+                yield "image", image
+        finally:
+            await pages.aclose()
+
+    async def _capture_remote(self, url: str, sections, base_filename: str, settle: float, deadline: Deadline):
+        captions = {suffix: caption for suffix, _, caption, _ in sections}
+        job, page = await self.open_remote("capture", url, {
+            "sections": [(suffix, selector, wait) for suffix, selector, _, wait in sections],
+            "settle": settle,
+        }, deadline)
+        try:
+            yield "html", zlib.decompress(page["html"]).decode("utf-8")
+            async for part in job:
+                if "missing" in part:
+                    self.selector_miss(part["missing"])
+                    continue
+                image_path = os.path.join(self.screenshot_dir, f"{base_filename}_{part['suffix']}.png")
+                with open(image_path, "wb") as f:
+                    f.write(part["png"])
+                yield "image", (captions[part["suffix"]], image_path)
+        finally:
+            await job.aclose()
+
+    def remove_file(self, path: str):
+        try:
+            os.remove(path)
+        except Exception as e:
+            self.logger.debug("删除临时文件失败: %s", e)
+
+    def loading_hint(self) -> str:
+        """插件尚未预热完成时的提示"""
+        return "" if self.ready else "（插件正在预热，首次查询可能较慢）"
 
     @filter.command("hltv_help")
     async def show_help(self, event: AstrMessageEvent):
@@ -342,6 +1066,11 @@ class HLTVQuery(Star):
                 "desc": "查询HLTV世界排名前5的战队,含阵容信息",
                 "usage": "/top5战队"
             },
+            "排名变化": {
+                "command": "/排名变化 [数量|战队名称]",
+                "desc": "世界排名相对上周的名次、积分变化和连续升降周数，带战队名时显示该战队近8周走势",
+                "usage": "/排名变化 Vitality"
+            },
             "战队信息": {
                 "command": "/战队信息 [战队名称]",
                 "desc": "查询指定战队的详细统计数据",
@@ -351,17 +1080,56 @@ class HLTVQuery(Star):
         
         match_commands = {
             "近期比赛": {
-                "command": "/近期比赛",
-                "desc": "查询HLTV近期即将进行的比赛(10场)",
-                "usage": "/近期比赛"
+                "command": "/近期比赛 [页码]",
+                "desc": "分页查询HLTV近期即将进行的比赛，输入 下一页/上一页 翻页",
+                "usage": "/近期比赛 2"
+            },
+            "战队赛程": {
+                "command": "/战队赛程 [战队名称]",
+                "desc": "查询指定战队接下来的比赛，时间为本地时间",
+                "usage": "/战队赛程 Vitality"
+            },
+            "今日比赛": {
+                "command": "/今日比赛",
+                "desc": "查询今天（本地时间）的全部比赛",
+                "usage": "/今日比赛"
             },
             "比赛结果": {
-                "command": "/比赛结果",
-                "desc": "查询HLTV近期比赛结果(10场)\n在30秒内输入比赛a-e可查看详细数据",
-                "usage": "/比赛结果"
+                "command": "/比赛结果 [页码]",
+                "desc": "分页查询HLTV近期比赛结果，输入 下一页/上一页 翻页\n"
+                        "输入 比赛 <比赛ID> 可查看详细数据，输入 比赛 全部 可查看本页全部比赛的数据",
+                "usage": "/比赛结果 2"
+            },
+            "交手记录": {
+                "command": "/交手记录 [战队A] [战队B]",
+                "desc": "查询两支战队最近的交手记录，数据来自本地比赛历史",
+                "usage": "/交手记录 Vitality MOUZ"
+            },
+            "近期状态": {
+                "command": "/近期状态 [战队名称]",
+                "desc": "查询战队最近10场战绩、连胜连败和近30天胜率",
+                "usage": "/近期状态 Vitality"
             }
         }
         
+        subscribe_commands = {
+            "订阅": {
+                "command": "/订阅 [战队名称]",
+                "desc": "订阅战队的直播比赛，比赛开始、每张地图结束及终场时自动推送",
+                "usage": "/订阅 Natus Vincere"
+            },
+            "取消订阅": {
+                "command": "/取消订阅 [战队名称]",
+                "desc": "取消对战队的订阅",
+                "usage": "/取消订阅 Natus Vincere"
+            },
+            "我的订阅": {
+                "command": "/我的订阅",
+                "desc": "查看当前会话订阅的战队",
+                "usage": "/我的订阅"
+            }
+        }
+
         player_commands = {
             "top选手": {
                 "command": "/top选手",
@@ -396,6 +1164,13 @@ class HLTVQuery(Star):
             help_text += f"  💡 说明: {info['desc']}\n"
             help_text += f"  📝 用法: {info['usage']}\n\n"
         
+        # 订阅相关指令
+        help_text += "🔔 比赛订阅\n" + "─" * 20 + "\n"
+        for cmd, info in subscribe_commands.items():
+            help_text += f"📍 {info['command']}\n"
+            help_text += f"  💡 说明: {info['desc']}\n"
+            help_text += f"  📝 用法: {info['usage']}\n\n"
+        
         help_text += "📌 提示：\n"
         help_text += "• 所有命令前都需要加'/'符号\n"
         help_text += "• 部分查询可能需要一定时间，请耐心等待\n"
@@ -404,555 +1179,1044 @@ class HLTVQuery(Star):
         
         yield event.plain_result(help_text)
 
+    @filter.permission_type(filter.PermissionType.ADMIN)
+    @filter.command("hltv_stats")
+    async def show_metrics(self, event: AstrMessageEvent):
+        """查看插件运行指标（仅管理员）"""
+        result = "📈 HLTV 插件运行指标\n" + "═" * 30 + "\n" + self.metrics.summary()
+        metrics_file = self.config.get("metrics_file")
+        if metrics_file:
+            try:
+                self.metrics.dump_prometheus(metrics_file)
+                result += f"\n\n💾 已写入 {metrics_file}"
+            except Exception as e:
+                self.logger.error("写入指标文件失败: %s", e)
+        yield event.plain_result(result)
+
+    @filter.permission_type(filter.PermissionType.ADMIN)
+    @filter.command("hltv_profile")
+    async def profile_command(self, event: AstrMessageEvent):
+        """剖析指定指令接下来的 N 次执行（仅管理员）
+
+        /hltv_profile 比赛详情 3   剖析接下来 3 次 比赛详情
+        /hltv_profile 关闭 [指令]   取消剖析
+        /hltv_profile             查看当前状态
+        """
+        words = re.sub(r"^\S*hltv_profile\s*", "", (event.message_str or "").strip()).split()
+        if not words:
+            result = "🔬 指令剖析\n" + "═" * 30 + "\n"
+            if self.profiler.armed:
+                for name, (remaining, _) in self.profiler.armed.items():
+                    result += f"• {name}: 还剩 {remaining} 次\n"
+            else:
+                result += "当前没有开启剖析的指令\n"
+            recent = self.profiler.recent_files()
+            if recent:
+                result += "\n💾 最近的剖析文件:\n" + "\n".join(f"• {name}" for name in recent) + "\n"
+            result += "\n💡 用法: /hltv_profile <指令名> [次数]，/hltv_profile 关闭 [指令名]"
+            yield event.plain_result(result)
+            return
+
+        if words[0] == "关闭":
+            closed = self.profiler.disarm(words[1] if len(words) > 1 else None)
+            yield event.plain_result(f"✅ 已关闭剖析: {', '.join(closed)}" if closed else "📭 没有需要关闭的剖析")
+            return
+
+        name = words[0]
+        if name not in COMMAND_NAMES:
+            yield event.plain_result(f"❌ 未知指令 {name}，可剖析的指令: {', '.join(sorted(COMMAND_NAMES))}")
+            return
+        count = min(max(parse_int(words[1], 1), 1), 20) if len(words) > 1 else 1
+        self.profiler.arm(name, count, event.unified_msg_origin)
+        yield event.plain_result(f"✅ 将剖析 {name} 接下来的 {count} 次执行，每次结束后把结果发到这里")
+
+    @filter.permission_type(filter.PermissionType.ADMIN)
+    @filter.command("hltv_memory")
+    async def memory_command(self, event: AstrMessageEvent):
+        """内存诊断（仅管理员）
+
+        /hltv_memory 开启   开始 tracemalloc 追踪，当前会话接收增长告警
+        /hltv_memory 关闭   停止追踪
+        /hltv_memory [数量] 查看增长最多的分配位置
+        """
+        argument = re.sub(r"^\S*hltv_memory\s*", "", (event.message_str or "").strip())
+        diagnostics = self.memory_diagnostics
+        if argument == "开启":
+            diagnostics.start()
+            diagnostics.sessions.add(event.unified_msg_origin)
+            yield event.plain_result(
+                f"✅ 已开启内存诊断，每 {diagnostics.interval:g} 秒拍摄一次快照，第一次快照作为基线；"
+                "增长超过阈值时会在这里告警"
+            )
+            return
+        if argument == "关闭":
+            await diagnostics.stop()
+            diagnostics.sessions.clear()
+            yield event.plain_result("✅ 已关闭内存诊断")
+            return
+        if not diagnostics.tracing:
+            yield event.plain_result("📭 内存诊断未开启，输入 /hltv_memory 开启 开始追踪")
+            return
+        try:
+            limit = min(max(parse_int(argument, 10), 1), 30)
+            yield event.plain_result(await diagnostics.report(limit))
+        except Exception as e:
+            self.logger.error("生成内存诊断报告失败: %s", e)
+            yield event.plain_result(f"❌ 生成内存诊断报告失败: {e}")
+
     @filter.command("top5战队")
+    @timed_command("top5战队")
     async def query_top_teams(self, event: AstrMessageEvent):
         """查询HLTV世界排名前5的战队"""
-        yield event.plain_result("🔍 正在查询HLTV世界排名，请稍候...")
+        yield event.plain_result(f"🔍 正在查询HLTV世界排名，请稍候...{self.loading_hint()}")
         
         try:
-            page = await self.get_parsed_page("https://www.hltv.org/ranking/teams/")
-            if not page:
+            result, stale = await self.get_cached(
+                "ranking", f"{self.base_url}/ranking/teams/", self.render_top_teams,
+                region=PAGE_REGIONS["ranking"]
+            )
+            if not result:
                 yield event.plain_result("❌ 获取排名信息失败，请稍后重试")
                 return
-                
-            teams = page.find("div", {"class": "ranking"})
-            if not teams:
-                self.logger.error("未找到ranking div元素")
-                yield event.plain_result("❌ 解析排名信息失败")
-                return
-            
-            ranked_teams = teams.find_all("div", {"class": "ranked-team standard-box"})
-            if not ranked_teams:
-                self.logger.error("未找到ranked-team元素")
-                yield event.plain_result("❌ 未找到排名信息")
-                return
-            
-            result = "🏆 HLTV世界排名TOP5 🏆\n" + "═" * 30 + "\n"
-            for team in ranked_teams[:5]:
-                try:
-                    name_element = team.find('div', {"class": "ranking-header"}).select('.name')
-                    if not name_element:
-                        self.logger.error("未找到战队名称元素")
-                        continue
-                        
-                    name = name_element[0].text.strip()
-                    
-                    rank_element = team.select('.position')
-                    if not rank_element:
-                        self.logger.error("未找到排名元素")
-                        continue
-                        
-                    rank = rank_element[0].text.strip()
-                    
-                    points_element = team.find('span', {'class': 'points'})
-                    if not points_element:
-                        self.logger.error("未找到积分元素")
-                        continue
-                        
-                    points = points_element.text
-                    
-                    result += f"\n{'🥇' if rank == '1' else '🥈' if rank == '2' else '🥉' if rank == '3' else '🏅'} #{rank} {name}\n"
-                    result += f"📊 积分: {points}\n"
-                    
-                    # 添加队伍阵容信息
-                    players = []
-                    for player in team.find_all("td", {"class": "player-holder"}):
-                        player_img = player.find('img', {'class': 'playerPicture'})
-                        if player_img and player_img.get('title'):
-                            players.append(player_img['title'])
-                    
-                    if players:
-                        result += f"👥 阵容: {', '.join(players)}\n"
-                    result += "─" * 25 + "\n"
-                    
-                except Exception as e:
-                    self.logger.error(f"处理单个战队信息时出错: {str(e)}")
-                    continue
-            
-            if result == "🏆 HLTV世界排名TOP5 🏆\n" + "═" * 30 + "\n":
-                yield event.plain_result("❌ 解析排名信息失败，请稍后重试")
-            else:
-                yield event.plain_result(result)
+            yield event.plain_result(self.with_freshness(result, stale))
             
         except Exception as e:
-            self.logger.error(f"查询排名失败: {str(e)}")
+            self.logger.error("查询排名失败: %s", e)
             yield event.plain_result("❌ 查询排名信息失败，请稍后重试")
 
+    def render_top_teams(self, page):
+        """将排名页面渲染为TOP5文本，解析失败时返回None
+
+        完整排名同时记入排名历史，供 /排名变化 使用
+        """
+        entries = parse_ranking(page)
+        if entries is None:
+            self.logger.error("未找到ranking div元素")
+            self.selector_miss("div.ranking")
+            return None
+        if not entries:
+            self.logger.error("未找到ranked-team元素")
+            self.selector_miss("div.ranked-team")
+            return None
+
+        self.record_ranking(ranking_week(page), entries)
+        self.remember_players([
+            {'id': player_id, 'nickname': nickname}
+            for entry in entries for player_id, nickname in entry.lineup if player_id is not None
+        ])
+
+        result = "🏆 HLTV世界排名TOP5 🏆\n" + "═" * 30 + "\n"
+        for entry in entries[:5]:
+            medal = {1: '🥇', 2: '🥈', 3: '🥉'}.get(entry.rank, '🏅')
+            result += f"\n{medal} #{entry.rank} {entry.name}\n"
+            result += f"📊 积分: {entry.points}\n"
+            if entry.lineup:
+                result += f"👥 阵容: {', '.join(nickname for _, nickname in entry.lineup)}\n"
+            result += "─" * 25 + "\n"
+        return result
+
+    def record_ranking(self, week: str, entries):
+        """把一周的排名写入排名历史，延迟写盘"""
+        try:
+            if self.ranking_history.record(week, entries):
+                self.schedule_save(self.ranking_history)
+                self.logger.info("已记录 %s 的世界排名（%d 支战队）", week, len(entries))
+        except Exception as e:
+            self.logger.error("更新排名历史失败: %s", e)
+
+    @staticmethod
+    def format_movement(movement) -> str:
+        """一支战队的名次变化，如 ▲3 / ▼2 / ＝ / 🆕"""
+        if movement.rank_delta is None:
+            return "🆕"
+        if movement.rank_delta > 0:
+            return f"▲{movement.rank_delta}"
+        if movement.rank_delta < 0:
+            return f"▼{-movement.rank_delta}"
+        return "＝"
+
+    @staticmethod
+    def format_streak(movement) -> str:
+        """连续两周及以上同方向变化时的说明"""
+        if movement.streak < 2:
+            return ""
+        label = {1: "连升", -1: "连降", 0: "持平"}[movement.direction]
+        return f" 🔥{label}{movement.streak}周" if movement.direction == 1 else f" {label}{movement.streak}周"
+
+    def render_ranking_changes(self, limit: int) -> str:
+        history = self.ranking_history
+        result = f"📈 HLTV世界排名变化 ({history.latest}"
+        result += f" 对比 {history.weeks[-2]})\n" if len(history) > 1 else ")\n"
+        result += "═" * 30 + "\n"
+        for movement in history.movements[:limit]:
+            entry = movement.entry
+            points = f"{entry.points}分"
+            if movement.points_delta is not None:
+                points += f"({movement.points_delta:+d})"
+            result += f"#{entry.rank} {entry.name}  {self.format_movement(movement)}  {points}"
+            result += self.format_streak(movement) + "\n"
+        if len(history) < 2:
+            result += "\n💡 目前只记录了一周的排名，下周起可以看到变化"
+        return result
+
+    def render_team_ranking_history(self, entry) -> str:
+        movement = next(item for item in self.ranking_history.movements if item.entry is entry)
+        result = f"📈 {entry.name} 排名走势\n" + "═" * 30 + "\n"
+        result += f"当前: #{entry.rank}  {self.format_movement(movement)}{self.format_streak(movement)}\n\n"
+        for week, rank, points in reversed(self.ranking_history.team_history(entry.key)):
+            result += f"📅 {week}  " + (f"#{rank}  {points}分\n" if rank else "未上榜\n")
+        return result
+
+    @filter.command("排名变化")
+    @timed_command("排名变化")
+    async def query_ranking_changes(self, event: AstrMessageEvent):
+        """世界排名相对上周的名次、积分变化和连续升降周数"""
+        argument = re.sub(r"^\S*排名变化\s*", "", (event.message_str or "").strip())
+        try:
+            if not len(self.ranking_history):
+                # 还没有任何快照时抓取一次当前排名，之后只读本地历史
+                yield event.plain_result(f"🔍 正在获取HLTV世界排名，请稍候...{self.loading_hint()}")
+                await self.get_cached(
+                    "ranking", f"{self.base_url}/ranking/teams/", self.render_top_teams,
+                    region=PAGE_REGIONS["ranking"]
+                )
+                if not len(self.ranking_history):
+                    yield event.plain_result("❌ 获取排名信息失败，请稍后重试")
+                    return
+
+            if argument and not argument.isdigit():
+                entry = self.ranking_history.find(argument)
+                if not entry:
+                    yield event.plain_result(f"❌ 最新排名中没有找到战队 {argument}")
+                    return
+                yield event.plain_result(self.render_team_ranking_history(entry))
+                return
+
+            limit = min(max(int(argument), 1), 30) if argument else 10
+            yield event.plain_result(self.render_ranking_changes(limit))
+        except Exception as e:
+            self.logger.error("查询排名变化失败: %s", e)
+            yield event.plain_result("❌ 查询排名变化失败，请稍后重试")
+
     @filter.command("战队信息")
+    @timed_command("战队信息")
     async def query_team_info(self, event: AstrMessageEvent, *, team_name: str):
         """查询指定战队的信息"""
-        self.logger.info(f"收到战队信息查询请求: {team_name}")
-        yield event.plain_result(f"🔍 正在查询 {team_name} 的信息，请稍候...")
+        self.logger.info("收到战队信息查询请求: %s", team_name)
+        yield event.plain_result(f"🔍 正在查询 {team_name} 的信息，请稍候...{self.loading_hint()}")
         
         try:
-            team_id = await self.find_team_id(team_name)
-            if not team_id:
-                self.logger.warning(f"未找到战队: {team_name}")
+            team = await self.find_team(team_name)
+            if not team:
+                self.logger.warning("未找到战队: %s", team_name)
                 yield event.plain_result(f"❌ 未找到战队 {team_name} 的信息")
                 return
 
-            self.logger.info(f"找到战队ID: {team_id}, 正在获取详细信息")
-            page = await self.get_parsed_page(f"https://www.hltv.org/?pageid=179&teamid={team_id}")
-            
-            if not page:
-                self.logger.error("获取战队详情页面失败")
+            self.logger.info("找到战队ID: %s, 正在获取详细信息", team.id)
+            profile, stale = await self.get_team_profile(team)
+            if not profile:
+                self.logger.error("获取战队主页失败")
                 yield event.plain_result("❌ 获取战队信息失败，请稍后重试")
                 return
-            
-            # 获取战队名称
-            team_name = page.find("div", {"class": "context-item"})
-            if not team_name:
-                self.logger.error("无法找到战队名称元素")
-                yield event.plain_result("❌ 解析战队信息失败，请稍后重试")
+
+            yield event.plain_result(self.with_freshness(profile['text'], stale))
+
+            if not profile['card']:
+                yield event.plain_result("❌ 获取战队统计数据失败，请稍后重试")
                 return
-            team_name = team_name.text
+            message_chain = [
+                Plain(text=f"📊 {profile['name']} 战队统计数据：\n"),
+                Image(file=profile['card'])
+            ]
+            with self.metrics.span("upload", page="team"):
+                yield event.chain_result(message_chain)
             
-            # 获取战队统计信息
-            self.logger.info("正在解析战队统计数据")
-            team_stats = {}
-            stats_columns = page.find_all("div", {"class": "columns"})
-            for columns in stats_columns:
-                try:
-                    stats = columns.find_all("div", {"class": "col standard-box big-padding"})
-                    for stat in stats:
-                        stat_value = stat.find("div", {"class": "large-strong"}).text
-                        stat_title = stat.find("div", {"class": "small-label-below"}).text
-                        team_stats[stat_title] = stat_value
-                        self.logger.debug(f"统计数据: {stat_title} = {stat_value}")
-                except Exception as e:
-                    self.logger.error(f"解析统计数据时出错: {str(e)}")
-                    self.logger.debug("异常详情: ", exc_info=True)
+        except Exception as e:
+            self.logger.error("查询战队信息时发生未知错误: %s", e)
+            self.logger.debug("异常详情: ", exc_info=True)
+            yield event.plain_result("❌ 查询战队信息失败，请稍后重试")
 
-            # 获取当前阵容
-            self.logger.info("正在解析当前阵容信息")
-            current_lineup = []
-            for player in page.find_all("div", {"class": "col teammate"})[:5]:
-                try:
-                    name = player.find("img", {"class": "container-width"})["alt"].split("'")
-                    nickname = player.find("div", {"class": "text-ellipsis"}).text
-                    maps = re.search(r'\d+', player.find("div", {"class": "teammate-info standard-box"}).find("span").text).group()
-                    player_info = {
-                        "name": name[0].rstrip() + name[2],
-                        "nickname": nickname,
-                        "maps_played": maps
-                    }
-                    current_lineup.append(player_info)
-                    self.logger.debug(f"添加选手: {player_info}")
-                except Exception as e:
-                    self.logger.error(f"解析选手信息时出错: {str(e)}")
-                    self.logger.debug("异常详情: ", exc_info=True)
+    async def get_team_profile(self, team: TeamRecord):
+        """获取战队主页的文字信息和截图卡片，返回 (结果, 过期说明或None)
+
+        文字和截图来自同一次页面访问，结果按 team:<ID> 缓存，
+        同一支战队同时只有一个抓取任务；抓取失败时退回旧数据。
+        """
+        key = f"team:{team.id}"
+        policy = self.get_cache_policy(key)
+        entry = self.page_cache.get(key)
+        if entry and entry.value['card'] and not os.path.exists(entry.value['card']):
+            # 截图文件已被清理，缓存不再完整
+            self.page_cache.invalidate(key)
+            entry = None
+        if entry and entry.age() < policy["ttl"]:
+            self.page_cache.stats["hits"] += 1
+            return entry.value, None
+
+        task = self._refresh_tasks.get(key)
+        if not task or task.done():
+            task = asyncio.get_running_loop().create_task(self._refresh_team_profile(key, team))
+            self._refresh_tasks[key] = task
+
+            def _forget(done_task):
+                if self._refresh_tasks.get(key) is done_task:
+                    del self._refresh_tasks[key]
+
+            task.add_done_callback(_forget)
+        profile = await asyncio.shield(task)
+
+        if profile is None:
+            if entry:
+                self.page_cache.stats["stale_hits"] += 1
+                return entry.value, entry.stale(STALE_FAILED)
+            return None, None
+        return profile, None
+
+    async def _refresh_team_profile(self, key: str, team: TeamRecord):
+        """抓取战队主页并写入缓存
+
+        写缓存和删除旧卡片只在这个共享任务里做一次，等待同一任务的调用方拿到的是同一个只读结果
+        """
+        profile = await self.fetch_team_profile(team)
+        if profile is None:
+            return None
+        fingerprint = profile.pop('fingerprint')
+        previous = self.page_cache.get(key)
+        if previous and previous.value['card'] and previous.value['card'] != profile['card']:
+            try:
+                os.remove(previous.value['card'])
+            except OSError as e:
+                self.logger.debug("删除旧的战队卡片失败: %s", e)
+        self.page_cache.store(key, fingerprint, None, profile)
+        return profile
+
+    async def fetch_team_profile(self, team: TeamRecord):
+        """访问一次战队主页，同时解析文字信息并截取卡片"""
+        url = f"{self.base_url}/team/{team.id}/{team_slug(team)}"
+        base_filename = f"team_info_{team.id}_{int(time.time())}"
+        result = None
+        image_paths = []
+        try:
+            self.logger.info("准备访问URL: %s", url)
+            async for item_type, item in self.capture(url, TEAM_SECTIONS, base_filename, "team", settle=0):
+                if item_type == "image":
+                    image_paths.append((item[1], None))
                     continue
+                content = item
+                self.metrics.inc("bytes_fetched", len(content.encode("utf-8")), page="team")
+                with self.metrics.span("parse", page="team"):
+                    soup = BeautifulSoup(content, "lxml")
+                with self.metrics.span("render", key="team"):
+                    name, text = self.render_team_profile(soup, team.name)
+                result = {
+                    'name': name,
+                    'text': text,
+                    'card': None,
+                    'fingerprint': region_fingerprint(content, PAGE_REGIONS["team"]),
+                }
+        except Exception as e:
+            if result is None:
+                self.logger.error("获取战队主页 %s 失败: %s", url, e)
+                self.logger.debug("异常详情: ", exc_info=True)
+            else:
+                self.logger.error("截图过程中出错: %s", e)
 
-            # 构建输出信息
-            self.logger.info("正在生成输出信息")
-            result = f"🎮 {team_name} 战队信息\n" + "═" * 30 + "\n\n"
-            
-            result += "📊 统计数据:\n" + "─" * 20 + "\n"
-            for title, value in team_stats.items():
-                result += f"• {title}: {value}\n"
-            
-            result += "\n👥 当前阵容:\n" + "─" * 20 + "\n"
-            for i, player in enumerate(current_lineup, 1):
-                result += f"{i}. {player['nickname']} ({player['name']})\n"
+        if result is not None:
+            try:
+                result['card'] = self.compose_team_card(image_paths, base_filename)
+            except Exception as e:
+                self.logger.error("合成战队卡片失败: %s", e)
+        for image_path, _ in image_paths:
+            self.remove_file(image_path)
+        return result
+
+    def render_team_profile(self, page, fallback_name: str):
+        """解析战队主页，返回 (战队名, 文字信息)"""
+        name_element = page.find(class_="profile-team-name")
+        team_name = name_element.text.strip() if name_element else fallback_name
+        if not name_element:
+            self.selector_miss(".profile-team-name")
+
+        # 排名、前30周数、平均年龄、教练等
+        team_stats = {}
+        for stat in page.find_all("div", {"class": "profile-team-stat"}):
+            label = stat.find("b")
+            if not label:
+                continue
+            value = stat.find("span", {"class": "right"}) or stat.find("a", {"class": "right"})
+            value_text = value.text.strip() if value else stat.text.replace(label.text, "", 1).strip()
+            team_stats[label.text.strip()] = value_text
+            self.item_logger.debug("team_stat", "统计数据: %s = %s", label.text.strip(), value_text)
+        if not team_stats:
+            self.selector_miss("div.profile-team-stat")
+
+        # 当前阵容：优先使用阵容表格（含比赛场数），没有时退回到选手半身像
+        current_lineup = []
+        for row in page.select("table.players-table tbody tr")[:5]:
+            try:
+                link = row.find("a", href=re.compile(r"/player/\d+"))
+                nickname_element = row.find(class_="text-ellipsis")
+                nickname = nickname_element.text.strip() if nickname_element else link.text.strip()
+                image = row.find("img", alt=True)
+                maps = next((cell.text.strip() for cell in row.find_all("td") if cell.text.strip().isdigit()), "?")
+                current_lineup.append({
+                    "name": split_full_name(image["alt"]) if image else "",
+                    "nickname": nickname,
+                    "maps_played": maps,
+                    "href": link["href"] if link else None,
+                })
+            except Exception as e:
+                self.logger.error("解析选手信息时出错: %s", e)
+                self.logger.debug("异常详情: ", exc_info=True)
+        if not current_lineup:
+            for link in page.select(".bodyshot-team a[href*='/player/']")[:5]:
+                image = link.find("img", alt=True)
+                current_lineup.append({
+                    "name": split_full_name(image["alt"]) if image else "",
+                    "nickname": link.get("title") or link.text.strip(),
+                    "maps_played": None,
+                    "href": link["href"],
+                })
+        for player in current_lineup:
+            parsed = parse_player_href(player.pop("href"))
+            if parsed and player["name"]:
+                self.remember_players([{'id': parsed[0], 'nickname': player['nickname'], 'name': player['name']}])
+            self.item_logger.debug("lineup", "添加选手: %s", player)
+
+        result = f"🎮 {team_name} 战队信息\n" + "═" * 30 + "\n\n"
+        
+        result += "📊 统计数据:\n" + "─" * 20 + "\n"
+        for title, value in team_stats.items():
+            result += f"• {title}: {value}\n"
+        
+        result += "\n👥 当前阵容:\n" + "─" * 20 + "\n"
+        for i, player in enumerate(current_lineup, 1):
+            result += f"{i}. {player['nickname']}" + (f" ({player['name']})" if player['name'] else "") + "\n"
+            if player['maps_played']:
                 result += f"   📈 比赛场数: {player['maps_played']}\n"
+        return team_name, result
 
-            self.logger.info("查询完成，正在返回结果")
-            yield event.plain_result(result)
-
-             # 构建完基本信息后，使用 playwright 进行截图
-            async with async_playwright() as playwright:
-                browser= await playwright.chromium.launch(headless=True)
-                context = await browser.new_context(
-                    viewport={'width': 1920, 'height': 1080},
-                    user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-                )
-                
-                page = await context.new_page()
-                
-                try:
-                    url = f"https://www.hltv.org/team/{team_id}/{team_name}"
-                    self.logger.info(f"准备访问URL: {url}")
-                    
-                    # 记录请求开始时间
-                    start_time = time.time()
-                    
-                    # 访问页面
-                    response = await page.goto(url, wait_until="networkidle")
-                    
-                    # 记录响应状态
-                    if response:
-                        self.logger.info(f"页面响应状态码: {response.status}")
-                        self.logger.info(f"页面请求耗时: {time.time() - start_time:.2f}秒")
-                    else:
-                        self.logger.error("未收到页面响应")
-                        raise Exception("页面访问失败")
-
-                    # 等待页面加载
-                    self.logger.info("等待页面加载完成...")
-                    await page.wait_for_load_state("domcontentloaded")
-                    self.logger.info("页面DOM加载完成")
-                    
-                    await asyncio.sleep(2)
-                    self.logger.info("额外等待2秒完成")
-
-                    # 检查页面内容
-                    content = await page.content()
-                    self.logger.info(f"页面内容长度: {len(content)} 字节")
-                    
-                    # 检查关键元素是否存在
-                    columns_count = await page.evaluate("""() => {
-                        return document.querySelectorAll('.columns').length;
-                    }""")
-                    self.logger.info(f"找到 {columns_count} 个columns元素")
-    
-                    # 移除cookie相关元素
-                    await page.evaluate("""() => {
-                        const style = document.createElement('style');
-                        style.textContent = `
-                            #CybotCookiebotDialog,
-                            .CookieDeclaration,
-                            #CybotCookiebotDialogBodyUnderlay {
-                                display: none !important;
-                            }
-                        `;
-                        document.head.appendChild(style);
-                    }""")
-
-                    base_filename = f"team_info_{team_id}_{int(time.time())}"
-                    image_paths = []
-                    total_height = 0
-
-                    # 1. bodyshot-team-bg (664x134)
-                    bodyshot_path = os.path.join(self.screenshot_dir, f"{base_filename}_bodyshot.png")
-                    bodyshot = await page.query_selector(".bodyshot-team-bg")
-                    if bodyshot:
-                        await bodyshot.screenshot(path=bodyshot_path)
-                        image_paths.append((bodyshot_path, 134))
-                        total_height += 134
-
-                    # 2. profileTopBox (664x187)
-                    profile_path = os.path.join(self.screenshot_dir, f"{base_filename}_profile.png")
-                    profile = await page.query_selector(".standard-box.profileTopBox.clearfix")
-                    if profile:
-                        await profile.screenshot(path=profile_path)
-                        image_paths.append((profile_path, 187))
-                        total_height += 187
-
-                    # 3. trophySection (664x59)
-                    trophy_path = os.path.join(self.screenshot_dir, f"{base_filename}_trophy.png")
-                    trophy = await page.query_selector(".trophySection")
-                    if trophy:
-                        await trophy.screenshot(path=trophy_path)
-                        image_paths.append((trophy_path, 59))
-                        total_height += 59
-
-                    # 合并图片
-                    width = 664  # 修改固定宽度为664
-                    merged_image = PILImage.new('RGB', (width, total_height), 'white')
-                    current_height = 0
-
-                    # 打印日志以跟踪进度
-                    self.logger.info(f"准备合并图片，总高度: {total_height}px")
-                    self.logger.info(f"图片列表: {image_paths}")
-
-                    # 合并图片
-                    for idx, (img_path, height) in enumerate(image_paths, 1):
-                        try:
-                            with PILImage.open(img_path) as img:
-                                self.logger.info(f"处理第 {idx} 张图片: {img_path}")
-                                img_width, img_height = img.size
-                                scale_factor = width / img_width
-                                new_height = int(img_height * scale_factor)
-                                resized_img = img.resize((width, new_height), PILImage.Resampling.LANCZOS)
-                                merged_image.paste(resized_img, (0, current_height))
-                                current_height += new_height
-                                self.logger.info(f"已合并第 {idx} 张图片，当前高度: {current_height}px")
-                        except Exception as e:
-                            self.logger.error(f"处理图片 {img_path} 时出错: {str(e)}")
-
-                    # 保存合并后的图片
-                    merged_path = os.path.join(self.screenshot_dir, f"{base_filename}_merged.png")
-                    merged_image.save(merged_path)
-
-                    # 发送结果
-                    message_chain = [
-                        Plain(text=f"📊 {team_name} 战队统计数据：\n"),
-                        Image(file=merged_path)
-                    ]
-                    yield event.chain_result(message_chain)
-
-                    # 清理临时文件
-                    for img_path, _ in image_paths:
-                        try:
-                            os.remove(img_path)
-                        except Exception as e:
-                            self.logger.debug(f"删除临时文件失败: {str(e)}")
-
-                except Exception as e:
-                    self.logger.error(f"截图过程中出错: {str(e)}")
-                    yield event.plain_result("❌ 获取战队统计数据失败，请稍后重试")
-                
-                finally:
-                    await page.close()
-                    await context.close()
-                    await browser.close()
-            
-        except Exception as e:
-            self.logger.error(f"查询战队信息时发生未知错误: {str(e)}")
-            self.logger.debug("异常详情: ", exc_info=True)
-            yield event.plain_result("❌ 查询战队信息失败，请稍后重试")
+    def compose_team_card(self, image_paths, base_filename: str):
+        """把战队主页的横幅、简介和奖杯区域截图合成一张卡片，返回图片路径或None"""
+        if not image_paths:
+            return None
+        merged_path = os.path.join(self.screenshot_dir, f"{base_filename}_merged.png")
+        return self.compose_screenshots(image_paths, 664, merged_path)
 
     @filter.command("近期比赛")
+    @timed_command("近期比赛")
     async def query_matches(self, event: AstrMessageEvent):
         """查询HLTV近期比赛"""
-        yield event.plain_result("🔍 正在查询近期比赛信息...")
+        yield event.plain_result(f"🔍 正在查询近期比赛信息...{self.loading_hint()}")
         
         try:
-            matches = await self.get_parsed_page("https://www.hltv.org/matches/")
-            if not matches:
-                self.logger.error("获取比赛页面失败")
-                yield event.plain_result("❌ 获取比赛信息失败")
-                return
-                
-            result_text = "📅 HLTV近期比赛\n" + "═" * 30 + "\n"
-            match_count = 0  # 用于计数已处理的比赛数
-            
-            match_sections = matches.find_all("div", {"class": "upcomingMatchesSection"})
-            self.logger.debug(f"找到 {len(match_sections)} 个比赛日期区块")
-            
-            for match_day in match_sections:
-                try:
-                    if (match_count >= 10):  # 如果已经处理了10场比赛，就跳出循环
-                        break
-                        
-                    date_element = match_day.find('div', {'class': 'matchDayHeadline'})
-                    if not date_element:
-                        self.logger.warning("未找到比赛日期元素")
-                        continue
-                        
-                    date = date_element.text.split()[-1]
-                    self.logger.debug(f"处理日期: {date}")
-                    result_text += f"\n📆 {date}:\n" + "─" * 20 + "\n"
-                    
-                    day_matches = match_day.find_all("div", {"class": "upcomingMatch"})
-                    self.logger.debug(f"该日期下找到 {len(day_matches)} 场比赛")
-                    
-                    for match in day_matches:
-                        if (match_count >= 10):  # 如果已经处理了10场比赛，就跳出内层循环
-                            break
-                            
-                        try:
-                            teams = match.find_all("div", {"class": "matchTeam"})
-                            if len(teams) < 2:
-                                self.logger.warning(f"比赛队伍数量不足: {len(teams)}")
-                                continue
-                                
-                            team1 = teams[0].text.strip()
-                            team2 = teams[1].text.strip()
-                            
-                            time_element = match.find("div", {"class": "matchTime"})
-                            time = time_element.text if time_element else "TBA"
-                            
-                            event_element = match.find("div", {"class": "matchEvent"})
-                            event_name = event_element.text.strip() if event_element else "Unknown Event"
-                            
-                            self.logger.debug(f"处理比赛: {team1} vs {team2}")
-                            result_text += f"⚔️ {team1} vs {team2}\n"
-                            result_text += f"⏰ {time}\n"
-                            result_text += f"🏆 {event_name}\n"
-                            result_text += "─" * 15 + "\n"
-                            
-                            match_count += 1  # 增加计数器
-                            
-                        except Exception as match_error:
-                            self.logger.error(f"处理单场比赛时出错: {str(match_error)}")
-                            self.logger.debug("比赛HTML内容:", exc_info=True)
-                            continue
-                            
-                except Exception as day_error:
-                    self.logger.error(f"处理比赛日期区块时出错: {str(day_error)}")
-                    self.logger.debug("日期区块HTML内容:", exc_info=True)
-                    continue
-                    
-            if result_text == "📅 HLTV近期比赛\n" + "═" * 30 + "\n":
+            schedule, stale = await self.get_schedule()
+            upcoming = schedule.between(time.time(), float("inf")) if schedule else []
+            if not upcoming:
                 self.logger.error("未找到任何比赛信息")
                 yield event.plain_result("❌ 未找到任何比赛信息")
-            else:
-                result_text += f"\n💡 仅显示最近 {match_count} 场比赛"  # 添加提示信息
-                yield event.plain_result(result_text)
+                return
+
+            cursor = self.list_cursors.open(event.get_session_id(), "matches", upcoming, self.page_size, stale)
+            page = self.page_argument(event)
+            if not cursor.seek(page):
+                yield event.plain_result(f"❌ 第 {page} 页不存在，共 {cursor.pages} 页")
+                return
+            yield event.plain_result(self.render_cursor(cursor))
                 
         except Exception as e:
-            self.logger.error(f"查询比赛信息时发生错误: {str(e)}")
+            self.logger.error("查询比赛信息时发生错误: %s", e)
+            self.logger.debug("完整错误信息:", exc_info=True)
+            yield event.plain_result(f"❌ 查询失败: {str(e)}")
+
+    @filter.command("战队赛程")
+    @timed_command("战队赛程")
+    async def query_team_schedule(self, event: AstrMessageEvent, *, team_name: str):
+        """查询指定战队接下来的比赛"""
+        try:
+            schedule, stale = await self.get_schedule()
+            if not schedule:
+                yield event.plain_result("❌ 获取赛程失败，请稍后重试")
+                return
+            team_key = schedule.resolve_team(team_name)
+            upcoming = schedule.for_team(team_key, time.time(), 10) if team_key else []
+            if not upcoming:
+                yield event.plain_result(f"📭 近期赛程中没有 {team_name} 的比赛")
+                return
+
+            result_text = f"📅 {team_name} 近期赛程\n" + "═" * 30 + "\n"
+            result_text += self.format_schedule(upcoming)
+            result_text += f"\n💡 时间为{self.local_timezone_name()}"
+            yield event.plain_result(self.with_freshness(result_text, stale))
+        except Exception as e:
+            self.logger.error("查询战队赛程时发生错误: %s", e)
+            self.logger.debug("完整错误信息:", exc_info=True)
+            yield event.plain_result(f"❌ 查询失败: {str(e)}")
+
+    @filter.command("今日比赛")
+    @timed_command("今日比赛")
+    async def query_today_matches(self, event: AstrMessageEvent):
+        """查询本地时间今天已公布开赛时间的比赛"""
+        try:
+            schedule, stale = await self.get_schedule()
+            if not schedule:
+                yield event.plain_result("❌ 获取赛程失败，请稍后重试")
+                return
+            today = datetime.now(local_zoneinfo()).replace(hour=0, minute=0, second=0, microsecond=0)
+            start = today.timestamp()
+            matches = schedule.between(start, start + 86400)
+            if not matches:
+                yield event.plain_result("📭 今天没有已公布开赛时间的比赛")
+                return
+
+            result_text = f"📅 今日比赛 ({len(matches)} 场)\n" + "═" * 30 + "\n"
+            result_text += self.format_schedule(matches)
+            result_text += f"\n💡 时间为{self.local_timezone_name()}"
+            yield event.plain_result(self.with_freshness(result_text, stale))
+        except Exception as e:
+            self.logger.error("查询今日比赛时发生错误: %s", e)
             self.logger.debug("完整错误信息:", exc_info=True)
-            self.logger.debug("页面HTML内容:", exc_info=True)
             yield event.plain_result(f"❌ 查询失败: {str(e)}")
 
+    async def get_schedule(self):
+        """获取（必要时刷新）赛程索引，返回 (ScheduleStore或None, 过期说明或None)"""
+        matches, stale = await self.get_cached(
+            "matches", f"{self.base_url}/matches/", self.render_schedule,
+            region=PAGE_REGIONS["matches"]
+        )
+        if not matches:
+            return None, None
+        # 页面内容未变化时 get_cached 返回同一个列表，索引不会重建
+        self.schedule.load(matches)
+        return self.schedule, stale
+
+    def render_schedule(self, page):
+        """把比赛页面解析为按时间排序前的比赛列表，解析失败时返回None"""
+        matches = parse_schedule(page, hltv_zoneinfo())
+        self.logger.debug("解析到 %s 场有开赛时间的比赛", len(matches))
+        if not matches:
+            self.selector_miss("div.upcomingMatch")
+            return None
+        return matches
+
+    @staticmethod
+    def local_timezone_name() -> str:
+        return f"本地时间 ({local_zoneinfo().key})"
+
+    @staticmethod
+    def format_schedule(matches) -> str:
+        """按本地日期分组输出比赛列表"""
+        local_tz = local_zoneinfo()
+        text = ""
+        current_day = None
+        for match in matches:
+            start = datetime.fromtimestamp(match.timestamp, local_tz)
+            day = start.strftime("%m-%d")
+            if day != current_day:
+                current_day = day
+                text += f"\n📆 {day} {WEEKDAYS[start.weekday()]}:\n" + "─" * 20 + "\n"
+            text += f"⚔️ {match.team1} vs {match.team2}\n"
+            text += f"⏰ {start.strftime('%H:%M')}" + (f"  🆔 {match.match_id}\n" if match.match_id else "\n")
+            text += f"🏆 {match.event}\n"
+            text += "─" * 15 + "\n"
+        return text
+
+    @filter.command("订阅")
+    async def subscribe_team(self, event: AstrMessageEvent, *, team_name: str):
+        """订阅战队的直播比赛推送"""
+        team_name = team_name.strip()
+        if not team_name:
+            yield event.plain_result("❌ 请输入要订阅的战队名称")
+            return
+        # 推送按 HLTV 上的战队名匹配，必须先解析成正式名称，否则订阅永远不会触发
+        resolved = await self.resolve_team_name(team_name)
+        if not resolved:
+            yield event.plain_result(f"❌ 未找到战队 {team_name}，请使用 HLTV 上的战队全名，例如 Natus Vincere")
+            return
+        team_name = resolved
+        if self.live_tracker.subscribe(event.unified_msg_origin, team_name):
+            yield event.plain_result(f"🔔 已订阅 {team_name}，比赛开始、地图结束和终场时会自动推送")
+        else:
+            yield event.plain_result(f"💡 当前会话已订阅过 {team_name}")
+
+    @filter.command("取消订阅")
+    async def unsubscribe_team(self, event: AstrMessageEvent, *, team_name: str):
+        """取消订阅战队"""
+        team_name = team_name.strip()
+        resolved = await self.resolve_team_name(team_name)
+        if resolved and self.live_tracker.unsubscribe(event.unified_msg_origin, resolved):
+            yield event.plain_result(f"🔕 已取消订阅 {resolved}")
+        elif self.live_tracker.unsubscribe(event.unified_msg_origin, team_name):
+            # 之前按输入原样保存的订阅
+            yield event.plain_result(f"🔕 已取消订阅 {team_name}")
+        else:
+            yield event.plain_result(f"❌ 当前会话未订阅 {team_name}")
+
+    @filter.command("我的订阅")
+    async def list_subscriptions(self, event: AstrMessageEvent):
+        """查看当前会话订阅的战队"""
+        teams = self.live_tracker.subscribed_teams(event.unified_msg_origin)
+        if not teams:
+            yield event.plain_result("💡 当前会话还没有订阅任何战队，使用 /订阅 [战队名称] 添加")
+            return
+        result = "🔔 已订阅的战队:\n" + "─" * 20 + "\n"
+        for team in teams:
+            result += f"• {team}\n"
+        yield event.plain_result(result)
+
     async def get_match_stats(self, match_url: str):
         """获取比赛详细统计信息"""
         try:
-            page = await self.get_parsed_page(f"https://www.hltv.org{match_url}")
-            if not page:
-                return None
-                
-            match_stats = {
-                'team1': {'name': '', 'players': []},
-                'team2': {'name': '', 'players': []},
-                'maps': [],
-                'event': ''
-            }
-            
-            # 获取队伍名称
-            team_names = page.find_all("div", {"class": "team"})
-            if len(team_names) >= 2:
-                match_stats['team1']['name'] = team_names[0].text.strip()
-                match_stats['team2']['name'] = team_names[1].text.strip()
-            
-            # 获取比赛地图信息
-            maps = page.find_all("div", {"class": "mapname"})
-            for map_div in maps:
-                match_stats['maps'].append(map_div.text.strip())
-            
-            # 获取选手数据
-            stats_tables = page.find_all("table", {"class": "stats-table"})
-            
-            if not stats_tables:
-                self.logger.warning(
-                    "未找到比赛统计表格，可能比赛尚未结束或数据未更新。请检查比赛是否已结束，或稍后再试。"
-                    f" URL: {match_url}, 页面内容: {page.prettify()[:500]}..."
-                )
-                match_stats['status'] = "比赛数据暂未更新"
-                return match_stats
-            
-            for team_idx, team_box in enumerate(['team1', 'team2']):
-                if team_idx >= len(stats_tables):
-                    self.logger.warning(f"未找到第{team_idx + 1}支队伍的统计表格")
-                    continue
-                    
-                try:
-                    rows = stats_tables[team_idx].find_all("tr")
-                    if len(rows) <= 1:  # 跳过表头
-                        continue
-                        
-                    for player_row in rows[1:]:  # 从第二行开始是选手数据
-                        stats = player_row.find_all("td")
-                        if len(stats) >= 6:  # 确保至少有足够的列
-                            player_info = {
-                                'name': stats[0].text.strip(),
-                                'kills': stats[1].text.strip() if len(stats) > 1 else 'N/A',
-                                'deaths': stats[2].text.strip() if len(stats) > 2 else 'N/A',
-                                'adr': stats[3].text.strip() if len(stats) > 3 else 'N/A',
-                                'kast': stats[4].text.strip() if len(stats) > 4 else 'N/A',
-                                'rating': stats[5].text.strip() if len(stats) > 5 else 'N/A'
-                            }
-                            match_stats[team_box]['players'].append(player_info)
-                except Exception as e:
-                    self.logger.error(f"处理{team_box}统计数据时出错: {str(e)}")
-                    continue
-            
-            # 获取赛事信息
-            event = page.find("div", {"class": "event"})
-            if event:
-                match_stats['event'] = event.text.strip()
-            
-            return match_stats
+            return await self.fetch_match_stats(match_url)
         except Exception as e:
-            self.logger.error(f"获取比赛统计信息失败: {str(e)}")
+            self.logger.error("获取比赛统计信息失败: %s", e)
             self.logger.debug("异常详情: ", exc_info=True)
             return None
 
+    async def fetch_match_stats(self, match_url: str):
+        """获取并解析比赛页面，失败时抛出异常"""
+        page = await self.get_parsed_page(f"{self.base_url}{match_url}")
+        if not page:
+            raise FetchError(None, match_url)
+        stats = self.parse_match_stats(page, match_url)
+        found_id = re.search(r"/matches/(\d+)", match_url)
+        if found_id and stats.scores and stats.team1 and stats.team2:
+            self.record_matches([MatchResult(
+                int(found_id.group(1)), stats.team1.strip(), stats.team2.strip(), *stats.scores,
+                event=stats.event, url=match_url, timestamp=stats.timestamp,
+            )])
+        return stats
+
+    async def iter_match_stats(self, matches, limit: int = None):
+        """并发获取多场比赛的统计数据，按完成顺序逐个产出 (比赛, 统计数据, 异常)
+
+        matches 可以是比赛ID或 /matches/<id>/<slug> 链接，重复项只请求一次。
+        并发数受共享浏览器的页面上限约束，limit 默认比上限少一个，给其他指令留出空位。
+        单场失败只体现在该项的异常中，不影响其他比赛；提前退出迭代时取消未完成的请求。
+        """
+        limit = limit or max(1, self.browser_manager.max_pages - 1)
+        semaphore = asyncio.Semaphore(limit)
+
+        async def fetch_one(path, match):
+            async with semaphore:
+                try:
+                    return match, await self.fetch_match_stats(path), None
+                except Exception as e:
+                    self.logger.warning("获取比赛 %s 失败: %s", match, e)
+                    return match, None, e
+
+        targets = {}
+        for match in matches:
+            targets.setdefault(match_path(match), match)
+        pending = [asyncio.ensure_future(fetch_one(path, match)) for path, match in targets.items()]
+        try:
+            for next_done in asyncio.as_completed(pending):
+                yield await next_done
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def parse_match_stats(self, page, match_url: str):
+        """解析比赛页面中的队伍、地图和选手数据，返回 MatchStats"""
+        # 获取队伍名称
+        team_names = [team.text for team in page.find_all("div", {"class": "team"})[:2]]
+        if len(team_names) < 2:
+            team_names = ["", ""]
+
+        # 总比分只在比赛结束（出现 won/lost/tie 标记）后读取，进行中的比赛不记入比赛历史
+        score_elements = [
+            box.find("div", {"class": ["won", "lost", "tie"]})
+            for box in page.select("div.team1-gradient, div.team2-gradient")[:2]
+        ]
+        scores = None
+        if len(score_elements) == 2 and all(score_elements):
+            scores = tuple(element.text.strip() for element in score_elements)
+        time_element = page.select_one("div.timeAndEvent div.time[data-unix]")
+        timestamp = parse_int(time_element["data-unix"]) if time_element else None
+        timestamp = timestamp // 1000 if timestamp else None
+        
+        # 获取比赛地图信息
+        maps = [map_div.text for map_div in page.find_all("div", {"class": "mapname"})]
+        
+        # 获取赛事信息
+        event = page.find("div", {"class": "event"})
+        event_name = event.text if event else ""
+        
+        # 获取选手数据
+        stats_tables = page.find_all("table", {"class": "stats-table"})
+        
+        if not stats_tables:
+            title = page.title.string.strip() if page.title and page.title.string else ""
+            self.logger.warning(
+                "未找到比赛统计表格，可能比赛尚未结束或数据未更新。URL: %s, 页面标题: %s",
+                match_url, title
+            )
+            self.selector_miss("table.stats-table")
+            return MatchStats(*team_names, maps=maps, event=event_name, status="比赛数据暂未更新",
+                              scores=scores, timestamp=timestamp)
+        
+        seen_players = []
+        lineups = [[], []]
+        for team_idx in range(2):
+            if team_idx >= len(stats_tables):
+                self.logger.warning("未找到第%s支队伍的统计表格", team_idx + 1)
+                continue
+                
+            try:
+                rows = stats_tables[team_idx].find_all("tr")
+                for player_row in rows[1:]:  # 跳过表头
+                    cells = player_row.find_all("td")
+                    if len(cells) < 6:  # 确保至少有足够的列
+                        continue
+                    player_link = cells[0].find("a", href=True)
+                    parsed = parse_player_href(player_link['href']) if player_link else None
+                    row = PlayerMatchStats.from_cells(parsed[0] if parsed else None, [cell.text for cell in cells[:6]])
+                    lineups[team_idx].append(row)
+                    if parsed:
+                        seen_players.append({'id': parsed[0], 'nickname': row.name})
+            except Exception as e:
+                self.logger.error("处理第%s支队伍统计数据时出错: %s", team_idx + 1, e)
+                continue
+        
+        self.remember_players(seen_players)
+        return MatchStats(team_names[0], team_names[1], lineups[0], lineups[1], maps, event_name,
+                          scores=scores, timestamp=timestamp)
+
     @filter.command("比赛结果")
+    @timed_command("比赛结果")
     async def query_results(self, event: AstrMessageEvent):
         """查询HLTV最近比赛结果"""
-        yield event.plain_result("🔍 正在查询近期比赛结果...")
+        yield event.plain_result(f"🔍 正在查询近期比赛结果...{self.loading_hint()}")
         
         try:
-            results = await self.get_parsed_page("https://www.hltv.org/results/")
-            result_text = "📊 HLTV近期比赛结果\n" + "═" * 30 + "\n\n"
-            
-            # 清理之前的比赛信息
-            self.recent_matches.clear()
-            self.logger.debug("已清理之前的比赛记录")
-            
-            # 只获取前5场比赛
-            for idx, result in enumerate(results.find_all("div", {"class": "result-con"})[:5], 1):
-                if result.find_all("td", {"class": "team-cell"}):
-                    team1 = result.find_all("td", {"class": "team-cell"})[0].text.strip()
-                    team2 = result.find_all("td", {"class": "team-cell"})[1].text.strip()
-                    score1 = result.find("td", {"class": "result-score"}).find_all("span")[0].text.strip()
-                    score2 = result.find("td", {"class": "result-score"}).find_all("span")[1].text.strip()
-                    event_name = result.find("td", {"class": "event"}).text if result.find("td", {"class": "event"}) else "Unknown Event"
-                    
-                    # 获取并存储比赛URL
-                    match_link = result.find("a", {"class": "a-reset"})
-                    if match_link and 'href' in match_link.attrs:
-                        match_url = match_link['href']
-                        # 使用字母作为键 (idx从1开始,所以要-1)
-                        letter = chr(ord('a') + idx - 1)  # 将数字转换为对应字母
-                        self.recent_matches[letter] = match_url
-                        self.logger.debug(f"存储比赛记录: {letter} -> {match_url}")
-                    
-                    result_text += f"📍 比赛 {chr(ord('a') + idx - 1)}\n"
-                    result_text += f"⚔️ {team1} vs {team2}\n"
-                    result_text += f"📈 比分: {score1} - {score2}\n"
-                    result_text += f"🏆 赛事: {event_name}\n"
-                    result_text += "─" * 20 + "\n"
-            
-            result_text += "\n💡 在30秒内输入比赛 a-e 可查看详细数据"
-            
-            # 记录查询时间和用户ID
-            user_id = event.get_session_id()
-            self.last_result_query[user_id] = time.time()
-            self.logger.debug(f"用户 {user_id} 的查询时间已更新")
-            
-            yield event.plain_result(result_text)
+            rendered, stale = await self.get_cached(
+                "results", f"{self.base_url}/results/", self.render_results,
+                region=PAGE_REGIONS["results"]
+            )
+            if not rendered:
+                yield event.plain_result("❌ 获取比赛结果失败，请稍后重试")
+                return
+
+            # 游标只引用缓存中的列表，翻页不会重新抓取
+            cursor = self.list_cursors.open(event.get_session_id(), "results", rendered, self.page_size, stale)
+            page = self.page_argument(event)
+            if not cursor.seek(page):
+                yield event.plain_result(f"❌ 第 {page} 页不存在，共 {cursor.pages} 页")
+                return
+            yield event.plain_result(self.render_cursor(cursor))
             
         except Exception as e:
             yield event.plain_result(f"❌ 查询失败: {str(e)}")
 
+    def render_results(self, results):
+        """把结果页面解析为 MatchResult 元组（页面顺序，按比赛ID去重），解析失败时返回None
+
+        解析出的比赛同时记入比赛历史；第一页最早的比赛不在历史中时说明中间有缺口，在后台向后补齐
+        """
+        parsed = self.parse_results(results)
+        if not parsed:
+            self.selector_miss("div.result-con")
+            return None
+        gap = parsed[-1].match_id not in self.match_history.matches
+        self.record_matches(parsed)
+        if gap:
+            self.schedule_backfill()
+        return parsed
+
+    def parse_results(self, results):
+        """解析结果页中的比赛，返回 MatchResult 元组"""
+        parsed = []
+        seen = set()
+        for result in results.find_all("div", {"class": "result-con"}):
+            try:
+                teams = result.find_all("td", {"class": "team-cell"})
+                match_link = result.find("a", {"class": "a-reset"})
+                if len(teams) < 2 or not match_link or 'href' not in match_link.attrs:
+                    continue
+                found_id = re.search(r"/matches/(\d+)", match_link['href'])
+                if not found_id or int(found_id.group(1)) in seen:
+                    continue
+                seen.add(int(found_id.group(1)))
+                scores = result.find("td", {"class": "result-score"}).find_all("span")
+                event_element = result.find("td", {"class": "event"})
+                parsed.append(MatchResult(
+                    int(found_id.group(1)),
+                    teams[0].text,
+                    teams[1].text,
+                    scores[0].text.strip(),
+                    scores[1].text.strip(),
+                    event_element.text if event_element else "Unknown Event",
+                    match_link['href'],
+                    self.result_timestamp(result),
+                ))
+            except Exception as e:
+                self.item_logger.debug("results", "解析比赛结果条目失败: %s", e)
+        return tuple(parsed)
+
+    @staticmethod
+    def result_timestamp(result):
+        """结果条目的开赛时间（UTC 秒），页面中没有 data-zonedgrouping-entry-unix 时为 None"""
+        value = parse_int(result.get("data-zonedgrouping-entry-unix"))
+        return value // 1000 if value else None
+
+    def record_matches(self, matches) -> int:
+        """把比赛记入比赛历史并延迟写盘，返回新增或更新的场数"""
+        try:
+            added = self.match_history.add_many(matches)
+            if added:
+                self.schedule_save(self.match_history)
+            return added
+        except Exception as e:
+            self.logger.error("更新比赛历史失败: %s", e)
+            return 0
+
+    def schedule_backfill(self):
+        """启动后台补齐任务，已有任务在运行时不重复启动"""
+        if not self.backfill_pages or (self._backfill_task and not self._backfill_task.done()):
+            return
+        self._backfill_task = asyncio.get_running_loop().create_task(self.backfill_match_history())
+
+    async def backfill_match_history(self):
+        """按 offset 向后翻结果页，直到与已有历史衔接或达到 match_history_backfill_pages 页"""
+        async def fetch_results(index):
+            page = await self.get_parsed_page(f"{self.base_url}/results?offset={index * RESULTS_PAGE_SIZE}")
+            return self.parse_results(page) if page else None
+
+        try:
+            await backfill_history(fetch_results, self.record_matches, self.backfill_pages)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.logger.error("补齐比赛历史失败: %s", e)
+
+    @staticmethod
+    def page_argument(event: AstrMessageEvent) -> int:
+        """指令末尾的页码，如 /比赛结果 2；没有时为第 1 页"""
+        found = re.search(r"\s(\d+)\s*$", event.message_str or "")
+        return int(found.group(1)) if found else 1
+
+    def render_cursor(self, cursor) -> str:
+        """渲染游标当前页"""
+        if cursor.kind == "results":
+            text = "📊 HLTV近期比赛结果\n" + "═" * 30 + "\n\n"
+            for result in cursor.current():
+                text += f"📍 比赛 {result.match_id}\n"
+                text += f"⚔️ {result.team1} vs {result.team2}\n"
+                text += f"📈 比分: {result.score1} - {result.score2}\n"
+                text += f"🏆 赛事: {result.event}\n"
+                text += "─" * 20 + "\n"
+            hint = "输入 比赛 <比赛ID> 可查看详细数据，输入 比赛 全部 可查看本页全部比赛的数据"
+        else:
+            text = "📅 HLTV近期比赛\n" + "═" * 30 + "\n"
+            text += self.format_schedule(cursor.current())
+            hint = f"时间为{self.local_timezone_name()}，输入 比赛 <比赛ID> 可查看比赛页面"
+        text += f"\n📄 第 {cursor.page}/{cursor.pages} 页，共 {len(cursor.items)} 场"
+        if cursor.pages > 1:
+            text += "，输入 下一页 / 上一页 翻页"
+        text += f"\n💡 {hint}"
+        return self.with_freshness(text, cursor.stale)
+
+    @filter.regex(r"^(下一页|上一页)$")
+    @timed_command("翻页")
+    async def turn_page(self, event: AstrMessageEvent):
+        """在最近一次查询的比赛列表中翻页，不重新抓取页面"""
+        cursor = self.list_cursors.get(event.get_session_id())
+        if cursor is None:
+            return
+        forward = event.message_str.strip() == "下一页"
+        if not cursor.seek(cursor.page + (1 if forward else -1)):
+            yield event.plain_result("📄 已经是最后一页了" if forward else "📄 已经是第一页了")
+            return
+        yield event.plain_result(self.render_cursor(cursor))
+
+    @staticmethod
+    def format_played_match(match: MatchResult, team_key: str) -> str:
+        """从 team_key 一方看的一场历史比赛：日期、胜负、比分和对手"""
+        mark = {1: "✅", -1: "❌", 0: "➖"}.get(outcome(match, team_key), "❔")
+        if fold_text(match.team1) == team_key:
+            team, opponent, score, opponent_score = match.team1, match.team2, match.score1, match.score2
+        else:
+            team, opponent, score, opponent_score = match.team2, match.team1, match.score2, match.score1
+        day = datetime.fromtimestamp(match.timestamp, local_zoneinfo()).strftime("%Y-%m-%d") if match.timestamp else "日期未知"
+        return f"{mark} {day}  {team} {score} - {opponent_score} {opponent}\n🏆 {match.event}\n"
+
+    @staticmethod
+    def tally(matches, team_key: str):
+        """(胜, 负, 平)"""
+        results = [outcome(match, team_key) for match in matches]
+        return results.count(1), results.count(-1), results.count(0)
+
+    def split_team_pair(self, words):
+        """把 "/交手记录 A B" 的参数拆成两支历史中存在的战队，战队名可以含空格"""
+        words = [word for word in words if word.lower() not in ("vs", "v")]
+        for idx in range(1, len(words)):
+            team_a = self.match_history.resolve_team(" ".join(words[:idx]))
+            team_b = self.match_history.resolve_team(" ".join(words[idx:]))
+            if team_a and team_b and team_a != team_b:
+                return team_a, team_b
+        return None
+
+    @filter.command("交手记录")
+    @timed_command("交手记录")
+    async def query_head_to_head(self, event: AstrMessageEvent):
+        """两支战队在本地比赛历史中的交手记录"""
+        words = re.sub(r"^\S*交手记录\s*", "", (event.message_str or "").strip()).split()
+        if len(words) < 2:
+            yield event.plain_result("❌ 用法: /交手记录 战队A 战队B")
+            return
+        pair = self.split_team_pair(words)
+        if not pair:
+            yield event.plain_result(f"📭 比赛历史中没有找到 {' '.join(words)} 对应的两支战队")
+            return
+        team_a, team_b = pair
+        matches = self.match_history.head_to_head(team_a, team_b, 10)
+        if not matches:
+            yield event.plain_result("📭 比赛历史中没有这两支战队的交手记录")
+            return
+
+        latest = matches[0]
+        name_a, name_b = (latest.team1, latest.team2) if fold_text(latest.team1) == team_a else (latest.team2, latest.team1)
+        wins, losses, draws = self.tally(matches, team_a)
+        result = f"⚔️ {name_a} vs {name_b} 交手记录\n" + "═" * 30 + "\n"
+        result += f"近 {len(matches)} 场: {name_a} {wins} 胜 - {losses} 胜 {name_b}"
+        result += f"（{draws} 平）\n\n" if draws else "\n\n"
+        for match in matches:
+            result += self.format_played_match(match, team_a) + "─" * 15 + "\n"
+        result += f"💡 共记录 {len(self.match_history)} 场比赛，数据来自比赛结果和比赛详情"
+        yield event.plain_result(result)
+
+    @filter.command("近期状态")
+    @timed_command("近期状态")
+    async def query_team_form(self, event: AstrMessageEvent, *, team_name: str):
+        """战队在本地比赛历史中最近 10 场的战绩和近 30 天胜率"""
+        team_key = self.match_history.resolve_team(team_name)
+        matches = self.match_history.recent(team_key, 10) if team_key else []
+        if not matches:
+            yield event.plain_result(f"📭 比赛历史中没有 {team_name} 的比赛")
+            return
+
+        name = matches[0].team1 if fold_text(matches[0].team1) == team_key else matches[0].team2
+        results = [outcome(match, team_key) for match in matches]
+        streak = 0
+        while streak < len(results) and results[streak] == results[0] and results[0] in (1, -1):
+            streak += 1
+        wins, losses, draws = self.tally(matches, team_key)
+
+        result = f"📈 {name} 近期状态\n" + "═" * 30 + "\n"
+        result += "近 {} 场: {}\n".format(
+            len(matches), "".join({1: "W", -1: "L", 0: "D"}.get(item, "?") for item in reversed(results))
+        )
+        result += f"战绩: {wins} 胜 {losses} 负" + (f" {draws} 平" if draws else "") + "\n"
+        if streak >= 2:
+            result += f"🔥 {streak} 连胜\n" if results[0] == 1 else f"🧊 {streak} 连败\n"
+        recent_month = self.match_history.since(team_key, time.time() - 30 * 86400)
+        if recent_month:
+            month_wins, month_losses, _ = self.tally(recent_month, team_key)
+            result += f"近30天: {len(recent_month)} 场，胜率 {month_wins / len(recent_month):.0%}\n"
+        result += "─" * 20 + "\n"
+        for match in matches:
+            result += self.format_played_match(match, team_key)
+        yield event.plain_result(result.rstrip())
+
+    @staticmethod
+    def format_match_stats(label, stats: MatchStats) -> str:
+        """将 parse_match_stats 的结果格式化为文字比分板，label 一般为比赛ID"""
+        text = f"📍 比赛 {label}: {stats.team1} vs {stats.team2}\n"
+        if stats.event:
+            text += f"🏆 赛事: {stats.event}\n"
+        if stats.maps:
+            text += f"🗺️ 地图: {', '.join(stats.maps)}\n"
+        if stats.status:
+            return text + f"⏳ {stats.status}"
+        for team_name, players in stats.lineups():
+            text += "─" * 20 + f"\n👥 {team_name}\n"
+            for player in players:
+                text += (
+                    f"• {player.name}  {format_number(player.kills)}-{format_number(player.deaths)}"
+                    f"  ADR {format_number(player.adr, '.1f')}  KAST {format_number(player.kast, '.1f', '%')}"
+                    f"  Rating {format_number(player.rating, '.2f')}\n"
+                )
+        return text.rstrip()
+
+    @filter.regex(r"^比赛\s*全部$")
+    @timed_command("全部比赛数据")
+    async def handle_all_match_stats(self, event: AstrMessageEvent):
+        """并发获取当前会话比赛列表本页全部比赛的数据，先完成的先发送"""
+        cursor = self.list_cursors.get(event.get_session_id())
+        match_ids = [item.match_id for item in cursor.current() if item.match_id] if cursor else []
+        if not match_ids:
+            self.logger.debug("会话 %s 没有可用的比赛列表", event.get_session_id())
+            return
+
+        yield event.plain_result(f"📊 正在获取 {len(match_ids)} 场比赛的详细数据，请稍候...")
+
+        failed = []
+        async for match_id, stats, error in self.iter_match_stats(match_ids):
+            if error or not stats:
+                failed.append(match_id)
+                continue
+            yield event.plain_result(self.format_match_stats(match_id, stats))
+        if failed:
+            yield event.plain_result(f"❌ 比赛 {', '.join(map(str, sorted(failed)))} 的数据获取失败，请稍后重试")
+
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         """清理浏览器资源"""
         if self.team_map:
             self.team_map.clear()
+            self.team_index = {}
 
     async def get_top_players(self):
         """获取HLTV TOP选手信息"""
+        players, _ = await self.get_top_players_cached()
+        return players
+
+    async def get_top_players_cached(self):
+        """获取HLTV TOP选手信息，返回 (选手列表, 过期说明或None)"""
         try:
             self.logger.info("正在获取TOP选手信息...")
-            page = await self.get_parsed_page("https://www.hltv.org/stats")
-            if not page:
+            players, stale = await self.get_cached(
+                "top_players", f"{self.base_url}/stats", self.parse_top_players,
+                region=PAGE_REGIONS["stats"]
+            )
+            if not players:
                 self.logger.error("获取TOP选手页面失败")
-                return []
-                
-            players_div = page.find_all("div", {"class": "col"})[0]
-            players = []
-            
-            for player in players_div.find_all("div", {"class": "top-x-box standard-box"}):
-                try:
-                    player_info = {
-                        'country': player.find_all('img')[1]['alt'],
-                        'name': player.find('img', {'class': 'img'})['alt'].split("'")[0].rstrip() + 
-                               player.find('img', {'class': 'img'})['alt'].split("'")[2],
-                        'nickname': player.find('a', {'class': 'name'}).text,
-                        'rating': player.find('div', {'class': 'rating'}).find('span', {'class': 'bold'}).text,
-                        'maps_played': player.find('div', {'class': 'average gtSmartphone-only'}).find('span', {'class': 'bold'}).text,
-                        'url': "https://hltv.org" + player.find('a', {'class': 'name'}).get('href'),
-                        'id': int(player.find('a', {'class': 'name'}).get('href').split("/")[-2])
-                    }
-                    players.append(player_info)
-                    self.logger.debug(f"添加选手: {player_info['nickname']} ({player_info['name']})")
-                except Exception as e:
-                    self.logger.error(f"解析选手信息时出错: {str(e)}")
-                    continue
-                    
-            return players
+                return [], None
+            return players, stale
             
         except Exception as e:
-            self.logger.error(f"获取TOP选手信息失败: {str(e)}")
+            self.logger.error("获取TOP选手信息失败: %s", e)
             self.logger.debug("异常详情: ", exc_info=True)
-            return []
+            return [], None
+
+    def parse_top_players(self, page):
+        """解析TOP选手页面，返回选手信息列表"""
+        players_div = page.find_all("div", {"class": "col"})[0]
+        players = []
+        
+        for player in players_div.find_all("div", {"class": "top-x-box standard-box"}):
+            try:
+                link = player.find('a', {'class': 'name'})
+                player_info = PlayerRecord(
+                    int(link.get('href').split("/")[-2]),
+                    link.text,
+                    name=split_full_name(player.find('img', {'class': 'img'})['alt']),
+                    country=player.find_all('img')[1]['alt'],
+                    rating=parse_float(player.find('div', {'class': 'rating'}).find('span', {'class': 'bold'}).text),
+                    maps_played=parse_int(player.find('div', {'class': 'average gtSmartphone-only'}).find('span', {'class': 'bold'}).text),
+                )
+                players.append(player_info)
+                self.item_logger.debug("top_player", "添加选手: %s (%s)", player_info.nickname, player_info.name)
+            except Exception as e:
+                self.logger.error("解析选手信息时出错: %s", e)
+                continue
+
+        if not players:
+            return None
+        self.remember_players(players)
+        return players
 
-    
     @filter.command("搜索选手", parse_flags=False)
+    @timed_command("搜索选手")
     async def search_player_by_name(self, event: AstrMessageEvent):
         """通过名字搜索选手"""
         message = event.message_obj.message_str
@@ -971,7 +2235,20 @@ class HLTVQuery(Star):
         # ... 其余代码保持不变 ...
         
         try:
-            players = await self.search_players(player_name)
+            # 本地索引有精确或前缀匹配时直接使用；只有模糊匹配时仍要访问HLTV搜索页，
+            # 否则不在索引里的选手会被相似的名字挡住，永远搜不到
+            players = self.player_index.search(player_name, limit=6, fuzzy=False)
+            if players:
+                self.metrics.inc("player_index", result="hit")
+                self.logger.debug("本地索引命中 %s 名选手: %s", len(players), player_name)
+            else:
+                similar = self.player_index.search(player_name, limit=6)
+                self.metrics.inc("player_index", result="fuzzy" if similar else "miss")
+                live = await self.search_players(player_name)
+                self.remember_players(live)
+                # 实时结果在前，模糊匹配补在后面
+                live_ids = {player.id for player in live}
+                players = live + [player for player in similar if player.id not in live_ids]
             
             if not players:
                 yield event.plain_result(f"❌ 未找到包含 '{player_name}' 的选手")
@@ -985,9 +2262,9 @@ class HLTVQuery(Star):
             self.last_search_time[user_id] = time.time()
             
             for idx, player in enumerate(players[:5], 1):
-                result += f"#{idx} {player['nickname']}\n"
-                result += f"🌍 国籍: {player['country']}\n"
-                result += f"🆔 ID: {player['id']}\n"
+                result += f"#{idx} {player.nickname}\n"
+                result += f"🌍 国籍: {player.country}\n"
+                result += f"🆔 ID: {player.id}\n"
                 result += "─" * 20 + "\n"
                 
             if len(players) > 5:
@@ -998,10 +2275,11 @@ class HLTVQuery(Star):
             yield event.plain_result(result)
             
         except Exception as e:
-            self.logger.error(f"搜索选手失败: {str(e)}")
+            self.logger.error("搜索选手失败: %s", e)
             yield event.plain_result("❌ 搜索选手失败，请稍后重试")
 
     @filter.regex(r"^选手\s*[1-5]$")
+    @timed_command("选手详情")
     async def handle_player_stats(self, event: AstrMessageEvent):
         """处理选手详细统计信息查询"""
         try:
@@ -1012,9 +2290,6 @@ class HLTVQuery(Star):
             if user_id not in self.last_search_time or \
                current_time - self.last_search_time[user_id] > 30 or \
                user_id not in self.player_search_results:
-                # 转发到比赛详情处理
-                async for result in self.handle_match_details(event):
-                    yield result
                 return
             
             # 获取选择的序号
@@ -1028,204 +2303,50 @@ class HLTVQuery(Star):
             selected_player = self.player_search_results[user_id][selected_index]
             
             # 使用nickname替代name
-            yield event.plain_result(f"📊 正在获取 {selected_player['nickname']} 的详细数据，请稍候...")
+            yield event.plain_result(f"📊 正在获取 {selected_player.nickname} 的详细数据，请稍候...")
             
-            # 使用playwright访问选手统计页面并截图
-            async with async_playwright() as playwright:
-                browser = None
-                context = None
-                page = None
-                
-                try:
-                    browser = await playwright.chromium.launch(
-                        headless=True,
-                        args=[
-                            '--disable-web-security',
-                            '--disable-features=IsolateOrigins,site-per-process',
-                            '--no-sandbox',
-                            '--disable-setuid-sandbox',
-                            '--disable-dev-shm-usage',
-                        ]
-                    )
-                    
-                    # 更新上下文配置
-                    context = await browser.new_context(
-                        viewport={'width': 1920, 'height': 1080},
-                        user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36 Edg/120.0.0.0',
-                        ignore_https_errors=True,
-                        # 添加以下cookie设置
-                        accept_downloads=True,
-                        java_script_enabled=True,
-                        bypass_csp=True,
-                        permissions=['notifications', 'geolocation'],
-                        # 允许所有cookies
-                        extra_http_headers={
-                            'Accept': '*/*',
-                            'Accept-Language': 'en-US,en;q=0.9',
-                            'Accept-Encoding': 'gzip, deflate, br',
-                        }
-                    )
+            url = f"{self.base_url}/stats/players/{selected_player.id}/{selected_player.nickname}"
+            self.logger.info("访问URL: %s", url)
+            base_filename = f"player_stats_{selected_player.id}_{int(time.time())}"
+            sent = 0
+            try:
+                # 先发送文字摘要，再逐张发送截图
+                async for item_type, item in self.capture(url, PLAYER_SECTIONS, base_filename, "player"):
+                    if item_type == "html":
+                        with self.metrics.span("parse", page="player"):
+                            summary = self.parse_player_summary(BeautifulSoup(item, "lxml"))
+                        if summary:
+                            yield event.plain_result(f"📊 {selected_player.nickname} 的统计数据：\n{summary}")
+                        continue
+                    caption, image_path = item
+                    with self.metrics.span("upload", page="player"):
+                        yield event.chain_result([
+                            Plain(text=f"{caption} - {selected_player.nickname}\n"),
+                            Image(file=image_path)
+                        ])
+                    sent += 1
+                    self.remove_file(image_path)
+
+                if not sent:
+                    raise Exception("未能成功截取任何统计数据区域")
+
+            except Exception as e:
+                self.logger.error("截图过程中出错: %s", e)
+                yield event.plain_result("❌ 获取统计数据失败，请稍后重试")
 
-                    page = await context.new_page()
-                    
-                    # 添加cookie同意
-                    await page.add_init_script("""
-                        Object.defineProperty(navigator, 'webdriver', {get: () => undefined});
-                        window.localStorage.setItem('CookieConsent', JSON.stringify({
-                            accepted: true,
-                            necessary: true,
-                            preferences: true,
-                            statistics: true,
-                            marketing: true
-                        }));
-                    """)
-
-                    # 添加重试机制
-                    max_retries = 3
-                    retry_delay = 2
-                    
-                    for attempt in range(max_retries):
-                        try:
-                            url = f"https://www.hltv.org/stats/players/{selected_player['id']}/{selected_player['nickname']}"
-                            self.logger.info(f"第 {attempt + 1} 次尝试访问URL: {url}")
-                            
-                            page.set_default_timeout(45000)  # 45秒超时
-                            response = await page.goto(url, wait_until="domcontentloaded", timeout=45000)
-                            
-                            if response.status == 403:
-                                self.logger.warning("收到403响应，等待后重试")
-                                await asyncio.sleep(retry_delay * (attempt + 1))
-                                continue
-                                
-                            await page.wait_for_load_state("networkidle", timeout=45000)
-                            
-                            # 延迟等待确保页面加载完成
-                            await asyncio.sleep(3)
-                            
-                            # 在选手统计页面加载后,截图前添加以隐藏cookie窗口的脚本
-                            await page.evaluate("""() => {
-                                // 使用CSS隐藏cookiebot相关元素
-                                const style = document.createElement('style');
-                                style.textContent = `
-                                    #CybotCookiebotDialog,
-                                    .CookieDeclaration,
-                                    #CybotCookiebotDialogBodyUnderlay,
-                                    .cookiebot-overlay,
-                                    [class*="cookie-notice"],
-                                    [class*="cookie-banner"],
-                                    [id*="cookie-banner"],
-                                    [id*="cookie-notice"] {
-                                        display: none !important;
-                                        visibility: hidden !important;
-                                        opacity: 0 !important;
-                                        z-index: -9999 !important;
-                                    }
-                                `;
-                                document.head.appendChild(style);
-                            }""")
-                            # 生成基础截图文件名
-                            base_filename = f"player_stats_{selected_player['id']}_{int(time.time())}"
-                            image_paths = []
-                            total_height = 0
-                            width = 648  # 固定宽度
-                            
-                            # 获取并截取三个统计区域
-                            # 1. playerSummaryStatBox
-                            summary_element = await page.wait_for_selector(".playerSummaryStatBox", timeout=45000)
-                            if summary_element:
-                                summary_path = os.path.join(self.screenshot_dir, f"{base_filename}_summary.png")
-                                await summary_element.screenshot(path=summary_path)
-                                image_paths.append((summary_path, 245))
-                                total_height += 245
-                            
-                            # 2. role-stats-container
-                            role_stats_element = await page.wait_for_selector(".role-stats-container.standard-box", timeout=45000)
-                            if role_stats_element:
-                                role_stats_path = os.path.join(self.screenshot_dir, f"{base_filename}_role_stats.png")
-                                await role_stats_element.screenshot(path=role_stats_path)
-                                image_paths.append((role_stats_path, 305))
-                                total_height += 305
-                            
-                            # 3. 选手详细数据
-                            stats_path = os.path.join(self.screenshot_dir, f"{base_filename}_stats.png")
-                            spoiler_element = await page.query_selector(".statistics")
-                            if spoiler_element:
-                                await spoiler_element.screenshot(path=stats_path)
-                                image_paths.append((stats_path, 248))
-                                total_height += 248
-                                self.logger.info("成功截取选手详细数据(.statistics)")
-                            else:
-                                self.logger.warning("未找到选手详细数据元素(.statistics)")
-
-                            if not image_paths:
-                                raise Exception("未能成功截取任何统计数据区域")
-
-                            # 创建合并后的图片
-                            merged_image = PILImage.new('RGB', (width, total_height), 'white')
-                            current_height = 0
-
-                            # 依次粘贴每张图片
-                            for img_path, target_height in image_paths:
-                                with PILImage.open(img_path) as img:
-                                    # 调整图片大小以匹配目标宽度
-                                    img_width, img_height = img.size
-                                    scale_factor = width / img_width
-                                    new_height = int(img_height * scale_factor)
-                                    resized_img = img.resize((width, new_height), PILImage.Resampling.LANCZOS)
-                                    merged_image.paste(resized_img, (0, current_height))
-                                    current_height += new_height
-
-                            # 保存合并后的图片
-                            merged_path = os.path.join(self.screenshot_dir, f"{base_filename}_merged.png")
-                            merged_image.save(merged_path)
-
-                            # 发送结果
-                            message_chain = [
-                                Plain(text=f"📊 {selected_player['nickname']} 的统计数据：\n"),
-                                Image(file=merged_path)
-                            ]
-                            yield event.chain_result(message_chain)
-
-                            # 清理临时文件
-                            for img_path, _ in image_paths:
-                                try:
-                                    os.remove(img_path)
-                                except Exception as e:
-                                    self.logger.debug(f"删除临时文件失败: {str(e)}")
-
-                            break  # 如果成功则跳出重试循环
-                            
-                        except Exception as e:
-                            if attempt == max_retries - 1:  # 最后一次尝试失败
-                                raise e
-                            self.logger.warning(f"第 {attempt + 1} 次尝试失败: {str(e)}")
-                            await asyncio.sleep(retry_delay * (attempt + 1))
-                    
-                except Exception as e:
-                    self.logger.error(f"截图过程中出错: {str(e)}")
-                    yield event.plain_result("❌ 获取统计数据失败，请稍后重试")
-                    
-                finally:
-                    # 清理资源
-                    if page:
-                        await page.close()
-                    if context:
-                        await context.close()
-                    if browser:
-                        await browser.close()
-                    
         except Exception as e:
-            self.logger.error(f"获取选手统计信息失败: {str(e)}")
+            self.logger.error("获取选手统计信息失败: %s", e)
             self.logger.debug("异常详情: ", exc_info=True)
             yield event.plain_result("❌ 获取选手统计信息失败，请稍后重试")
 
     @filter.command("top选手")
+    @timed_command("top选手")
     async def query_top_players(self, event: AstrMessageEvent):
         """查询HLTV TOP选手排名"""
-        yield event.plain_result("🔍 正在查询HLTV TOP选手排名，请稍候...")
+        yield event.plain_result(f"🔍 正在查询HLTV TOP选手排名，请稍候...{self.loading_hint()}")
         
         try:
-            players = await self.get_top_players()
+            players, stale = await self.get_top_players_cached()
             
             if not players:
                 yield event.plain_result("❌ 获取选手排名失败，请稍后重试")
@@ -1234,15 +2355,15 @@ class HLTVQuery(Star):
             result = "🏆 HLTV TOP选手排名 🏆\n" + "═" * 30 + "\n\n"
             
             for idx, player in enumerate(players[:10], 1):
-                result += f"{'🥇' if idx == 1 else '🥈' if idx == 2 else '🥉' if idx == 3 else '🏅'} #{idx} {player['nickname']}\n"
-                result += f"👤 {player['name']} | 🌍 {player['country']}\n"
-                result += f"📊 评分: {player['rating']} | 🗺️ 地图数: {player['maps_played']}\n"
+                result += f"{'🥇' if idx == 1 else '🥈' if idx == 2 else '🥉' if idx == 3 else '🏅'} #{idx} {player.nickname}\n"
+                result += f"👤 {player.name} | 🌍 {player.country}\n"
+                result += f"📊 评分: {format_number(player.rating, '.2f')} | 🗺️ 地图数: {format_number(player.maps_played)}\n"
                 result += "─" * 25 + "\n"
                 
-            yield event.plain_result(result)
+            yield event.plain_result(self.with_freshness(result, stale))
             
         except Exception as e:
-            self.logger.error(f"查询TOP选手失败: {str(e)}")
+            self.logger.error("查询TOP选手失败: %s", e)
             yield event.plain_result("❌ 查询选手排名失败，请稍后重试")
 
     @filter.command("选手详情")
@@ -1277,287 +2398,77 @@ class HLTVQuery(Star):
             yield event.plain_result(result)
             
         except Exception as e:
-            self.logger.error(f"查询选手详细信息失败: {str(e)}")
+            self.logger.error("查询选手详细信息失败: %s", e)
             yield event.plain_result("❌ 查询选手详细信息失败，请稍后重试")
 
-    @filter.regex(r"^比赛\s*[a-e]$")  # 更新为新的匹配格式
+    @filter.regex(MATCH_ID_PATTERN)
+    @timed_command("比赛详情")
     async def handle_match_details(self, event: AstrMessageEvent):
-        """处理比赛详细信息查询"""
+        """按比赛ID查询比赛详细信息"""
         try:
-            user_id = event.get_session_id()
-            current_time = time.time()
-            
-            # 获取用户输入的字母
-            # 从"比赛 X"格式中提取字母
-            selected_letter = event.get_messages()[0].text.strip().split()[-1].lower()
-            
-            # 检查是否在30秒内发起的比赛结果查询
-            if user_id not in self.last_result_query or \
-               current_time - self.last_result_query[user_id] > 30:
-                self.logger.debug(f"用户 {user_id} 的查询已超时或未找到查询记录")
-                return
-            
-            # 检查输入的字母是否存在对应的比赛URL
-            if selected_letter not in self.recent_matches:
-                self.logger.debug(f"未找到字母 {selected_letter} 对应的比赛记录")
-                return
-                
-            # 获取对应的比赛URL
-            match_url = self.recent_matches[selected_letter]
-            self.logger.info(f"正在获取比赛详情，URL: {match_url}")
+            # 从"比赛 <ID>"格式中提取比赛ID
+            match_id = int(re.search(r"(\d+)\s*$", event.get_messages()[0].text).group(1))
+            match_url = self.match_url_for(event.get_session_id(), match_id)
+            self.logger.info("正在获取比赛详情，URL: %s", match_url)
             yield event.plain_result("📊 正在获取比赛详细数据，请稍候...")
 
-            async with async_playwright() as playwright:
-                browser = await playwright.chromium.launch(
-                    headless=True,
-                    args=[
-                        '--disable-web-security',
-                        '--disable-features=IsolateOrigins,site-per-process',
-                        '--no-sandbox',
-                        '--disable-setuid-sandbox',
-                        '--disable-dev-shm-usage',
-                    ]
-                )
-                
-                # 更新上下文配置
-                context = await browser.new_context(
-                    viewport={'width': 1920, 'height': 1080},
-                    user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36 Edg/120.0.0.0',
-                    ignore_https_errors=True,
-                    accept_downloads=True,
-                    java_script_enabled=True,
-                    bypass_csp=True,
-                    permissions=['notifications', 'geolocation'],
-                    extra_http_headers={
-                        'Accept': '*/*',
-                        'Accept-Language': 'en-US,en;q=0.9',
-                        'Accept-Encoding': 'gzip, deflate, br',
-                    }
-                )
+            url = f"{self.base_url}{match_url}"
+            base_filename = f"match_details_{int(time.time())}"
+            sent = 0
+            try:
+                # 先发送文字比分板，再逐张发送截图
+                async for item_type, item in self.capture(url, MATCH_SECTIONS, base_filename, "match"):
+                    if item_type == "html":
+                        with self.metrics.span("parse", page="match"):
+                            stats = self.parse_match_stats(BeautifulSoup(item, "lxml"), match_url)
+                        if stats.team1:
+                            yield event.plain_result(self.format_match_stats(match_id, stats))
+                        continue
+                    caption, image_path = item
+                    with self.metrics.span("upload", page="match"):
+                        yield event.chain_result([Plain(text=f"{caption}\n"), Image(file=image_path)])
+                    sent += 1
+                    self.remove_file(image_path)
+
+                # 检查是否至少有一个截图成功
+                if not sent:
+                    self.logger.error("未能成功截取任何比赛数据")
+                    yield event.plain_result("❌ 获取比赛详情失败，未能找到相关数据")
+                    return
 
-                page = await context.new_page()
-                
-                # 添加cookie同意
-                await page.add_init_script("""
-                    Object.defineProperty(navigator, 'webdriver', {get: () => undefined});
-                    window.localStorage.setItem('CookieConsent', JSON.stringify({
-                        accepted: true,
-                        necessary: true,
-                        preferences: true,
-                        statistics: true,
-                        marketing: true
-                    }));
-                """)
+            except Exception as e:
+                self.logger.error("获取比赛详情失败: %s", e)
+                yield event.plain_result("❌ 获取比赛详情失败，请稍后重试")
 
-                try:
-                    url = f"https://www.hltv.org{match_url}"
-                    page.set_default_timeout(45000)  # 45秒超时
-                    await page.goto(url, wait_until="domcontentloaded", timeout=45000)
-                    await page.wait_for_load_state("networkidle", timeout=45000)
-                    
-                    # 延迟等待确保页面加载完成
-                    await asyncio.sleep(3)
-                    
-                    # 页面加载后,截图前的代码
-                    await page.evaluate("""() => {
-                        // 使用CSS隐藏cookiebot相关元素
-                        const style = document.createElement('style');
-                        style.textContent = `
-                            #CybotCookiebotDialog,
-                            .CookieDeclaration,
-                            #CybotCookiebotDialogBodyUnderlay,
-                            .cookiebot-overlay,
-                            [class*="cookie-notice"],
-                            [class*="cookie-banner"],
-                            [id*="cookie-banner"],
-                            [id*="cookie-notice"] {
-                                display: none !important;
-                                visibility: hidden !important;
-                                opacity: 0 !important;
-                                z-index: -9999 !重要;
-                            }
-                        `;
-                        document.head.appendChild(style);
-                    }""")
-                    
-                    # 生成基础截图文件名
-                    base_filename = f"match_details_{int(time.time())}"
-                    
-                    # 首先添加一个通用的截图函数
-                    async def screenshot_element(page, selector, file_path, timeout=45000):
-                        try:
-                            element = await page.wait_for_selector(selector, timeout=timeout)
-                            if element:
-                                await element.screenshot(path=file_path)
-                                return True
-                        except Exception as e:
-                            self.logger.warning(f"截取元素 {selector} 失败: {str(e)}")
-                        return False
-
-                    # 在handle_match_details方法中的截图部分替换为:
-                    image_paths = []
-                    total_height = 0
-
-                   # 在handle_match_details方法中:
-                    image_paths = []
-                    total_height = 0
-
-                    #1. 大比分
-                    teams_path = os.path.join(self.screenshot_dir, f"{base_filename}_teams.png")
-                    if await screenshot_element(page, ".standard-box.teamsBox", teams_path):
-                         image_paths.append((teams_path, 300))
-                         total_height += 300
-
-                    #2. 地图比分 
-                    score_path = os.path.join(self.screenshot_dir, f"{base_filename}_score.png")
-                    score_element = await page.query_selector(".flexbox-column")
-                    if score_element:
-                         await score_element.screenshot(path=score_path)
-                         image_paths.append((score_path, 200))
-                         total_height += 200
-                            
-                    # 3. 比赛数据统计
-                    stats_path = os.path.join(self.screenshot_dir, f"{base_filename}_stats.png")
-                    stats_element = await page.query_selector("div#all-content.stats-content")
-                    if stats_element:
-                        # 获取元素的实际高度
-                        bbox = await stats_element.bounding_box()
-                        if bbox:
-                            actual_height = int(bbox['height'])
-                            # 为了确保完整截图，将高度设置得更大一些
-                            await stats_element.screenshot(path=stats_path)
-                            image_paths.append((stats_path, actual_height+220)) 
-                            total_height += actual_height+220
-                            self.logger.info(f"成功截取比赛数据(div#all-content.stats-content), 实际高度: {actual_height}px")
-                        else:
-                            self.logger.warning("无法获取比赛数据元素的边界框")
-                    else:
-                        self.logger.warning("未找到比赛数据元素(div#all-content.stats-content)")
-
-                    # 检查是否至少有一个截图成功
-                    if not image_paths:
-                        self.logger.error("未能成功截取任何比赛数据")
-                        yield event.plain_result("❌ 获取比赛详情失败，未能找到相关数据")
-                        return
-                    
-                    # 合并图片
-                    width = 645  # 固定宽度
-                    current_height = 0
-
-                    # 首先计算实际需要的总高度
-                    total_height = 0
-                    for _, img_height in image_paths:
-                        with PILImage.open(_) as img:
-                            img_width, img_height = img.size
-                            scale_factor = width / img_width
-                            new_height = int(img_height * scale_factor)
-                            total_height += new_height
-
-                    # 创建足够大的画布
-                    merged_image = PILImage.new('RGB', (width, total_height), 'white')
-
-                    # 依次粘贴图片
-                    for img_path, _ in image_paths:
-                        try:
-                            with PILImage.open(img_path) as img:
-                                # 调整图片大小以匹配目标宽度
-                                img_width, img_height = img.size
-                                scale_factor = width / img_width
-                                new_height = int(img_height * scale_factor)
-                                resized_img = img.resize((width, new_height), PILImage.Resampling.LANCZOS)
-                                
-                                # 确保不会超出边界
-                                if current_height + new_height <= total_height:
-                                    merged_image.paste(resized_img, (0, current_height))
-                                    current_height += new_height
-                                    
-                        except Exception as e:
-                            self.logger.error(f"处理图片 {img_path} 时出错: {str(e)}")
-                    
-                    # 保存合并后的图片
-                    merged_path = os.path.join(self.screenshot_dir, f"{base_filename}_merged.png")
-                    merged_image.save(merged_path)
-                    
-                    # 发送结果
-                    message_chain = [
-                        Plain(text="📊 比赛详细数据：\n"),
-                        Image(file=merged_path)
-                    ]
-                    yield event.chain_result(message_chain)
-                    
-                    # 清理临时文件
-                    for img_path, _ in image_paths:
-                        try:
-                            os.remove(img_path)
-                        except Exception as e:
-                            self.logger.debug(f"删除临时文件失败: {str(e)}")
-                    
-                except Exception as e:
-                    self.logger.error(f"获取比赛详情失败: {str(e)}")
-                    yield event.plain_result("❌ 获取比赛详情失败，请稍后重试")
-                
-                finally:
-                    await page.close()
-                    await context.close()
-                    await browser.close()
-                    
         except Exception as e:
-            self.logger.error(f"处理比赛详情查询失败: {str(e)}")
+            self.logger.error("处理比赛详情查询失败: %s", e)
             yield event.plain_result("❌ 获取比赛详情失败，请稍后重试")
 
-            # 在handle_match_details方法中修改图片合并部分的代码：
-
-            # 在截图部分后添加日志记录
-            self.logger.info(f"准备合并的图片路径: {image_paths}")
-            self.logger.info(f"计算得到的总高度: {total_height}")
-
-            # 合并图片部分的代码修改如下
-            try:
-                width = 1000  # 固定宽度
-                merged_image = PILImage.new('RGB', (width, total_height), 'white')
-                current_height = 0
-                
-                for img_path, target_height in image_paths:
-                    self.logger.info(f"正在处理图片: {img_path}, 目标高度: {target_height}")
-                    try:
-                        with PILImage.open(img_path) as img:
-                            # 记录原始图片尺寸
-                            original_size = img.size
-                            self.logger.info(f"原始图片尺寸: {original_size}")
-                            
-                            # 调整图片大小以匹配目标宽度
-                            img_width, img_height = img.size
-                            scale_factor = width / img_width
-                            new_height = int(img_height * scale_factor)
-                            self.logger.info(f"缩放后的新高度: {new_height}")
-                            
-                            resized_img = img.resize((width, new_height), PILImage.Resampling.LANCZOS)
-                            merged_image.paste(resized_img, (0, current_height))
-                            self.logger.info(f"已粘贴图片到位置: y={current_height}")
-                            
-                            current_height += new_height
-                            self.logger.info(f"当前累计高度: {current_height}")
-                            
-                    except Exception as e:
-                        self.logger.error(f"处理图片 {img_path} 时出错: {str(e)}")
-
-                # 记录最终合并图片的尺寸
-                self.logger.info(f"最终合并图片尺寸: {merged_image.size}")
-                
-                # 保存合并后的图片
-                merged_path = os.path.join(self.screenshot_dir, f"{base_filename}_merged.png")
-                merged_image.save(merged_path)
-                self.logger.info(f"已保存合并图片到: {merged_path}")
-                
-            except Exception as e:
-                self.logger.error(f"合并图片时发生错误: {str(e)}")
-                raise e
+    def match_url_for(self, session: str, match_id: int) -> str:
+        """比赛ID对应的页面路径：优先使用会话列表中的原始链接，ID 是稳定的，不在列表中也可以直接访问"""
+        cursor = self.list_cursors.get(session)
+        for item in (cursor.items if cursor else ()):
+            if item.match_id == match_id and item.url:
+                return match_path(item.url)
+        return match_path(match_id)
+
+    def parse_player_summary(self, page) -> str:
+        """解析选手统计页顶部的概览数据（Rating、DPR、KAST 等），没有时返回空字符串"""
+        lines = []
+        for stat in page.find_all("div", {"class": "summaryStatBreakdown"}):
+            label = stat.find("div", {"class": "summaryStatBreakdownSubHeader"})
+            value = stat.find("div", {"class": "summaryStatBreakdownDataValue"})
+            if label and value:
+                lines.append(f"• {' '.join(label.text.split())}: {value.text.strip()}")
+        if not lines:
+            self.selector_miss("div.summaryStatBreakdown")
+        return "\n".join(lines)
 
     async def search_players(self, player_name: str):
         """搜索选手信息"""
         try:
-            self.logger.info(f"正在搜索选手: {player_name}")
-            url = f"https://www.hltv.org/search?query={player_name}"
+            self.logger.info("正在搜索选手: %s", player_name)
+            url = f"{self.base_url}/search?query={player_name}"
             page = await self.get_parsed_page(url)
             
             if not page:
@@ -1568,11 +2479,13 @@ class HLTVQuery(Star):
             width_control = page.find("div", {"class": "widthControl"})
             if not width_control:
                 self.logger.error("未找到widthControl元素")
+                self.selector_miss("div.widthControl")
                 return []
                 
             first_table = width_control.find("table")
             if not first_table:
                 self.logger.error("未找到table元素")
+                self.selector_miss("div.widthControl table")
                 return []
                 
             # 遍历table下的所有行
@@ -1595,26 +2508,18 @@ class HLTVQuery(Star):
                     country_img = row.find("img", {"class": "flag"})
                     country = country_img.get("alt", "Unknown") if country_img else "Unknown"
                     
-                    # 构建详细页URL
-                    stats_url = f"https://www.hltv.org/stats/players/{player_id}/{player_nickname}"
-                    
-                    player_info = {
-                        'id': int(player_id),
-                        'nickname': player_nickname,
-                        'country': country,
-                        'url': stats_url
-                    }
+                    player_info = PlayerRecord(player_id, player_nickname, country=country)
                     players.append(player_info)
                     
-                    self.logger.debug(f"找到选手: {player_info}")
+                    self.item_logger.debug("search_player", "找到选手: %s", player_info)
                     
                 except Exception as e:
-                    self.logger.error(f"解析选手信息时出错: {str(e)}")
+                    self.logger.error("解析选手信息时出错: %s", e)
                     continue
                     
             return players
             
         except Exception as e:
-            self.logger.error(f"搜索选手失败: {str(e)}")
+            self.logger.error("搜索选手失败: %s", e)
             self.logger.debug("异常详情: ", exc_info=True)
             return []
@@ -0,0 +1,177 @@
+"""本地比赛历史
+
+结果页和比赛详情页解析出的已结束比赛都记入这里，并维护两个索引：
+按战队对（交手记录）和按战队+时间（近期状态）。两个索引中的比赛都按开赛时间排序，
+查询只是取列表末尾或二分查找，不需要翻结果页。
+"""
+import os
+import json
+import logging
+from bisect import bisect_left, insort
+
+from .player_index import fold_text
+from .records import MatchResult
+
+logger = logging.getLogger(__name__)
+
+
+def _sort_key(match: MatchResult):
+    return (match.timestamp or 0, match.match_id)
+
+
+def outcome(match: MatchResult, team_key: str):
+    """从 team_key 一方看的比赛结果：1 胜、-1 负、0 平，比分无法比较时为 None"""
+    try:
+        score1, score2 = int(match.score1), int(match.score2)
+    except (TypeError, ValueError):
+        return None
+    if fold_text(match.team2) == team_key:
+        score1, score2 = score2, score1
+    return (score1 > score2) - (score1 < score2)
+
+
+async def backfill_history(fetch_results, record, pages: int) -> int:
+    """向后翻结果页补齐历史，返回新增的场数
+
+    fetch_results(页序号) 返回该页的比赛列表（失败时为 None），record(比赛列表) 返回新增或更新的场数。
+    某页获取失败、某页有比赛已在历史中（与已有历史衔接）或翻满 pages 页时停止。
+    """
+    total = 0
+    for index in range(1, pages + 1):
+        results = await fetch_results(index)
+        if not results:
+            logger.warning("补齐比赛历史时第 %s 页获取失败，停止补齐", index + 1)
+            break
+        added = record(results)
+        total += added
+        logger.info("补齐比赛历史: 结果页第 %s 页新增 %s 场", index + 1, added)
+        if added < len(results):
+            break
+    return total
+
+
+class MatchHistory:
+    """比赛ID -> MatchResult，最多保留 max_matches 场（按开赛时间淘汰最早的）"""
+
+    def __init__(self, path: str = None, max_matches: int = 20000):
+        self.path = path
+        self.max_matches = max_matches
+        self.matches = {}
+        self.by_team = {}        # 折叠后的战队名 -> (排序键列表, 比赛列表)，均按开赛时间排序
+        self.by_pair = {}        # (战队键, 战队键)（按字母序）-> (排序键列表, 比赛列表)
+        self.order = []          # 全部比赛的排序键，按开赛时间排序，超出上限时从头部淘汰
+        self.dirty = False
+
+    def __len__(self):
+        return len(self.matches)
+
+    @staticmethod
+    def pair_key(team_a: str, team_b: str):
+        return tuple(sorted((team_a, team_b)))
+
+    def add(self, match: MatchResult) -> bool:
+        """记入一场比赛，已有记录时用新数据补全缺失的时间/赛事；返回是否有变化
+
+        已存满且这场比赛比已有的都早时不记入（记入后也会立即被淘汰）。
+        """
+        if match.match_id is None or not match.team1 or not match.team2:
+            return False
+        existing = self.matches.get(match.match_id)
+        if existing is not None:
+            if (existing.score1, existing.score2) == (match.score1, match.score2) and (
+                    existing.timestamp is not None or match.timestamp is None):
+                return False
+            if match.timestamp is None:
+                match.timestamp = existing.timestamp
+            if not match.event:
+                match.event = existing.event
+            self._unindex(existing)
+        elif len(self.matches) >= self.max_matches and self.order and _sort_key(match) < self.order[0]:
+            return False
+        self.matches[match.match_id] = match
+        self._index(match)
+        if len(self.matches) > self.max_matches:
+            oldest = self.matches[self.order[0][1]]
+            self._unindex(oldest)
+            del self.matches[oldest.match_id]
+        self.dirty = True
+        return True
+
+    def add_many(self, matches) -> int:
+        return sum(1 for match in matches if self.add(match))
+
+    def _indexes(self, match: MatchResult):
+        team_keys = (fold_text(match.team1), fold_text(match.team2))
+        return (
+            self.by_team.setdefault(team_keys[0], ([], [])),
+            self.by_team.setdefault(team_keys[1], ([], [])),
+            self.by_pair.setdefault(self.pair_key(*team_keys), ([], [])),
+        )
+
+    def _index(self, match: MatchResult):
+        key = _sort_key(match)
+        insort(self.order, key)
+        for keys, items in self._indexes(match):
+            index = bisect_left(keys, key)
+            keys.insert(index, key)
+            items.insert(index, match)
+
+    def _unindex(self, match: MatchResult):
+        key = _sort_key(match)
+        index = bisect_left(self.order, key)
+        if index < len(self.order) and self.order[index] == key:
+            del self.order[index]
+        for keys, items in self._indexes(match):
+            index = bisect_left(keys, key)
+            if index < len(items) and items[index].match_id == match.match_id:
+                del keys[index], items[index]
+
+    def resolve_team(self, name: str):
+        """把用户输入的战队名解析为索引中的键：完全匹配优先，其次唯一的包含匹配"""
+        key = fold_text(name)
+        if key in self.by_team:
+            return key
+        candidates = [team for team in self.by_team if key and key in team]
+        return candidates[0] if len(candidates) == 1 else None
+
+    def head_to_head(self, team_a: str, team_b: str, limit: int = 10) -> list:
+        """两支战队之间最近的比赛，最新的在前"""
+        return self.by_pair.get(self.pair_key(team_a, team_b), ([], []))[1][-limit:][::-1]
+
+    def recent(self, team_key: str, limit: int = 10) -> list:
+        """战队最近的比赛，最新的在前"""
+        return self.by_team.get(team_key, ([], []))[1][-limit:][::-1]
+
+    def since(self, team_key: str, start: float) -> list:
+        """战队开赛时间不早于 start 的比赛，按时间先后排序；没有时间的比赛不计入"""
+        keys, items = self.by_team.get(team_key, ([], []))
+        return items[bisect_left(keys, (start, -1)):]
+
+    def load(self) -> int:
+        if not self.path or not os.path.exists(self.path):
+            return 0
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                rows = json.load(f)
+            for row in rows:
+                self.add(MatchResult(*row))
+        except Exception as e:
+            logger.error("读取比赛历史失败: %s", e)
+        self.dirty = False
+        return len(self.matches)
+
+    def save(self):
+        if not self.path or not self.dirty:
+            return
+        rows = [
+            [m.match_id, m.team1, m.team2, m.score1, m.score2, m.event, m.url, m.timestamp]
+            for m in sorted(self.matches.values(), key=_sort_key)
+        ]
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(rows, f, ensure_ascii=False, separators=(",", ":"))
+            os.replace(tmp_path, self.path)
+            self.dirty = False
+        except Exception as e:
+            logger.error("保存比赛历史失败: %s", e)
@@ -0,0 +1,228 @@
+"""基于 tracemalloc 的内存诊断
+
+开启后定期拍摄 tracemalloc 快照，与上一次快照和开启时的基线比较，
+把增长按分配点所在的插件代码行（main.py 等）归类；追踪内存在最近一小时内的增长速率
+超过阈值时告警。tracemalloc 本身有明显开销，默认关闭，由配置或管理员指令开启。
+"""
+import os
+import time
+import asyncio
+import logging
+import linecache
+import tracemalloc
+from collections import deque
+
+from .procfs import process_rss
+
+logger = logging.getLogger(__name__)
+
+_PLUGIN_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 不统计 tracemalloc 自身和导入机制的分配
+_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+def plugin_site(traceback):
+    """调用栈中离分配点最近的插件代码帧，没有时返回 None（traceback 从最早的帧排到最近的帧）"""
+    for frame in reversed(traceback):
+        if frame.filename.startswith(_PLUGIN_DIR) and frame.filename != __file__:
+            return frame
+    return None
+
+
+def site_label(site) -> str:
+    if site is None:
+        return "插件外"
+    filename, lineno = site
+    code = linecache.getline(filename, lineno).strip()
+    label = f"{os.path.relpath(filename, _PLUGIN_DIR)}:{lineno}"
+    return f"{label} {code[:40]}" if code else label
+
+
+def attribute(diffs) -> list:
+    """把按调用栈分组的快照差异归到插件代码行，返回 [((文件, 行号) 或 None, 字节变化, 块数变化)]，按增长排序"""
+    sites = {}
+    for diff in diffs:
+        frame = plugin_site(diff.traceback)
+        key = (frame.filename, frame.lineno) if frame else None
+        size, count = sites.get(key, (0, 0))
+        sites[key] = (size + diff.size_diff, count + diff.count_diff)
+    return sorted(((key, size, count) for key, (size, count) in sites.items()), key=lambda item: item[1], reverse=True)
+
+
+def format_bytes(value: float) -> str:
+    sign = "-" if value < 0 else ""
+    value = abs(value)
+    for unit in ("B", "KB", "MB"):
+        if value < 1024:
+            return f"{sign}{value:.0f}{unit}" if unit == "B" else f"{sign}{value:.1f}{unit}"
+        value /= 1024
+    return f"{sign}{value:.2f}GB"
+
+
+class MemoryDiagnostics:
+    """周期性 tracemalloc 快照、增长归因和增长速率告警"""
+
+    def __init__(self, interval: float = 600, frames: int = 25, alert_mb_per_hour: float = 50,
+                 notify=None, containers=None, directory: str = None, keep: int = 20):
+        self.interval = max(10, interval)
+        self.frames = frames
+        self.alert_rate = alert_mb_per_hour * 2 ** 20
+        self.notify = notify            # async (会话列表, 文本)
+        self.containers = containers    # 无参函数，返回 {名称: 元素个数}，用于观察会话字典等是否只增不减
+        self.directory = directory
+        self.keep = keep
+        self.sessions = set()           # 接收告警的管理员会话
+        self.baseline = None
+        self.latest = None
+        self.last_growth = []           # 最近两次快照之间的增长归因
+        self.samples = deque(maxlen=max(2, int(3600 // self.interval) + 1))  # (monotonic, 追踪字节数)
+        self._owns_tracing = False
+        self._alerted_at = None
+        self._task = None
+
+    @property
+    def tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self):
+        """开始追踪并启动定期快照；需要运行中的事件循环"""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self._owns_tracing = True
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        if self._owns_tracing:
+            tracemalloc.stop()
+            self._owns_tracing = False
+        self.baseline = self.latest = None
+        self.last_growth = []
+        self.samples.clear()
+
+    async def _run(self):
+        while True:
+            try:
+                await self.sample()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("内存快照失败: %s", e)
+            await asyncio.sleep(self.interval)
+
+    def _take(self):
+        return tracemalloc.take_snapshot().filter_traces(_FILTERS)
+
+    async def sample(self):
+        """拍摄一次快照，记录增长速率，超过阈值时告警（每小时最多一次）"""
+        # 拍快照和比较在大堆上要几百毫秒，放到线程里做，事件循环仍可交替运行
+        snapshot = await asyncio.to_thread(self._take)
+        previous, self.latest = self.latest, snapshot
+        if self.baseline is None:
+            self.baseline = snapshot
+        if previous is not None:
+            self.last_growth = await asyncio.to_thread(
+                lambda: attribute(snapshot.compare_to(previous, "traceback"))
+            )
+            for site, size, count in self.last_growth[:5]:
+                logger.debug("内存增长 %s: %s (%+d 块)", site_label(site), format_bytes(size), count)
+
+        now = time.monotonic()
+        self.samples.append((now, tracemalloc.get_traced_memory()[0]))
+        rate = self.growth_rate()
+        if rate is None or rate <= self.alert_rate:
+            return
+        if self._alerted_at is not None and now - self._alerted_at < 3600:
+            return
+        self._alerted_at = now
+        text = (
+            f"⚠️ 插件内存持续增长: {format_bytes(rate)}/小时，超过告警阈值 {format_bytes(self.alert_rate)}/小时\n"
+            + self.format_sites(self.last_growth, 5, "最近一次快照以来增长最多的位置")
+        )
+        logger.warning(text)
+        if self.notify and self.sessions:
+            await self.notify(list(self.sessions), text)
+
+    def growth_rate(self):
+        """最近一小时（不足一小时时为全部样本）追踪内存的增长速率，字节/小时；样本不足时为 None"""
+        if len(self.samples) < 2:
+            return None
+        (started, first), (ended, last) = self.samples[0], self.samples[-1]
+        if ended - started < self.interval / 2:
+            return None
+        return (last - first) / (ended - started) * 3600
+
+    @staticmethod
+    def format_sites(sites, limit: int, title: str) -> str:
+        text = f"{title}:\n"
+        shown = [item for item in sites if item[1] > 0][:limit]
+        if not shown:
+            return text + "• 无明显增长\n"
+        for site, size, count in shown:
+            text += f"• {site_label(site)}  +{format_bytes(size)} ({count:+d} 块)\n"
+        return text
+
+    async def report(self, limit: int = 10) -> str:
+        """当前内存概况和自基线以来增长最多的插件代码行，同时把完整调用栈写入诊断目录"""
+        snapshot = await asyncio.to_thread(self._take)
+        diffs = await asyncio.to_thread(lambda: snapshot.compare_to(self.baseline or snapshot, "traceback"))
+        sites = await asyncio.to_thread(attribute, diffs)
+
+        current, peak = tracemalloc.get_traced_memory()
+        rss = process_rss()
+        rate = self.growth_rate()
+        text = "🧠 内存诊断\n" + "═" * 30 + "\n"
+        text += f"tracemalloc: 当前 {format_bytes(current)}，峰值 {format_bytes(peak)}"
+        text += f"，进程 RSS {format_bytes(rss)}\n" if rss else "\n"
+        if rate is not None:
+            text += f"增长速率: {format_bytes(rate)}/小时（告警阈值 {format_bytes(self.alert_rate)}/小时）\n"
+        text += "\n" + self.format_sites(sites, limit, "自开始追踪以来增长最多的位置")
+        if self.last_growth:
+            text += "\n" + self.format_sites(self.last_growth, 5, "最近一次快照以来增长最多的位置")
+        if self.containers:
+            sizes = self.containers()
+            text += "\n容器大小:\n" + "".join(f"• {name}: {size}\n" for name, size in sizes.items())
+
+        path = await asyncio.to_thread(self._dump, diffs, limit * 3)
+        if path:
+            text += f"\n💾 {path}"
+        return text.rstrip()
+
+    def _dump(self, diffs, limit: int):
+        """把增长最多的分配连同完整调用栈写入文本文件，返回路径"""
+        if not self.directory:
+            return None
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"memory-{time.strftime('%Y%m%d-%H%M%S')}.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            for diff in sorted(diffs, key=lambda item: item.size_diff, reverse=True)[:limit]:
+                f.write(f"{format_bytes(diff.size_diff)} ({diff.count_diff:+d} 块)，共 {format_bytes(diff.size)}\n")
+                f.write("\n".join(diff.traceback.format(most_recent_first=True)) + "\n\n")
+        self._prune()
+        return path
+
+    def _prune(self):
+        """只保留最新的 keep 个诊断文件"""
+        files = sorted(
+            (os.path.join(self.directory, name) for name in os.listdir(self.directory)
+             if name.startswith("memory-") and name.endswith(".txt")),
+            key=os.path.getmtime,
+        )
+        for path in files[:-self.keep]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
@@ -0,0 +1,172 @@
+import os
+import time
+import functools
+from collections import deque, defaultdict
+from contextlib import contextmanager
+
+
+def _label_key(name: str, labels: dict):
+    return (name, tuple(sorted(labels.items())))
+
+
+def _format_labels(labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+
+class Histogram:
+    """耗时直方图，保留最近 size 个样本用于计算分位数"""
+
+    __slots__ = ("samples", "count", "total", "max")
+
+    def __init__(self, size: int = 1024):
+        self.samples = deque(maxlen=size)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.samples.append(value)
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def percentiles(self, *qs):
+        if not self.samples:
+            return [0.0 for _ in qs]
+        ordered = sorted(self.samples)
+        last = len(ordered) - 1
+        return [ordered[min(last, max(0, int(round(q * last))))] for q in qs]
+
+
+class Metrics:
+    """插件内部的计时与计数指标
+
+    - span(): 记录某个阶段的耗时（秒），如 fetch.navigate、screenshot、merge；
+    - inc(): 计数器，如抓取字节数、各选择器解析失败次数；
+    - gauge(): 注册按需读取的瞬时值，如浏览器占用、缓存命中率。
+    """
+
+    def __init__(self, reservoir: int = 1024):
+        self.reservoir = reservoir
+        self.histograms = defaultdict(lambda: Histogram(self.reservoir))
+        self.counters = defaultdict(float)
+        self.gauges = {}
+        self.started_at = time.time()
+
+    def observe(self, name: str, seconds: float, /, **labels):
+        self.histograms[_label_key(name, labels)].observe(seconds)
+
+    @contextmanager
+    def span(self, name: str, /, **labels):
+        """记录代码块耗时，异常时额外计数 <name>.errors"""
+        started = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.inc(f"{name}.errors", **labels)
+            raise
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def inc(self, name: str, value: float = 1, /, **labels):
+        self.counters[_label_key(name, labels)] += value
+
+    def gauge(self, name: str, read):
+        """注册瞬时值，read 为无参函数，返回数值或 {标签元组: 数值}"""
+        self.gauges[name] = read
+
+    def _read_gauges(self):
+        for name, read in self.gauges.items():
+            try:
+                value = read()
+            except Exception:
+                continue
+            if isinstance(value, dict):
+                for labels, item in value.items():
+                    yield name, labels, item
+            else:
+                yield name, (), value
+
+    def summary(self) -> str:
+        """生成在聊天中展示的指标摘要"""
+        lines = [f"⏱️ 运行时长: {(time.time() - self.started_at) / 3600:.1f} 小时", ""]
+
+        if self.histograms:
+            lines.append("📈 阶段耗时 (次数 | p50 / p95 / p99 秒)")
+            for (name, labels), hist in sorted(self.histograms.items()):
+                p50, p95, p99 = hist.percentiles(0.5, 0.95, 0.99)
+                lines.append(f"• {name}{_format_labels(labels)}: {hist.count} | {p50:.2f} / {p95:.2f} / {p99:.2f}")
+            lines.append("")
+
+        gauges = list(self._read_gauges())
+        if gauges:
+            lines.append("📊 状态")
+            for name, labels, value in gauges:
+                shown = f"{value:.2f}" if isinstance(value, float) else value
+                lines.append(f"• {name}{_format_labels(labels)}: {shown}")
+            lines.append("")
+
+        if self.counters:
+            lines.append("🔢 计数")
+            for (name, labels), value in sorted(self.counters.items()):
+                lines.append(f"• {name}{_format_labels(labels)}: {value:g}")
+        return "\n".join(lines).rstrip()
+
+    def prometheus_text(self, prefix: str = "hltv") -> str:
+        """导出为 Prometheus 文本格式"""
+
+        def metric_name(name):
+            return f"{prefix}_" + "".join(c if c.isalnum() else "_" for c in name)
+
+        out = []
+        for (name, labels), hist in sorted(self.histograms.items()):
+            base = metric_name(name) + "_seconds"
+            for q, value in zip(("0.5", "0.95", "0.99"), hist.percentiles(0.5, 0.95, 0.99)):
+                out.append(f"{base}{_format_labels(labels + (('quantile', q),))} {value:.6f}")
+            out.append(f"{base}_count{_format_labels(labels)} {hist.count}")
+            out.append(f"{base}_sum{_format_labels(labels)} {hist.total:.6f}")
+        for (name, labels), value in sorted(self.counters.items()):
+            out.append(f"{metric_name(name)}_total{_format_labels(labels)} {value:g}")
+        for name, labels, value in self._read_gauges():
+            out.append(f"{metric_name(name)}{_format_labels(labels)} {value}")
+        return "\n".join(out) + "\n"
+
+    def dump_prometheus(self, path: str):
+        """原子地写入 Prometheus 文本文件，供 node_exporter textfile collector 读取"""
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp_path, path)
+
+
+# 所有经过 timed_command 的指令名，/hltv_profile 据此校验输入
+COMMAND_NAMES = set()
+
+
+def timed_command(name: str):
+    """记录指令处理器（异步生成器）从开始到最后一条回复发出的总耗时"""
+    COMMAND_NAMES.add(name)
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(self, event, *args, **kwargs):
+            handler = func(self, event, *args, **kwargs)
+            if name in self.profiler.armed:
+                # 管理员开启了该指令的剖析（见 profiling.py），未开启时只有这一次字典查找
+                handler = self.profiler.profile(name, handler)
+            started = time.perf_counter()
+            try:
+                async for result in handler:
+                    yield result
+            except BaseException:
+                self.metrics.inc("command.errors", name=name)
+                raise
+            finally:
+                self.metrics.observe("command", time.perf_counter() - started, name=name)
+
+        return wrapper
+
+    return decorator
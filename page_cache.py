@@ -0,0 +1,115 @@
+import re
+import time
+import hashlib
+
+# 指纹计算前去除的动态内容（脚本、样式、注释）
+_NOISE_PATTERN = re.compile(r"<script\b.*?</script>|<style\b.*?</style>|<!--.*?-->", re.S | re.I)
+
+# 返回过期数据的原因
+STALE_REFRESHING = "refreshing"     # 已在后台刷新（stale-while-revalidate）
+STALE_UNAVAILABLE = "unavailable"   # HLTV 熔断中，没有发起刷新
+STALE_FAILED = "failed"             # 刷新失败，退回旧数据
+
+
+def region_fingerprint(html: str, region=None) -> str:
+    """计算页面关键区域的内容指纹
+
+    region 为 (起始标记, 结束标记) 元组，只对两者之间的HTML计算哈希，
+    这样广告、脚本等与数据无关的变化不会导致重新解析。
+    找不到标记时退化为对去除脚本后的整页计算哈希。
+    """
+    fragment = None
+    if region:
+        start_marker, end_marker = region
+        start = html.find(start_marker)
+        if start != -1:
+            end = html.find(end_marker, start + len(start_marker)) if end_marker else -1
+            fragment = html[start:end] if end != -1 else html[start:]
+    if fragment is None:
+        fragment = html
+    fragment = _NOISE_PATTERN.sub("", fragment)
+    return hashlib.blake2b(fragment.encode("utf-8", "ignore"), digest_size=16).hexdigest()
+
+
+class CacheEntry:
+    __slots__ = ("fingerprint", "etag", "last_modified", "value", "fetched_at")
+
+    def __init__(self, fingerprint, etag, last_modified, value, fetched_at):
+        self.fingerprint = fingerprint
+        self.etag = etag
+        self.last_modified = last_modified
+        self.value = value
+        self.fetched_at = fetched_at
+
+    def age(self) -> float:
+        return time.time() - self.fetched_at
+
+    def stale(self, reason: str):
+        return Staleness(self.fetched_at, reason)
+
+
+class Staleness:
+    """随过期数据一起返回：数据的获取时间和为什么是过期数据（STALE_*）"""
+
+    __slots__ = ("fetched_at", "reason")
+
+    def __init__(self, fetched_at: float, reason: str):
+        self.fetched_at = fetched_at
+        self.reason = reason
+
+
+class PageCache:
+    """按键缓存页面解析/渲染结果，并记录内容指纹
+
+    过期后重新获取页面时，若关键区域指纹未变，则跳过解析与渲染，直接沿用上次的结果并刷新时间戳。
+    ETag/Last-Modified 只作参考：有些前端（CDN、模拟服务器）返回固定不变的校验值，
+    页面已经取回，以指纹为准不会多出请求。
+    """
+
+    def __init__(self):
+        self.entries = {}
+        self.stats = {"hits": 0, "stale_hits": 0, "unchanged": 0, "changed": 0, "stale_validators": 0}
+
+    def get(self, key):
+        return self.entries.get(key)
+
+    def is_unchanged(self, key, fingerprint, headers=None) -> bool:
+        """判断新获取的页面与缓存相比是否未变化，以关键区域指纹为准"""
+        entry = self.entries.get(key)
+        if not entry:
+            return False
+        if fingerprint == entry.fingerprint:
+            return True
+        headers = headers or {}
+        etag = headers.get("etag")
+        last_modified = headers.get("last-modified")
+        if (etag and etag == entry.etag) or (last_modified and last_modified == entry.last_modified):
+            # 校验值声称未变化但内容已变，记下来便于发现返回固定校验值的前端
+            self.stats["stale_validators"] += 1
+        return False
+
+    def touch(self, key):
+        """内容未变化：只刷新时间戳"""
+        entry = self.entries[key]
+        entry.fetched_at = time.time()
+        self.stats["unchanged"] += 1
+        return entry
+
+    def store(self, key, fingerprint, headers, value):
+        headers = headers or {}
+        entry = CacheEntry(
+            fingerprint,
+            headers.get("etag"),
+            headers.get("last-modified"),
+            value,
+            time.time(),
+        )
+        self.entries[key] = entry
+        self.stats["changed"] += 1
+        return entry
+
+    def invalidate(self, key=None):
+        if key is None:
+            self.entries.clear()
+        else:
+            self.entries.pop(key, None)
@@ -0,0 +1,70 @@
+"""按会话保存的列表分页游标
+
+/比赛结果、/近期比赛 解析出的完整列表已经在页面缓存中，翻页只是对同一个列表切片：
+游标只保存列表的引用和当前页码，"下一页" 不会重新抓取页面。
+"""
+import time
+
+# 按ID查看列表中的比赛："比赛 <ID>"。HLTV 比赛ID至少 6 位，"比赛 2024" 这类年份不会触发抓取
+MATCH_ID_PATTERN = r"^比赛\s*\d{6,}$"
+
+
+class PageCursor:
+    """一个会话最近一次查询的列表和当前页码（从 1 开始）"""
+
+    __slots__ = ("kind", "items", "page", "page_size", "stale", "touched_at")
+
+    def __init__(self, kind: str, items, page_size: int, stale=None):
+        self.kind = kind
+        self.items = items
+        self.page = 1
+        self.page_size = max(1, page_size)
+        self.stale = stale
+        self.touched_at = time.monotonic()
+
+    @property
+    def pages(self) -> int:
+        return max(1, -(-len(self.items) // self.page_size))
+
+    def seek(self, page: int) -> bool:
+        """跳到第 page 页，超出范围时返回 False 且不移动"""
+        if not 1 <= page <= self.pages:
+            return False
+        self.page = page
+        self.touched_at = time.monotonic()
+        return True
+
+    @property
+    def offset(self) -> int:
+        return (self.page - 1) * self.page_size
+
+    def current(self):
+        return self.items[self.offset:self.offset + self.page_size]
+
+
+class CursorStore:
+    """会话 -> 游标，ttl 秒内没有翻页的游标失效，最多保留 max_sessions 个会话"""
+
+    def __init__(self, ttl: float = 600, max_sessions: int = 1000):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._cursors = {}
+
+    def open(self, session: str, kind: str, items, page_size: int, stale=None) -> PageCursor:
+        self._cursors.pop(session, None)
+        if len(self._cursors) >= self.max_sessions:
+            # dict 按插入顺序，最早打开的游标先淘汰
+            self._cursors.pop(next(iter(self._cursors)))
+        cursor = self._cursors[session] = PageCursor(kind, items, page_size, stale)
+        return cursor
+
+    def get(self, session: str, kind: str = None):
+        cursor = self._cursors.get(session)
+        if cursor is None:
+            return None
+        if time.monotonic() - cursor.touched_at > self.ttl:
+            del self._cursors[session]
+            return None
+        if kind is not None and cursor.kind != kind:
+            return None
+        return cursor
@@ -0,0 +1,219 @@
+import os
+import json
+import bisect
+import logging
+import unicodedata
+from collections import defaultdict
+
+from .records import PlayerRecord
+
+logger = logging.getLogger(__name__)
+
+# 模糊匹配的最低相似度（三元组 Jaccard 系数）
+FUZZY_THRESHOLD = 0.3
+
+
+def fold_text(text: str) -> str:
+    """去除重音、统一大小写并只保留字母数字，例如 'Šimon' -> 'simon'"""
+    if not text:
+        return ""
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(
+        ch for ch in decomposed.casefold()
+        if ch.isalnum() and not unicodedata.combining(ch)
+    )
+
+
+def trigrams(folded: str) -> set:
+    """生成带边界填充的三元组集合"""
+    if not folded:
+        return set()
+    padded = f"  {folded} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def parse_player_href(href: str):
+    """从 /player/<id>/<nick> 或 /stats/players/<id>/<nick> 链接中解析选手ID和昵称"""
+    if not href:
+        return None
+    parts = [part for part in href.split("?")[0].split("/") if part]
+    for idx, part in enumerate(parts):
+        if part in ("player", "players"):
+            try:
+                player_id = int(parts[idx + 1])
+            except (IndexError, ValueError):
+                continue
+            nickname = parts[idx + 2] if idx + 2 < len(parts) else ""
+            return player_id, nickname
+    return None
+
+
+class PlayerIndex:
+    """本地选手索引，支持前缀、三元组模糊和去重音匹配
+
+    索引由插件见过的所有选手构建（TOP选手、战队阵容、比赛数据、搜索结果），
+    并持久化到JSON文件，重启后无需重新构建。
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path
+        self._players = {}                 # id -> 选手信息
+        self._keys = []                    # 有序的 (折叠后的名字, id) 列表，用于前缀查找
+        self._grams = defaultdict(set)     # 三元组 -> {(折叠后的名字, id)}
+        self._dirty = False
+
+    def __len__(self):
+        return len(self._players)
+
+    def __contains__(self, player_id):
+        return player_id in self._players
+
+    @property
+    def dirty(self) -> bool:
+        return self._dirty
+
+    def get(self, player_id):
+        return self._players.get(player_id)
+
+    def _index_key(self, key: str, player_id: int):
+        entry = (key, player_id)
+        pos = bisect.bisect_left(self._keys, entry)
+        if pos < len(self._keys) and self._keys[pos] == entry:
+            return
+        self._keys.insert(pos, entry)
+        for gram in trigrams(key):
+            self._grams[gram].add(entry)
+
+    def _unindex_key(self, key: str, player_id: int):
+        entry = (key, player_id)
+        pos = bisect.bisect_left(self._keys, entry)
+        if pos < len(self._keys) and self._keys[pos] == entry:
+            del self._keys[pos]
+        for gram in trigrams(key):
+            bucket = self._grams.get(gram)
+            if bucket:
+                bucket.discard(entry)
+                if not bucket:
+                    del self._grams[gram]
+
+    @staticmethod
+    def _keys_of(player: dict):
+        keys = {fold_text(player.get("nickname", ""))}
+        if player.get("name"):
+            keys.add(fold_text(player["name"]))
+        keys.discard("")
+        return keys
+
+    def add(self, player_id, nickname: str, country: str = None, name: str = None) -> bool:
+        """添加或更新一名选手，返回索引是否发生变化"""
+        try:
+            player_id = int(player_id)
+        except (TypeError, ValueError):
+            return False
+        if not nickname:
+            return False
+
+        old = self._players.get(player_id)
+        new = dict(old) if old else {"id": player_id}
+        new["nickname"] = nickname
+        # 已知的国籍/姓名不会被空值覆盖
+        if country and country != "Unknown":
+            new["country"] = country
+        if name:
+            new["name"] = name
+        if old == new:
+            return False
+
+        if old:
+            for key in self._keys_of(old):
+                self._unindex_key(key, player_id)
+        self._players[player_id] = new
+        for key in self._keys_of(new):
+            self._index_key(key, player_id)
+        self._dirty = True
+        return True
+
+    def add_many(self, players) -> int:
+        """批量添加选手信息（字典或 PlayerRecord），返回发生变化的数量"""
+        changed = 0
+        for player in players:
+            if isinstance(player, dict):
+                fields = (player.get("id"), player.get("nickname"), player.get("country"), player.get("name"))
+            else:
+                fields = (player.id, player.nickname, player.country, player.name)
+            if self.add(*fields):
+                changed += 1
+        return changed
+
+    def _prefix_ids(self, folded: str):
+        pos = bisect.bisect_left(self._keys, (folded, -1))
+        while pos < len(self._keys) and self._keys[pos][0].startswith(folded):
+            yield self._keys[pos]
+            pos += 1
+
+    def search(self, query: str, limit: int = 5, fuzzy: bool = True) -> list:
+        """按 精确 > 前缀 > 模糊 的顺序返回匹配的选手，fuzzy 为 False 时只返回精确和前缀匹配"""
+        folded = fold_text(query)
+        if not folded:
+            return []
+
+        # 分数越小越靠前: (匹配层级, 附加排序值)
+        scores = {}
+
+        def offer(player_id, score):
+            if player_id not in scores or score < scores[player_id]:
+                scores[player_id] = score
+
+        for key, player_id in self._prefix_ids(folded):
+            if key == folded:
+                offer(player_id, (0, 0.0))
+            else:
+                offer(player_id, (1, len(key) - len(folded)))
+
+        query_grams = trigrams(folded) if fuzzy else ()
+        overlap = defaultdict(int)
+        for gram in query_grams:
+            for entry in self._grams.get(gram, ()):
+                overlap[entry] += 1
+        for (key, player_id), shared in overlap.items():
+            # 带填充的名字共有 len(key) + 1 个三元组
+            similarity = shared / (len(query_grams) + len(key) + 1 - shared)
+            if similarity >= FUZZY_THRESHOLD:
+                offer(player_id, (2, -similarity))
+
+        ranked = sorted(scores.items(), key=lambda item: (item[1], self._players[item[0]]["nickname"].lower()))
+        return [self.to_result(player_id) for player_id, _ in ranked[:limit]]
+
+    def to_result(self, player_id: int) -> PlayerRecord:
+        """转换为与 search_players 相同类型的结果"""
+        player = self._players[player_id]
+        return PlayerRecord(player_id, player["nickname"], player.get("name", ""), player.get("country", "Unknown"))
+
+    def load(self) -> int:
+        """从文件加载索引"""
+        if not self.path or not os.path.exists(self.path):
+            return 0
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception as e:
+            logger.error("读取选手索引失败: %s", e)
+            return 0
+        for player in data:
+            self.add(player.get("id"), player.get("nickname"),
+                     player.get("country"), player.get("name"))
+        self._dirty = False
+        return len(self._players)
+
+    def save(self):
+        """将索引写入文件（仅在有变化时）"""
+        if not self.path or not self._dirty:
+            return
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(list(self._players.values()), f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+        except Exception as e:
+            logger.error("保存选手索引失败: %s", e)
@@ -0,0 +1,75 @@
+"""从 /proc 读取进程内存
+
+只在 Linux 上可用，其他平台上所有函数返回 None 或空结果，调用方据此跳过内存检查。
+"""
+import os
+
+
+def process_rss(pid="self"):
+    """进程常驻内存（字节），读取失败返回 None"""
+    try:
+        with open(f"/proc/{pid}/status", "r", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def _parent_pids() -> dict:
+    """pid -> 父进程 pid"""
+    parents = {}
+    try:
+        entries = os.listdir("/proc")
+    except OSError:
+        return parents
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", "r", encoding="ascii", errors="replace") as f:
+                # 第二列是括号包起来的进程名，可能含空格，从最后一个括号之后开始解析
+                fields = f.read().rpartition(")")[2].split()
+            parents[int(entry)] = int(fields[1])
+        except (OSError, ValueError, IndexError):
+            continue
+    return parents
+
+
+def _cmdline(pid: int) -> str:
+    try:
+        with open(f"/proc/{pid}/cmdline", "rb") as f:
+            return f.read().replace(b"\0", b" ").decode("utf-8", "replace")
+    except OSError:
+        return ""
+
+
+def descendants(pid: int = None) -> list:
+    """pid（默认当前进程）的所有子孙进程"""
+    root = os.getpid() if pid is None else pid
+    children = {}
+    for child, parent in _parent_pids().items():
+        children.setdefault(parent, []).append(child)
+    found = []
+    stack = list(children.get(root, ()))
+    while stack:
+        child = stack.pop()
+        found.append(child)
+        stack.extend(children.get(child, ()))
+    return found
+
+
+def tree_rss(marker: str, pid: int = None):
+    """当前进程下命令行包含 marker 的子孙进程的常驻内存总和（字节）
+
+    用来统计 playwright 驱动和它启动的 Chromium（浏览器、渲染、GPU 等进程），
+    进程间共享的内存会被重复计算，只适合作为回收阈值参考。没有 /proc 时返回 None。
+    """
+    if not os.path.isdir("/proc"):
+        return None
+    total = 0
+    for child in descendants(pid):
+        if marker in _cmdline(child):
+            total += process_rss(child) or 0
+    return total
@@ -0,0 +1,142 @@
+"""按需剖析单个指令
+
+管理员用 /hltv_profile <指令> [次数] 开启后，该指令接下来的 N 次执行在 cProfile 下运行：
+每次结束后把 pstats 文件写入 profiles/ 目录（可用 snakeviz、gprof2dot 等生成火焰图），
+并把自身耗时最高的函数发给开启剖析的管理员。未开启时 timed_command 只多一次字典查找。
+"""
+import os
+import time
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+_PLUGIN_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def frame_label(filename: str, line: int, func: str) -> str:
+    """插件内的函数显示相对路径和行号，其他模块只显示文件名，内置函数只显示名称"""
+    if filename == "~":
+        return func
+    if filename.startswith(_PLUGIN_DIR):
+        filename = os.path.relpath(filename, _PLUGIN_DIR)
+    else:
+        filename = os.path.basename(filename)
+    return f"{filename}:{line} {func}"
+
+
+class CommandProfiler:
+    """指令名 -> 剩余剖析次数，同一时间只剖析一次调用（cProfile 不能嵌套开启）"""
+
+    def __init__(self, directory: str, report=None, top: int = 12, keep: int = 50):
+        self.directory = directory
+        self.report = report     # async (会话列表, 文本)，用于把结果发给管理员
+        self.top = top
+        self.keep = keep
+        self.armed = {}          # 指令名 -> [剩余次数, 管理员会话]
+        self._active = None
+        self._report_tasks = set()
+
+    def arm(self, name: str, count: int, session):
+        self.armed[name] = [count, session]
+
+    def disarm(self, name: str = None) -> list:
+        """关闭某个指令（默认全部）的剖析，返回被关闭的指令名"""
+        if name is None:
+            names = list(self.armed)
+            self.armed.clear()
+            return names
+        return [name] if self.armed.pop(name, None) else []
+
+    def _take(self, name: str):
+        """领取一次剖析名额，返回管理员会话；已有调用在剖析时不领取，这次调用正常执行"""
+        if self._active is not None:
+            return None
+        ticket = self.armed.get(name)
+        if not ticket:
+            return None
+        ticket[0] -= 1
+        if ticket[0] <= 0:
+            del self.armed[name]
+        return ticket[1]
+
+    async def profile(self, name: str, handler):
+        """在 cProfile 下执行指令处理器（异步生成器），产出的回复原样转发
+
+        剖析覆盖从开始到最后一条回复的整段时间，期间事件循环上同时运行的其他任务也会被统计；
+        回复交给框架发送的那段时间不计入。
+        """
+        session = self._take(name)
+        if session is None:
+            async for result in handler:
+                yield result
+            return
+
+        import cProfile
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError as e:
+            # 已有其他 profiler（调试器、覆盖率工具等）在运行
+            logger.warning("无法开启指令 %s 的剖析: %s", name, e)
+            async for result in handler:
+                yield result
+            return
+
+        self._active = name
+        started = time.perf_counter()
+        try:
+            async for result in handler:
+                profile.disable()
+                yield result
+                profile.enable()
+        finally:
+            profile.disable()
+            self._active = None
+            try:
+                self._send(session, self._dump(name, profile, time.perf_counter() - started))
+            except Exception as e:
+                logger.error("保存指令 %s 的剖析结果失败: %s", name, e)
+
+    def _dump(self, name: str, profile, elapsed: float) -> str:
+        import pstats
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"{name}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.pstats")
+        profile.dump_stats(path)
+        self._prune()
+
+        stats = pstats.Stats(profile)
+        rows = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)[:self.top]
+        text = f"🔬 指令 {name} 剖析结果\n" + "═" * 30 + "\n"
+        text += f"⏱️ 总耗时 {elapsed:.2f}秒，剖析期间 {stats.total_tt:.2f}秒，{stats.total_calls} 次调用\n"
+        text += "自身耗时最高的函数 (自身 / 累计 秒 × 调用次数):\n"
+        for (filename, line, func), (_, calls, own, cumulative, _) in rows:
+            text += f"• {frame_label(filename, line, func)}  {own:.3f} / {cumulative:.3f} ×{calls}\n"
+        text += f"\n💾 {path}"
+        return text
+
+    def _prune(self):
+        """只保留最新的 keep 个剖析文件"""
+        files = sorted(
+            (os.path.join(self.directory, name) for name in os.listdir(self.directory) if name.endswith(".pstats")),
+            key=os.path.getmtime,
+        )
+        for path in files[:-self.keep]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def recent_files(self, limit: int = 5) -> list:
+        if not os.path.isdir(self.directory):
+            return []
+        files = [name for name in os.listdir(self.directory) if name.endswith(".pstats")]
+        return sorted(files, key=lambda name: os.path.getmtime(os.path.join(self.directory, name)))[-limit:][::-1]
+
+    def _send(self, session, text: str):
+        logger.info("指令剖析完成:\n%s", text)
+        if self.report is None or session is None:
+            return
+        task = asyncio.get_running_loop().create_task(self.report([session], text))
+        self._report_tasks.add(task)
+        task.add_done_callback(self._report_tasks.discard)
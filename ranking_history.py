@@ -0,0 +1,240 @@
+"""世界排名历史
+
+每周的排名以紧凑的快照保存到本地（排名、战队ID、积分、阵容），
+并为每支战队维护按周对齐的排名/积分数组。新快照写入时一次性算好所有战队的名次变化、
+积分变化和连续升降周数，/排名变化 只是读取算好的结果，不需要抓取历史排名页面。
+"""
+import os
+import re
+import json
+import logging
+from array import array
+from datetime import datetime, timedelta, timezone
+
+from .records import intern_text, parse_int
+from .player_index import parse_player_href
+
+logger = logging.getLogger(__name__)
+
+_MONTHS = {name: idx for idx, name in enumerate(
+    ["january", "february", "march", "april", "may", "june", "july",
+     "august", "september", "october", "november", "december"], 1)}
+_HEADER_DATE = re.compile(r"([A-Za-z]+)\s+(\d{1,2})(?:st|nd|rd|th)?,?\s+(\d{4})")
+
+
+class RankingEntry:
+    """某一周排名中的一支战队，lineup 为 ((选手ID, 昵称), ...)"""
+
+    __slots__ = ("rank", "team_id", "name", "points", "lineup")
+
+    def __init__(self, rank: int, team_id, name: str, points: int, lineup=()):
+        self.rank = rank
+        self.team_id = team_id
+        self.name = intern_text(name)
+        self.points = points
+        self.lineup = tuple((player_id, intern_text(nickname)) for player_id, nickname in lineup)
+
+    @property
+    def key(self):
+        """历史中识别战队用的键：优先战队ID，没有时用战队名"""
+        return self.team_id if self.team_id is not None else self.name.lower()
+
+    def to_row(self):
+        return [self.rank, self.team_id, self.name, self.points, [list(player) for player in self.lineup]]
+
+    @classmethod
+    def from_row(cls, row):
+        return cls(row[0], row[1], row[2], row[3], (tuple(player) for player in row[4]))
+
+
+class Movement:
+    """最新一周中一支战队相对上一周的变化
+
+    rank_delta 为正表示名次上升；上周未上榜时为 None。
+    streak 为连续同方向（上升/下降/持平）的周数，direction 为 1 / -1 / 0。
+    """
+
+    __slots__ = ("entry", "rank_delta", "points_delta", "streak", "direction")
+
+    def __init__(self, entry: RankingEntry, rank_delta, points_delta, streak: int, direction: int):
+        self.entry = entry
+        self.rank_delta = rank_delta
+        self.points_delta = points_delta
+        self.streak = streak
+        self.direction = direction
+
+
+def ranking_week(page, now: datetime = None) -> str:
+    """排名所属的日期（YYYY-MM-DD）：优先读取页面标题中的日期，否则取本周一"""
+    for header in page.find_all("div", {"class": "regional-ranking-header"}) or page.find_all("h1"):
+        found = _HEADER_DATE.search(header.text)
+        if found and found.group(1).lower() in _MONTHS:
+            month = _MONTHS[found.group(1).lower()]
+            return f"{int(found.group(3)):04d}-{month:02d}-{int(found.group(2)):02d}"
+    now = now or datetime.now(timezone.utc)
+    return (now - timedelta(days=now.weekday())).strftime("%Y-%m-%d")
+
+
+def parse_ranking(page):
+    """解析 /ranking/teams/ 页面中的全部战队，找不到排名区域时返回 None"""
+    ranking = page.find("div", {"class": "ranking"})
+    if not ranking:
+        return None
+    entries = []
+    for team in ranking.find_all("div", {"class": "ranked-team standard-box"}):
+        try:
+            name_element = team.find('div', {"class": "ranking-header"}).select('.name')
+            rank_element = team.select('.position')
+            points_element = team.find('span', {'class': 'points'})
+            if not name_element or not rank_element or not points_element:
+                continue
+            team_link = team.find('a', href=re.compile(r"/team/\d+/"))
+            found_id = re.search(r"/team/(\d+)/", team_link['href']) if team_link else None
+            lineup = []
+            for player in team.find_all("td", {"class": "player-holder"}):
+                player_img = player.find('img', {'class': 'playerPicture'})
+                if not player_img or not player_img.get('title'):
+                    continue
+                player_link = player.find('a', href=True)
+                parsed = parse_player_href(player_link['href']) if player_link else None
+                lineup.append((parsed[0] if parsed else None, player_img['title']))
+            entries.append(RankingEntry(
+                parse_int(rank_element[0].text, 0),
+                int(found_id.group(1)) if found_id else None,
+                name_element[0].text.strip(),
+                parse_int(points_element.text, 0),
+                lineup,
+            ))
+        except Exception as e:
+            logger.debug("解析排名条目失败: %s", e)
+    return entries
+
+
+class RankingHistory:
+    """按周保存的排名快照，最多保留 max_weeks 周"""
+
+    def __init__(self, path: str = None, max_weeks: int = 104):
+        self.path = path
+        self.max_weeks = max_weeks
+        self.weeks = []          # 按日期排序的 YYYY-MM-DD
+        self.snapshots = []      # 与 weeks 对齐，每周一个 RankingEntry 元组
+        self.ranks = {}          # 战队键 -> array('H')，与 weeks 对齐，0 表示未上榜
+        self.points = {}         # 战队键 -> array('I')
+        self.movements = ()      # 最新一周所有战队的 Movement，按名次排序
+
+    def __len__(self):
+        return len(self.weeks)
+
+    @property
+    def latest(self):
+        return self.weeks[-1] if self.weeks else None
+
+    def record(self, week: str, entries) -> bool:
+        """写入一周的排名（同一周再次写入时覆盖），返回数据是否有变化"""
+        snapshot = tuple(sorted(entries, key=lambda entry: entry.rank))
+        if not snapshot:
+            return False
+        rows = [entry.to_row() for entry in snapshot]
+        if week in self.weeks:
+            index = self.weeks.index(week)
+            if [entry.to_row() for entry in self.snapshots[index]] == rows:
+                return False
+            self.snapshots[index] = snapshot
+        else:
+            self.weeks.append(week)
+            self.snapshots.append(snapshot)
+            order = sorted(range(len(self.weeks)), key=self.weeks.__getitem__)
+            self.weeks = [self.weeks[idx] for idx in order][-self.max_weeks:]
+            self.snapshots = [self.snapshots[idx] for idx in order][-self.max_weeks:]
+        self._rebuild()
+        return True
+
+    def _rebuild(self):
+        """重建按周对齐的排名/积分数组，并算好最新一周的变化"""
+        count = len(self.weeks)
+        ranks, points = {}, {}
+        for week_index, snapshot in enumerate(self.snapshots):
+            for entry in snapshot:
+                if entry.key not in ranks:
+                    ranks[entry.key] = array('H', bytes(2 * count))
+                    points[entry.key] = array('I', bytes(4 * count))
+                ranks[entry.key][week_index] = min(entry.rank, 0xFFFF)
+                points[entry.key][week_index] = max(entry.points, 0)
+        self.ranks, self.points = ranks, points
+
+        movements = []
+        for entry in (self.snapshots[-1] if self.snapshots else ()):
+            team_ranks = ranks[entry.key]
+            team_points = points[entry.key]
+            previous = team_ranks[-2] if count > 1 else 0
+            rank_delta = previous - entry.rank if previous else None
+            points_delta = entry.points - team_points[-2] if previous else None
+            streak, direction = self._streak(team_ranks)
+            movements.append(Movement(entry, rank_delta, points_delta, streak, direction))
+        self.movements = tuple(movements)
+
+    @staticmethod
+    def _streak(team_ranks):
+        """从最新一周往前数，名次连续朝同一方向变化（或持平）的周数"""
+        direction = None
+        streak = 0
+        for idx in range(len(team_ranks) - 1, 0, -1):
+            current, previous = team_ranks[idx], team_ranks[idx - 1]
+            if not current or not previous:
+                break
+            step = (previous > current) - (previous < current)
+            if direction is None:
+                direction = step
+            elif step != direction:
+                break
+            streak += 1
+        return streak, direction or 0
+
+    def find(self, name: str):
+        """按战队名查找最新一周中的战队，完全匹配优先，其次唯一的包含匹配"""
+        key = name.strip().lower()
+        entries = self.snapshots[-1] if self.snapshots else ()
+        for entry in entries:
+            if entry.name.lower() == key:
+                return entry
+        candidates = [entry for entry in entries if key and key in entry.name.lower()]
+        return candidates[0] if len(candidates) == 1 else None
+
+    def team_history(self, team_key, limit: int = 8):
+        """一支战队最近 limit 周的 (日期, 名次, 积分)，名次为 0 表示未上榜"""
+        team_ranks = self.ranks.get(team_key)
+        if team_ranks is None:
+            return []
+        team_points = self.points[team_key]
+        start = max(0, len(self.weeks) - limit)
+        return list(zip(self.weeks[start:], team_ranks[start:], team_points[start:]))
+
+    def load(self) -> int:
+        if not self.path or not os.path.exists(self.path):
+            return 0
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            weeks = data.get("weeks", [])[-self.max_weeks:]
+            self.weeks = [week["date"] for week in weeks]
+            self.snapshots = [tuple(RankingEntry.from_row(row) for row in week["teams"]) for week in weeks]
+        except Exception as e:
+            logger.error("读取排名历史失败: %s", e)
+            self.weeks, self.snapshots = [], []
+        self._rebuild()
+        return len(self.weeks)
+
+    def save(self):
+        if not self.path:
+            return
+        data = {"weeks": [
+            {"date": week, "teams": [entry.to_row() for entry in snapshot]}
+            for week, snapshot in zip(self.weeks, self.snapshots)
+        ]}
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.error("保存排名历史失败: %s", e)
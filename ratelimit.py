@@ -0,0 +1,105 @@
+import time
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 不同页面的权重，越重的页面（搜索、完整比赛页）消耗越多令牌
+DEFAULT_WEIGHTS = {
+    "search": 2.0,
+    "match": 1.5,
+    "player": 1.5,
+    "team": 1.5,
+    "teams": 2.0,
+}
+
+
+class RateLimiter:
+    """出站 HLTV 请求的令牌桶限流器
+
+    - 所有请求排队（FIFO）依次取令牌，突发请求会被均匀地间隔开而不是直接失败；
+    - 收到 429/403 时降低速率并进入指数退避，之后随着成功请求逐步恢复。
+    """
+
+    def __init__(self, rate: float = 0.5, burst: float = 3, weights: dict = None,
+                 base_backoff: float = 5.0, max_backoff: float = 300.0):
+        self.rate = max(0.01, float(rate))
+        self.burst = max(1.0, float(burst))
+        self.weights = dict(DEFAULT_WEIGHTS)
+        self.weights.update(weights or {})
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+        self._factor = 1.0          # 自适应速率系数，受限时下降
+        self._strikes = 0           # 连续受限次数
+        self._backoff_until = 0.0
+        self.waiting = 0
+        self.throttled = 0
+
+    @property
+    def effective_rate(self) -> float:
+        return self.rate * self._factor
+
+    def _refill(self, now: float):
+        elapsed = now - self._updated
+        self._updated = now
+        self._tokens = min(self.burst, self._tokens + elapsed * self.effective_rate)
+
+    async def acquire(self, kind: str = "other", timeout: float = None) -> float:
+        """等待直到可以发出一个 kind 类型的请求，返回等待的秒数
+
+        timeout 秒内拿不到令牌时抛出 asyncio.TimeoutError；已知要等到 timeout 之后（退避中、
+        令牌补充不及）时立即放弃，不会先睡到超时。
+        """
+        if timeout is None:
+            return await self._acquire(kind, None)
+        if timeout <= 0:
+            raise asyncio.TimeoutError()
+        return await asyncio.wait_for(self._acquire(kind, time.monotonic() + timeout), timeout)
+
+    async def _acquire(self, kind: str, give_up_at) -> float:
+        weight = min(self.burst, self.weights.get(kind, 1.0))
+        started = time.monotonic()
+        self.waiting += 1
+        try:
+            # asyncio.Lock 按到达顺序唤醒，保证排队公平
+            async with self._lock:
+                while True:
+                    now = time.monotonic()
+                    if now < self._backoff_until:
+                        wake_at = self._backoff_until
+                    else:
+                        self._refill(now)
+                        if self._tokens >= weight:
+                            self._tokens -= weight
+                            break
+                        wake_at = now + (weight - self._tokens) / self.effective_rate
+                    if give_up_at is not None and wake_at > give_up_at:
+                        raise asyncio.TimeoutError()
+                    await asyncio.sleep(wake_at - now)
+        finally:
+            self.waiting -= 1
+        return time.monotonic() - started
+
+    def report(self, status, retry_after=None):
+        """反馈响应状态，用于自适应退避"""
+        if status in (403, 429):
+            self.throttled += 1
+            self._strikes += 1
+            self._factor = max(0.125, self._factor / 2)
+            delay = min(self.max_backoff, self.base_backoff * (2 ** (self._strikes - 1)))
+            try:
+                if retry_after is not None:
+                    delay = min(self.max_backoff, max(delay, float(retry_after)))
+            except (TypeError, ValueError):
+                pass
+            self._backoff_until = max(self._backoff_until, time.monotonic() + delay)
+            self._tokens = 0.0
+            logger.warning("HLTV返回 %s，限流退避 %.1f 秒，当前速率 %.2f 请求/秒", status, delay, self.effective_rate)
+        elif isinstance(status, int) and status < 400:
+            self._strikes = 0
+            if self._factor < 1.0:
+                self._factor = min(1.0, self._factor * 1.25)
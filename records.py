@@ -0,0 +1,149 @@
+"""紧凑的数据记录类型
+
+战队列表、选手和比赛数据的条目数量可能很大（上万支战队、十万级选手-比赛行），
+这里使用 __slots__ 类代替字典：没有每个对象的 __dict__，数值字段在抓取时就解析好，
+重复出现的战队名、国籍、选手昵称等字符串通过 sys.intern 共享同一个对象。
+"""
+import re
+import sys
+
+_NUMBER = re.compile(r"[-+]?\d+(?:\.\d+)?")
+
+
+def intern_text(text) -> str:
+    return sys.intern(text.strip()) if text else ""
+
+
+def parse_int(text, default=None):
+    """'23' -> 23，'N/A'、'-' 等无法解析的值返回 default"""
+    found = _NUMBER.search(text or "")
+    return int(float(found.group())) if found else default
+
+
+def parse_float(text, default=None):
+    """'1.15' -> 1.15，'75.0%' -> 75.0"""
+    found = _NUMBER.search(text or "")
+    return float(found.group()) if found else default
+
+
+def format_number(value, spec: str = "", suffix: str = "") -> str:
+    return "N/A" if value is None else f"{value:{spec}}{suffix}"
+
+
+class TeamRecord:
+    """战队列表中的一支战队，url 由 ID 和 slug 拼出，不单独保存"""
+
+    __slots__ = ("id", "name", "slug")
+
+    def __init__(self, team_id: int, name: str, slug: str = ""):
+        self.id = int(team_id)
+        self.name = intern_text(name)
+        self.slug = slug
+
+    @classmethod
+    def from_href(cls, href: str, name: str):
+        """从 /stats/teams/<id>/<slug> 链接创建"""
+        parts = [part for part in href.split("?")[0].split("/") if part]
+        return cls(int(parts[-2]), name, parts[-1])
+
+    @property
+    def url(self) -> str:
+        return f"/stats/teams/{self.id}/{self.slug}" if self.slug else ""
+
+    def __repr__(self):
+        return f"TeamRecord({self.id}, {self.name!r})"
+
+
+class PlayerRecord:
+    """选手条目（TOP选手、搜索结果），rating 和 maps_played 在解析时转为数值"""
+
+    __slots__ = ("id", "nickname", "name", "country", "rating", "maps_played")
+
+    def __init__(self, player_id: int, nickname: str, name: str = "", country: str = "Unknown",
+                 rating: float = None, maps_played: int = None):
+        self.id = int(player_id)
+        self.nickname = intern_text(nickname)
+        self.name = name or ""
+        self.country = intern_text(country) or "Unknown"
+        self.rating = rating
+        self.maps_played = maps_played
+
+    def __repr__(self):
+        return f"PlayerRecord({self.id}, {self.nickname!r})"
+
+
+class PlayerMatchStats:
+    """一名选手在一场比赛中的数据（比赛页面统计表中的一行）"""
+
+    __slots__ = ("player_id", "name", "kills", "deaths", "adr", "kast", "rating")
+
+    def __init__(self, player_id, name: str, kills: int = None, deaths: int = None,
+                 adr: float = None, kast: float = None, rating: float = None):
+        self.player_id = player_id
+        self.name = intern_text(name)
+        self.kills = kills
+        self.deaths = deaths
+        self.adr = adr
+        self.kast = kast
+        self.rating = rating
+
+    @classmethod
+    def from_cells(cls, player_id, cells):
+        """从统计表一行的文本列 (选手, 击杀, 死亡, ADR, KAST, Rating) 解析"""
+        texts = [cell.strip() for cell in cells]
+        return cls(
+            player_id,
+            texts[0],
+            parse_int(texts[1]),
+            parse_int(texts[2]),
+            parse_float(texts[3]),
+            parse_float(texts[4]),
+            parse_float(texts[5]),
+        )
+
+    def __repr__(self):
+        return f"PlayerMatchStats({self.name!r}, {self.kills}-{self.deaths}, {self.rating})"
+
+
+class MatchResult:
+    """结果页中的一场已结束比赛，比分保留页面原文，timestamp 为 UTC 秒级时间戳（未知时为 None）"""
+
+    __slots__ = ("match_id", "team1", "team2", "score1", "score2", "event", "url", "timestamp")
+
+    def __init__(self, match_id: int, team1: str, team2: str, score1: str, score2: str,
+                 event: str = "", url: str = "", timestamp: int = None):
+        self.match_id = match_id
+        self.team1 = intern_text(team1)
+        self.team2 = intern_text(team2)
+        self.score1 = score1
+        self.score2 = score2
+        self.event = intern_text(event)
+        self.url = url
+        self.timestamp = timestamp
+
+    def __repr__(self):
+        return f"MatchResult({self.match_id}, {self.team1!r} {self.score1}-{self.score2} {self.team2!r})"
+
+
+class MatchStats:
+    """一场比赛的统计数据，players1/players2 为 PlayerMatchStats 元组
+
+    scores 为页面上的总比分 (队伍1, 队伍2)，timestamp 为开赛时间（UTC 秒），读不到时均为 None。
+    """
+
+    __slots__ = ("team1", "team2", "players1", "players2", "maps", "event", "status", "scores", "timestamp")
+
+    def __init__(self, team1: str = "", team2: str = "", players1=(), players2=(),
+                 maps=(), event: str = "", status: str = None, scores=None, timestamp: int = None):
+        self.team1 = intern_text(team1)
+        self.team2 = intern_text(team2)
+        self.players1 = tuple(players1)
+        self.players2 = tuple(players2)
+        self.maps = tuple(intern_text(name) for name in maps)
+        self.event = intern_text(event)
+        self.status = status
+        self.scores = scores
+        self.timestamp = timestamp
+
+    def lineups(self):
+        return ((self.team1, self.players1), (self.team2, self.players2))
@@ -0,0 +1,243 @@
+import time
+import random
+import asyncio
+import logging
+
+from .metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+
+class FetchError(Exception):
+    """页面请求失败（非2xx响应）"""
+
+    def __init__(self, status, url: str = ""):
+        super().__init__(f"页面加载失败：状态码 {status} {url}".strip())
+        self.status = status
+        self.url = url
+
+
+class CircuitOpenError(Exception):
+    """熔断器处于打开状态，请求被直接拒绝"""
+
+    def __init__(self, name: str, retry_in: float):
+        super().__init__(f"{name} 熔断中，{retry_in:.0f} 秒后重试")
+        self.name = name
+        self.retry_in = retry_in
+
+
+class DeadlineExceeded(Exception):
+    """请求已超过总截止时间，不再发起新的步骤"""
+
+    def __init__(self, what: str = ""):
+        super().__init__(f"已超过请求截止时间 {what}".strip())
+
+
+class Deadline:
+    """一次请求的总截止时间，沿导航、等待元素和截图各步骤传递
+
+    每一步的超时都不会超过剩余时间，卡住的页面最多占用浏览器到截止时间为止。
+    """
+
+    __slots__ = ("expires_at",)
+
+    def __init__(self, seconds: float):
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def clamp_ms(self, timeout_ms: float, what: str = "") -> int:
+        """把单步超时(毫秒)限制在剩余时间内，已过期时抛出 DeadlineExceeded"""
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise DeadlineExceeded(what)
+        return max(1, int(min(timeout_ms, remaining * 1000)))
+
+
+class AdaptiveTimeouts:
+    """按页面类型根据最近的加载耗时计算超时
+
+    超时为最近 window 次成功加载耗时的 p99 × factor，限制在 [floor, ceiling] 秒之间；
+    样本不足 min_samples 时使用 ceiling。健康时页面几秒就能加载完，卡住的页面不必等满一分钟。
+    """
+
+    def __init__(self, factor: float = 3.0, floor: float = 5.0, ceiling: float = 60.0,
+                 min_samples: int = 20, window: int = 256):
+        self.factor = factor
+        self.floor = floor
+        self.ceiling = max(floor, ceiling)
+        self.min_samples = max(1, min_samples)
+        self.window = window
+        self._latencies = {}   # 页面类型 -> Histogram
+        self._cache = {}       # 页面类型 -> 计算好的超时(秒)
+
+    def observe(self, kind: str, seconds: float):
+        histogram = self._latencies.get(kind)
+        if histogram is None:
+            histogram = self._latencies[kind] = Histogram(self.window)
+        histogram.observe(seconds)
+        self._cache.pop(kind, None)
+
+    def timeout(self, kind: str) -> float:
+        """页面类型 kind 当前的单步超时(秒)"""
+        cached = self._cache.get(kind)
+        if cached is not None:
+            return cached
+        histogram = self._latencies.get(kind)
+        if histogram is None or len(histogram.samples) < self.min_samples:
+            value = self.ceiling
+        else:
+            (p99,) = histogram.percentiles(0.99)
+            value = min(self.ceiling, max(self.floor, p99 * self.factor))
+        self._cache[kind] = value
+        return value
+
+    def timeout_ms(self, kind: str, deadline: Deadline = None, what: str = "") -> int:
+        """单步超时(毫秒)，传入 deadline 时不超过剩余时间"""
+        timeout_ms = self.timeout(kind) * 1000
+        return deadline.clamp_ms(timeout_ms, what) if deadline is not None else int(timeout_ms)
+
+    def snapshot(self) -> dict:
+        return {kind: self.timeout(kind) for kind in self._latencies}
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """4xx（除403/429外）是确定性错误，重试没有意义"""
+    if isinstance(exc, (CircuitOpenError, DeadlineExceeded)):
+        return False
+    if isinstance(exc, FetchError) and isinstance(exc.status, int):
+        return exc.status in (403, 429) or exc.status >= 500
+    return True
+
+
+class CircuitBreaker:
+    """熔断器：连续失败达到阈值后打开，冷却后进入半开状态放行探测请求"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, recovery_timeout: float = 60.0):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.recovery_timeout = recovery_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trips = 0
+        self._probing = False
+
+    def retry_in(self) -> float:
+        return max(0.0, self.opened_at + self.recovery_timeout - time.monotonic())
+
+    def is_open(self) -> bool:
+        """是否应当快速失败（不改变状态）"""
+        if self.state == self.OPEN:
+            return self.retry_in() > 0
+        return self.state == self.HALF_OPEN and self._probing
+
+    def allow(self) -> bool:
+        """请求是否可以放行；半开状态下同一时间只放行一个探测请求"""
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN:
+            if self.retry_in() > 0:
+                return False
+            self.state = self.HALF_OPEN
+            logger.info("熔断器 %s 进入半开状态，放行探测请求", self.name)
+        if self._probing:
+            return False
+        self._probing = True
+        return True
+
+    def release_probe(self):
+        """探测请求被取消时释放探测名额，不计成功或失败"""
+        self._probing = False
+
+    def record_success(self):
+        if self.state != self.CLOSED:
+            logger.info("熔断器 %s 探测成功，恢复正常", self.name)
+        self.state = self.CLOSED
+        self.failures = 0
+        self._probing = False
+
+    def record_failure(self):
+        self._probing = False
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.trips += 1
+                logger.warning("熔断器 %s 已打开，%.0f 秒内的请求将直接失败", self.name, self.recovery_timeout)
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+
+class BreakerRegistry:
+    """按页面类型分别维护熔断器"""
+
+    def __init__(self, failure_threshold: int = 5, recovery_timeout: float = 60.0):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.breakers = {}
+
+    def get(self, name: str) -> CircuitBreaker:
+        breaker = self.breakers.get(name)
+        if breaker is None:
+            breaker = self.breakers[name] = CircuitBreaker(name, self.failure_threshold, self.recovery_timeout)
+        return breaker
+
+    def states(self) -> dict:
+        return {name: breaker.state for name, breaker in self.breakers.items()}
+
+
+class RetryPolicy:
+    """统一的重试策略：指数退避 + 全抖动（full jitter）"""
+
+    def __init__(self, attempts: int = 3, base_delay: float = 1.0, max_delay: float = 10.0):
+        self.attempts = max(1, attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    async def run(self, func, breaker: CircuitBreaker = None, on_retry=None, deadline: Deadline = None):
+        """执行 func()，失败时按策略重试；熔断器打开时立即抛出 CircuitOpenError
+
+        传入 deadline 时，等待重试会超过截止时间就不再重试，直接抛出最后一次的错误。
+        """
+        for attempt in range(self.attempts):
+            if breaker is not None and not breaker.allow():
+                raise CircuitOpenError(breaker.name, breaker.retry_in())
+            try:
+                result = await func()
+            except (asyncio.CancelledError, DeadlineExceeded):
+                # 没有真正访问站点，不计成功或失败
+                if breaker is not None:
+                    breaker.release_probe()
+                raise
+            except Exception as e:
+                retryable = is_retryable(e)
+                if breaker is not None:
+                    # 确定性的4xx说明站点本身可用，不计入熔断
+                    if retryable:
+                        breaker.record_failure()
+                    else:
+                        breaker.record_success()
+                if attempt == self.attempts - 1 or not retryable:
+                    raise
+                delay = self.delay(attempt)
+                if deadline is not None and delay >= deadline.remaining():
+                    raise
+                if on_retry:
+                    on_retry(attempt + 1, e, delay)
+                await asyncio.sleep(delay)
+            else:
+                if breaker is not None:
+                    breaker.record_success()
+                return result
@@ -0,0 +1,123 @@
+import re
+import logging
+from bisect import bisect_left
+from datetime import datetime
+
+from .player_index import fold_text
+
+logger = logging.getLogger(__name__)
+
+
+class ScheduledMatch:
+    """一场未开始的比赛，timestamp 为 UTC 秒级时间戳"""
+
+    __slots__ = ("match_id", "timestamp", "team1", "team2", "event", "url")
+
+    def __init__(self, match_id, timestamp: int, team1: str, team2: str, event: str, url: str):
+        self.match_id = match_id
+        self.timestamp = timestamp
+        self.team1 = team1
+        self.team2 = team2
+        self.event = event
+        self.url = url
+
+    def opponent_of(self, team_key: str) -> str:
+        return self.team2 if fold_text(self.team1) == team_key else self.team1
+
+
+def _element_timestamp(match, day_headline, hltv_tz):
+    """优先读取页面中的 data-unix（毫秒），没有时按 HLTV 时区解析日期标题和时间文本"""
+    for element in (match, match.find("div", {"class": "matchTime"})):
+        if element is None:
+            continue
+        for attr in ("data-zonedgrouping-entry-unix", "data-unix"):
+            value = element.get(attr)
+            if value and value.isdigit():
+                return int(value) // 1000
+    time_element = match.find("div", {"class": "matchTime"})
+    found_time = re.search(r"(\d{1,2}):(\d{2})", time_element.text) if time_element else None
+    found_date = re.search(r"(\d{4})-(\d{2})-(\d{2})", day_headline or "")
+    if not found_time or not found_date:
+        return None
+    year, month, day = (int(part) for part in found_date.groups())
+    hour, minute = (int(part) for part in found_time.groups())
+    return int(datetime(year, month, day, hour, minute, tzinfo=hltv_tz).timestamp())
+
+
+def parse_schedule(page, hltv_tz) -> list:
+    """解析 /matches/ 页面中所有有开赛时间的比赛，待定(TBA)的比赛跳过"""
+    matches = []
+    for match_day in page.find_all("div", {"class": "upcomingMatchesSection"}):
+        headline = match_day.find("div", {"class": "matchDayHeadline"})
+        headline_text = headline.text if headline else ""
+        for match in match_day.find_all("div", {"class": "upcomingMatch"}):
+            try:
+                teams = match.find_all("div", {"class": "matchTeam"})
+                if len(teams) < 2:
+                    continue
+                timestamp = _element_timestamp(match, headline_text, hltv_tz)
+                if timestamp is None:
+                    continue
+                link = match.find("a", href=True)
+                href = link["href"] if link else ""
+                found_id = re.search(r"/matches/(\d+)", href)
+                event_element = match.find("div", {"class": "matchEvent"})
+                matches.append(ScheduledMatch(
+                    int(found_id.group(1)) if found_id else None,
+                    timestamp,
+                    teams[0].text.strip(),
+                    teams[1].text.strip(),
+                    event_element.text.strip() if event_element else "Unknown Event",
+                    href,
+                ))
+            except Exception as e:
+                logger.debug("解析赛程条目失败: %s", e)
+    return matches
+
+
+class ScheduleStore:
+    """按开赛时间排序的赛程，附带按战队的二级索引
+
+    所有查询都是对有序时间戳数组的二分查找，不再每次扫描整个页面。
+    """
+
+    def __init__(self):
+        self.source = None       # 建立索引时使用的比赛列表，未变化时不重建
+        self.matches = []        # 按 (时间戳, 比赛ID) 排序
+        self.timestamps = []
+        self.by_team = {}        # 折叠后的战队名 -> (时间戳列表, 比赛列表)，均按时间排序
+
+    def load(self, matches: list):
+        if matches is self.source:
+            return
+        self.source = matches
+        self.matches = sorted(matches, key=lambda m: (m.timestamp, m.match_id or 0))
+        self.timestamps = [m.timestamp for m in self.matches]
+        by_team = {}
+        for match in self.matches:
+            for name in (match.team1, match.team2):
+                times, items = by_team.setdefault(fold_text(name), ([], []))
+                times.append(match.timestamp)
+                items.append(match)
+        self.by_team = by_team
+
+    def between(self, start: float, end: float) -> list:
+        """开赛时间在 [start, end) 之间的比赛"""
+        return self.matches[bisect_left(self.timestamps, start):bisect_left(self.timestamps, end)]
+
+    def upcoming(self, now: float, limit: int = 10) -> list:
+        index = bisect_left(self.timestamps, now)
+        return self.matches[index:index + limit]
+
+    def resolve_team(self, name: str):
+        """把用户输入的战队名解析为索引中的键：完全匹配优先，其次唯一的包含匹配"""
+        key = fold_text(name)
+        if key in self.by_team:
+            return key
+        candidates = [team for team in self.by_team if key and key in team]
+        return candidates[0] if len(candidates) == 1 else None
+
+    def for_team(self, team_key: str, now: float, limit: int = 10) -> list:
+        times, items = self.by_team.get(team_key, ([], []))
+        index = bisect_left(times, now)
+        return items[index:index + limit]
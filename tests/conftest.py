@@ -0,0 +1,13 @@
+"""测试公用：把插件目录作为包导入（插件模块之间使用相对导入）"""
+import os
+import sys
+import importlib
+
+PLUGIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_plugin_module(name):
+    parent, package = os.path.split(PLUGIN_DIR)
+    if parent not in sys.path:
+        sys.path.insert(0, parent)
+    return importlib.import_module(f"{package}.{name}")
@@ -0,0 +1,124 @@
+"""本地比赛历史：去重更新、按时间淘汰、索引查询和补齐"""
+import asyncio
+
+from conftest import load_plugin_module
+
+match_history = load_plugin_module("match_history")
+MatchResult = load_plugin_module("records").MatchResult
+
+
+def result(match_id, team1="Vitality", team2="NAVI", score1="2", score2="0", timestamp=None, event=""):
+    return MatchResult(match_id, team1, team2, score1, score2, event, f"/matches/{match_id}/x", timestamp)
+
+
+def test_duplicate_is_ignored_and_update_fills_missing_fields():
+    history = match_history.MatchHistory()
+    assert history.add(result(1, event="Major"))
+    history.dirty = False
+    assert not history.add(result(1))
+    assert not history.dirty
+
+    assert history.add(result(1, timestamp=1000))
+    updated = history.matches[1]
+    assert updated.timestamp == 1000
+    assert updated.event == "Major"
+    assert len(history) == 1
+    assert history.recent("vitality") == [updated]
+    assert history.order == [(1000, 1)]
+
+    assert history.add(result(1, score1="2", score2="1"))
+    assert history.matches[1].timestamp == 1000
+    assert history.recent("navi") == [history.matches[1]]
+
+
+def test_evicts_oldest_when_full():
+    history = match_history.MatchHistory(max_matches=3)
+    for match_id, timestamp in ((1, 300), (2, 100), (3, 200)):
+        history.add(result(match_id, timestamp=timestamp))
+    assert history.add(result(4, timestamp=400))
+    assert set(history.matches) == {1, 3, 4}
+    assert [match.match_id for match in history.recent("vitality")] == [4, 1, 3]
+    assert history.order == [(200, 3), (300, 1), (400, 4)]
+
+
+def test_match_older_than_a_full_store_is_not_added():
+    history = match_history.MatchHistory(max_matches=2)
+    history.add(result(1, timestamp=100))
+    history.add(result(2, timestamp=200))
+    assert not history.add(result(3, timestamp=50))
+    assert set(history.matches) == {1, 2}
+
+
+def test_large_backfill_keeps_indexes_consistent():
+    history = match_history.MatchHistory(max_matches=500)
+    teams = ["A", "B", "C", "D"]
+    added = history.add_many(
+        result(match_id, teams[match_id % 4], teams[(match_id + 1) % 4], timestamp=10000 - match_id)
+        for match_id in range(2000)
+    )
+    assert added == 500
+    assert len(history) == len(history.order) == 500
+    assert min(history.matches) == 0 and max(history.matches) == 499
+    assert sum(len(items) for _, items in history.by_team.values()) == 1000
+    assert sum(len(items) for _, items in history.by_pair.values()) == 500
+
+
+def test_head_to_head_recent_and_since():
+    history = match_history.MatchHistory()
+    history.add(result(1, "Vitality", "NAVI", timestamp=100))
+    history.add(result(2, "NAVI", "Vitality", "2", "1", timestamp=200))
+    history.add(result(3, "Vitality", "FaZe", timestamp=300))
+    assert [m.match_id for m in history.head_to_head("navi", "vitality")] == [2, 1]
+    assert [m.match_id for m in history.recent("vitality", 2)] == [3, 2]
+    assert [m.match_id for m in history.since("vitality", 200)] == [2, 3]
+    assert match_history.outcome(history.matches[2], "vitality") == -1
+    assert match_history.outcome(history.matches[1], "vitality") == 1
+    assert history.resolve_team("Vita") == "vitality"
+    assert history.resolve_team("a") is None
+
+
+def test_save_and_load_round_trip(tmp_path):
+    path = str(tmp_path / "match_history.json")
+    history = match_history.MatchHistory(path)
+    history.add(result(1, timestamp=100, event="Major"))
+    history.add(result(2, "FaZe", "NAVI", timestamp=200))
+    history.save()
+    assert not history.dirty
+
+    loaded = match_history.MatchHistory(path)
+    assert loaded.load() == 2
+    assert not loaded.dirty
+    assert loaded.matches[1].event == "Major"
+    assert [m.match_id for m in loaded.recent("navi")] == [2, 1]
+
+
+def run_backfill(pages, history, page_count=10):
+    requested = []
+
+    async def fetch_results(index):
+        requested.append(index)
+        return pages.get(index)
+
+    total = asyncio.run(match_history.backfill_history(fetch_results, history.add_many, page_count))
+    return total, requested
+
+
+def test_backfill_stops_when_it_reaches_known_matches():
+    history = match_history.MatchHistory()
+    history.add(result(5, timestamp=500))
+    pages = {
+        1: [result(9, timestamp=900), result(8, timestamp=800)],
+        2: [result(6, timestamp=600), result(5, timestamp=500)],
+        3: [result(4, timestamp=400)],
+    }
+    total, requested = run_backfill(pages, history)
+    assert requested == [1, 2]
+    assert total == 3
+    assert set(history.matches) == {5, 6, 8, 9}
+
+
+def test_backfill_stops_on_failed_page_and_page_limit():
+    history = match_history.MatchHistory()
+    assert run_backfill({1: [result(1)]}, history) == (1, [1, 2])
+    pages = {index: [result(100 + index)] for index in range(1, 10)}
+    assert run_backfill(pages, match_history.MatchHistory(), page_count=3) == (3, [1, 2, 3])
@@ -0,0 +1,62 @@
+"""内容指纹和缓存未变化判断"""
+from conftest import load_plugin_module
+
+page_cache = load_plugin_module("page_cache")
+
+REGION = ('<div class="results">', '<div class="footer">')
+
+
+def page(rows, script="a"):
+    return (
+        f'<html><script>var t = "{script}";</script>'
+        f'<div class="ad">{script}</div>'
+        f'<div class="results">{rows}</div><div class="footer">{script}</div></html>'
+    )
+
+
+def test_fingerprint_ignores_content_outside_region():
+    first = page_cache.region_fingerprint(page("<tr>1</tr>", "a"), REGION)
+    assert page_cache.region_fingerprint(page("<tr>1</tr>", "b"), REGION) == first
+    assert page_cache.region_fingerprint(page("<tr>2</tr>", "a"), REGION) != first
+
+
+def test_fingerprint_without_markers_strips_scripts():
+    first = page_cache.region_fingerprint(page("<tr>1</tr>", "a"), ("<nope>", None))
+    assert page_cache.region_fingerprint("<html><script>x</script>body</html>") == \
+        page_cache.region_fingerprint("<html><script>y</script>body</html>")
+    assert first != page_cache.region_fingerprint(page("<tr>2</tr>", "a"), ("<nope>", None))
+
+
+def test_unknown_key_is_changed():
+    assert not page_cache.PageCache().is_unchanged("results", "abc")
+
+
+def test_same_fingerprint_is_unchanged_even_with_new_validators():
+    cache = page_cache.PageCache()
+    cache.store("results", "abc", {"etag": "v1"}, "value")
+    assert cache.is_unchanged("results", "abc", {"etag": "v2"})
+
+
+def test_static_validator_does_not_hide_changed_content():
+    cache = page_cache.PageCache()
+    headers = {"last-modified": "Mon, 01 Jan 2024 00:00:00 GMT", "etag": "static"}
+    cache.store("results", "abc", headers, "value")
+    assert not cache.is_unchanged("results", "def", headers)
+    assert cache.stats["stale_validators"] == 1
+
+
+def test_touch_keeps_value_and_refreshes_timestamp():
+    cache = page_cache.PageCache()
+    entry = cache.store("results", "abc", None, "value")
+    entry.fetched_at -= 100
+    assert cache.touch("results").value == "value"
+    assert entry.age() < 1
+    assert cache.stats == {"hits": 0, "stale_hits": 0, "unchanged": 1, "changed": 1, "stale_validators": 0}
+
+
+def test_stale_entry_reports_fetch_time_and_reason():
+    cache = page_cache.PageCache()
+    entry = cache.store("results", "abc", None, "value")
+    stale = entry.stale(page_cache.STALE_UNAVAILABLE)
+    assert stale.fetched_at == entry.fetched_at
+    assert stale.reason == page_cache.STALE_UNAVAILABLE
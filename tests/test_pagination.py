@@ -0,0 +1,49 @@
+"""分页游标和 "比赛 <ID>" 指令的匹配规则"""
+import re
+
+from conftest import load_plugin_module
+
+pagination = load_plugin_module("pagination")
+
+
+def test_cursor_pages_and_seek():
+    cursor = pagination.PageCursor("results", list(range(25)), 10)
+    assert cursor.pages == 3
+    assert cursor.current() == list(range(10))
+    assert cursor.seek(3)
+    assert cursor.current() == [20, 21, 22, 23, 24]
+    assert not cursor.seek(4)
+    assert not cursor.seek(0)
+    assert cursor.page == 3
+    assert pagination.PageCursor("results", [], 10).pages == 1
+
+
+def test_store_keeps_one_cursor_per_session_and_filters_kind():
+    store = pagination.CursorStore()
+    first = store.open("a", "results", [1], 10)
+    second = store.open("a", "matches", [2], 10)
+    assert store.get("a") is second and first is not second
+    assert store.get("a", "results") is None
+    assert store.get("b") is None
+
+
+def test_store_expires_idle_cursors_and_evicts_oldest():
+    store = pagination.CursorStore(ttl=60, max_sessions=2)
+    store.open("a", "results", [], 10)
+    store.open("b", "results", [], 10)
+    store.open("c", "results", [], 10)
+    assert store.get("a") is None
+    assert store.get("b") is not None
+
+    store.get("c").touched_at -= 61
+    assert store.get("c") is None
+
+
+def test_match_id_pattern_ignores_ordinary_chat():
+    pattern = re.compile(pagination.MATCH_ID_PATTERN)
+    assert pattern.match("比赛 2372001")
+    assert pattern.match("比赛2372001")
+    assert not pattern.match("比赛 2024")
+    assert not pattern.match("比赛 12345")
+    assert not pattern.match("比赛 2372001 好看")
+    assert not pattern.match("今天的比赛 2372001")
@@ -0,0 +1,81 @@
+"""本地选手索引：去重音、前缀和模糊匹配，以及只取精确/前缀命中的严格查找"""
+from conftest import load_plugin_module
+
+player_index = load_plugin_module("player_index")
+
+
+def make_index(path=None):
+    index = player_index.PlayerIndex(path)
+    index.add_many([
+        {"id": 7998, "nickname": "s1mple", "name": "Oleksandr Kostyliev", "country": "Ukraine"},
+        {"id": 11893, "nickname": "ZywOo", "name": "Mathieu Herbaut", "country": "France"},
+        {"id": 18987, "nickname": "b1t", "name": "Valerii Vakhovskyi"},
+        {"id": 20424, "nickname": "flameZ", "name": "Shahar Shushan"},
+        {"id": 9816, "nickname": "Šimon", "country": "Unknown"},
+    ])
+    return index
+
+
+def nicknames(results):
+    return [player.nickname for player in results]
+
+
+def test_fold_text_strips_accents_case_and_symbols():
+    assert player_index.fold_text("Šimon") == "simon"
+    assert player_index.fold_text("ZywOo!") == "zywoo"
+    assert player_index.fold_text("") == ""
+
+
+def test_parse_player_href():
+    assert player_index.parse_player_href("/player/7998/s1mple") == (7998, "s1mple")
+    assert player_index.parse_player_href("/stats/players/11893/zywoo?startDate=all") == (11893, "zywoo")
+    assert player_index.parse_player_href("/team/4608/natus-vincere") is None
+    assert player_index.parse_player_href("") is None
+
+
+def test_exact_before_prefix_and_accent_insensitive():
+    index = make_index()
+    index.add(1, "s1mpleton")
+    assert nicknames(index.search("S1MPLE")) == ["s1mple", "s1mpleton"]
+    assert nicknames(index.search("simon")) == ["Šimon"]
+    assert index.search("herbaut", fuzzy=False) == []
+    assert nicknames(index.search("mathieu")) == ["ZywOo"]
+
+
+def test_fuzzy_matches_only_when_allowed():
+    index = make_index()
+    assert nicknames(index.search("flamie")) == ["flameZ"]
+    assert index.search("flamie", fuzzy=False) == []
+    assert nicknames(index.search("flam", fuzzy=False)) == ["flameZ"]
+
+
+def test_update_reindexes_and_keeps_known_fields():
+    index = make_index()
+    assert not index.add(7998, "s1mple")
+    assert index.add(7998, "sasha", country="Unknown")
+    assert index.search("s1mple") == []
+    assert nicknames(index.search("sasha")) == ["sasha"]
+    assert index.get(7998)["country"] == "Ukraine"
+    assert index.get(7998)["name"] == "Oleksandr Kostyliev"
+
+
+def test_invalid_players_are_ignored():
+    index = player_index.PlayerIndex()
+    assert not index.add("abc", "nick")
+    assert not index.add(1, "")
+    assert len(index) == 0
+
+
+def test_save_and_load_round_trip(tmp_path):
+    path = str(tmp_path / "players.json")
+    index = make_index(path)
+    assert index.dirty
+    index.save()
+    assert not index.dirty
+
+    loaded = player_index.PlayerIndex(path)
+    assert loaded.load() == 5
+    assert not loaded.dirty
+    assert 11893 in loaded
+    result = loaded.search("zywoo")[0]
+    assert (result.id, result.name, result.country) == (11893, "Mathieu Herbaut", "France")
@@ -0,0 +1,99 @@
+"""世界排名历史：名次/积分变化、连续升降周数、保留周数和持久化"""
+import pytest
+
+from conftest import load_plugin_module
+
+ranking_history = load_plugin_module("ranking_history")
+RankingEntry = ranking_history.RankingEntry
+
+
+def week(*teams):
+    """teams 为按名次排列的 (战队ID, 名称, 积分)"""
+    return [RankingEntry(rank, team_id, name, points, [(7998, "s1mple")])
+            for rank, (team_id, name, points) in enumerate(teams, 1)]
+
+
+VITALITY, NAVI, SPIRIT = (9565, "Vitality"), (4608, "Natus Vincere"), (7020, "Team Spirit")
+
+
+def movements(history):
+    return {m.entry.name: (m.rank_delta, m.points_delta, m.streak, m.direction) for m in history.movements}
+
+
+def test_movements_against_previous_week():
+    history = ranking_history.RankingHistory()
+    assert history.record("2024-06-03", week((*VITALITY, 1000), (*NAVI, 900)))
+    assert movements(history)["Vitality"] == (None, None, 0, 0)
+
+    assert history.record("2024-06-10", week((*NAVI, 950), (*VITALITY, 940), (*SPIRIT, 800)))
+    assert movements(history) == {
+        "Natus Vincere": (1, 50, 1, 1),
+        "Vitality": (-1, -60, 1, -1),
+        "Team Spirit": (None, None, 0, 0),
+    }
+
+
+def test_streak_counts_consecutive_moves_in_one_direction():
+    history = ranking_history.RankingHistory()
+    history.record("2024-06-03", week(VITALITY + (1,), SPIRIT + (1,), NAVI + (1,)))
+    history.record("2024-06-10", week(SPIRIT + (1,), NAVI + (1,), VITALITY + (1,)))
+    history.record("2024-06-17", week(NAVI + (1,), SPIRIT + (1,), VITALITY + (1,)))
+    result = movements(history)
+    assert result["Natus Vincere"][2:] == (2, 1)
+    assert result["Team Spirit"][2:] == (1, -1)
+    assert result["Vitality"][2:] == (1, 0)
+
+    history.record("2024-06-24", week(NAVI + (1,), SPIRIT + (1,), VITALITY + (1,)))
+    result = movements(history)
+    assert result["Natus Vincere"][2:] == (1, 0)
+    assert result["Vitality"][2:] == (2, 0)
+
+
+def test_same_week_overwrites_and_identical_data_is_not_a_change():
+    history = ranking_history.RankingHistory()
+    assert history.record("2024-06-03", week((*VITALITY, 1000)))
+    assert not history.record("2024-06-03", week((*VITALITY, 1000)))
+    assert history.record("2024-06-03", week((*VITALITY, 1001)))
+    assert len(history) == 1
+    assert not history.record("2024-06-10", [])
+
+
+def test_weeks_are_sorted_and_trimmed():
+    history = ranking_history.RankingHistory(max_weeks=2)
+    history.record("2024-06-10", week((*VITALITY, 1000)))
+    history.record("2024-06-03", week((*VITALITY, 900)))
+    history.record("2024-06-17", week((*VITALITY, 1100)))
+    assert history.weeks == ["2024-06-10", "2024-06-17"]
+    assert history.latest == "2024-06-17"
+    assert history.team_history(9565) == [("2024-06-10", 1, 1000), ("2024-06-17", 1, 1100)]
+
+
+def test_find_and_team_history_with_gaps():
+    history = ranking_history.RankingHistory()
+    history.record("2024-06-03", week((*VITALITY, 1000), (*NAVI, 900)))
+    history.record("2024-06-10", week((*VITALITY, 1000), (*SPIRIT, 800)))
+    assert history.find("vitality").team_id == 9565
+    assert history.find("spirit").team_id == 7020
+    assert history.find("natus vincere") is None
+    assert history.team_history(7020) == [("2024-06-03", 0, 0), ("2024-06-10", 2, 800)]
+    assert history.team_history(1) == []
+
+
+def test_save_and_load_round_trip(tmp_path):
+    path = str(tmp_path / "ranking_history.json")
+    history = ranking_history.RankingHistory(path)
+    history.record("2024-06-03", week((*VITALITY, 1000), (*NAVI, 900)))
+    history.record("2024-06-10", week((*NAVI, 950), (*VITALITY, 940)))
+    history.save()
+
+    loaded = ranking_history.RankingHistory(path)
+    assert loaded.load() == 2
+    assert movements(loaded) == movements(history)
+    assert loaded.snapshots[-1][0].lineup == ((7998, "s1mple"),)
+
+
+def test_ranking_week_reads_header_date():
+    bs4 = pytest.importorskip("bs4")
+    page = bs4.BeautifulSoup(
+        '<div class="regional-ranking-header">CS2 World ranking on June 10th, 2024</div>', "html.parser")
+    assert ranking_history.ranking_week(page) == "2024-06-10"
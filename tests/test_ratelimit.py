@@ -0,0 +1,75 @@
+"""令牌桶限流：突发、按权重排队、受限退避和按截止时间放弃"""
+import time
+import asyncio
+
+import pytest
+
+from conftest import load_plugin_module
+
+ratelimit = load_plugin_module("ratelimit")
+
+
+def test_burst_is_free_then_requests_are_spaced():
+    async def run():
+        limiter = ratelimit.RateLimiter(rate=20, burst=2)
+        waits = [await limiter.acquire() for _ in range(3)]
+        return waits
+
+    waits = asyncio.run(run())
+    assert waits[0] < 0.01 and waits[1] < 0.01
+    assert 0.03 < waits[2] < 0.2
+
+
+def test_heavier_pages_take_more_tokens():
+    async def run():
+        limiter = ratelimit.RateLimiter(rate=20, burst=3)
+        await limiter.acquire("search")
+        return await limiter.acquire("search")
+
+    # 第一次搜索用掉 2 个令牌，第二次需要再补 1 个
+    assert 0.03 < asyncio.run(run()) < 0.2
+
+
+def test_throttled_response_backs_off_and_slows_down():
+    limiter = ratelimit.RateLimiter(rate=1, burst=3, base_backoff=5)
+    limiter.report(429)
+    assert limiter.throttled == 1
+    assert limiter.effective_rate == 0.5
+    limiter.report(403, retry_after="20")
+    assert limiter.effective_rate == 0.25
+    assert limiter._backoff_until - time.monotonic() > 15
+
+    for _ in range(10):
+        limiter.report(200)
+    assert limiter.effective_rate == 1
+
+
+def test_timeout_gives_up_immediately_during_backoff():
+    async def run():
+        limiter = ratelimit.RateLimiter(rate=10, burst=3, base_backoff=5)
+        limiter.report(429)
+        started = time.monotonic()
+        with pytest.raises(asyncio.TimeoutError):
+            await limiter.acquire(timeout=2)
+        return time.monotonic() - started, limiter.waiting
+
+    elapsed, waiting = asyncio.run(run())
+    assert elapsed < 0.1
+    assert waiting == 0
+
+
+def test_non_positive_timeout_fails_without_waiting():
+    async def run():
+        with pytest.raises(asyncio.TimeoutError):
+            await ratelimit.RateLimiter().acquire(timeout=0)
+
+    asyncio.run(run())
+
+
+def test_waits_within_timeout_succeed():
+    async def run():
+        limiter = ratelimit.RateLimiter(rate=20, burst=1)
+        await limiter.acquire()
+        return await limiter.acquire(timeout=1)
+
+    assert asyncio.run(run()) < 0.2
@@ -0,0 +1,122 @@
+"""重试策略、熔断器、截止时间和自适应超时"""
+import asyncio
+
+import pytest
+
+from conftest import load_plugin_module
+
+resilience = load_plugin_module("resilience")
+
+
+class Flaky:
+    """前 failures 次调用抛出 error，之后返回 "ok" """
+
+    def __init__(self, failures: int, error=None):
+        self.failures = failures
+        self.error = error or resilience.FetchError(503)
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise self.error
+        return "ok"
+
+
+def fast_policy(attempts=3):
+    return resilience.RetryPolicy(attempts=attempts, base_delay=0.001, max_delay=0.001)
+
+
+def test_retries_until_success():
+    func = Flaky(2)
+    retries = []
+    result = asyncio.run(fast_policy().run(func, on_retry=lambda attempt, e, delay: retries.append(attempt)))
+    assert result == "ok"
+    assert func.calls == 3
+    assert retries == [1, 2]
+
+
+def test_gives_up_after_last_attempt():
+    func = Flaky(5)
+    with pytest.raises(resilience.FetchError):
+        asyncio.run(fast_policy().run(func))
+    assert func.calls == 3
+
+
+def test_deterministic_client_errors_are_not_retried():
+    assert not resilience.is_retryable(resilience.FetchError(404))
+    assert resilience.is_retryable(resilience.FetchError(429))
+    assert resilience.is_retryable(resilience.FetchError(502))
+    assert resilience.is_retryable(TimeoutError())
+
+    breaker = resilience.CircuitBreaker("match", failure_threshold=1)
+    func = Flaky(1, resilience.FetchError(404))
+    with pytest.raises(resilience.FetchError):
+        asyncio.run(fast_policy().run(func, breaker=breaker))
+    assert func.calls == 1
+    assert breaker.state == breaker.CLOSED
+
+
+def test_no_retry_when_the_wait_would_pass_the_deadline():
+    policy = resilience.RetryPolicy(attempts=3, base_delay=5, max_delay=5)
+    policy.delay = lambda attempt: 5
+    func = Flaky(5)
+    with pytest.raises(resilience.FetchError):
+        asyncio.run(policy.run(func, deadline=resilience.Deadline(1)))
+    assert func.calls == 1
+
+
+def test_breaker_opens_fails_fast_and_recovers_through_one_probe():
+    breaker = resilience.CircuitBreaker("results", failure_threshold=2, recovery_timeout=60)
+    breaker.record_failure()
+    assert breaker.state == breaker.CLOSED
+    breaker.record_failure()
+    assert breaker.state == breaker.OPEN and breaker.trips == 1
+    assert breaker.is_open() and not breaker.allow()
+
+    with pytest.raises(resilience.CircuitOpenError):
+        asyncio.run(fast_policy().run(Flaky(0), breaker=breaker))
+
+    breaker.opened_at -= 61
+    assert breaker.allow()
+    assert breaker.state == breaker.HALF_OPEN
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == breaker.CLOSED and breaker.allow()
+
+
+def test_failed_probe_reopens_and_cancelled_probe_is_released():
+    breaker = resilience.CircuitBreaker("team", failure_threshold=3, recovery_timeout=60)
+    breaker.state, breaker.opened_at = breaker.OPEN, 0.0
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == breaker.OPEN and breaker.retry_in() > 59
+
+    breaker.opened_at -= 61
+    assert breaker.allow()
+    breaker.release_probe()
+    assert breaker.allow()
+
+
+def test_deadline_clamps_steps_and_expires():
+    deadline = resilience.Deadline(10)
+    assert deadline.clamp_ms(60000) <= 10000
+    assert deadline.clamp_ms(500) == 500
+    expired = resilience.Deadline(0)
+    assert expired.expired
+    with pytest.raises(resilience.DeadlineExceeded):
+        expired.clamp_ms(1000, "截图")
+
+
+def test_adaptive_timeouts_follow_observed_latency():
+    timeouts = resilience.AdaptiveTimeouts(factor=3, floor=5, ceiling=60, min_samples=5)
+    assert timeouts.timeout("match") == 60
+    for _ in range(5):
+        timeouts.observe("match", 4.0)
+    assert timeouts.timeout("match") == pytest.approx(12.0)
+    for _ in range(5):
+        timeouts.observe("results", 0.1)
+    assert timeouts.timeout("results") == 5
+    timeouts.observe("slow", 100)
+    assert timeouts.timeout_ms("match", resilience.Deadline(2)) <= 2000
+    assert timeouts.snapshot()["results"] == 5
@@ -0,0 +1,82 @@
+"""赛程索引：按时间范围、按战队查询和 /matches/ 页面解析"""
+from datetime import timezone
+
+import pytest
+
+from conftest import load_plugin_module
+
+schedule = load_plugin_module("schedule")
+
+
+def scheduled(match_id, timestamp, team1, team2):
+    return schedule.ScheduledMatch(match_id, timestamp, team1, team2, "Major", f"/matches/{match_id}/x")
+
+
+MATCHES = [
+    scheduled(3, 300, "FaZe", "NAVI"),
+    scheduled(1, 100, "Vitality", "NAVI"),
+    scheduled(2, 200, "Vitality", "G2"),
+    scheduled(4, 300, "Team Spirit", "MOUZ"),
+]
+
+
+def ids(matches):
+    return [match.match_id for match in matches]
+
+
+def test_queries_are_ordered_by_start_time():
+    store = schedule.ScheduleStore()
+    store.load(MATCHES)
+    assert ids(store.between(100, 300)) == [1, 2]
+    assert ids(store.between(300, float("inf"))) == [3, 4]
+    assert ids(store.upcoming(150, 2)) == [2, 3]
+    assert ids(store.for_team("navi", 0)) == [1, 3]
+    assert ids(store.for_team("vitality", 150)) == [2]
+    assert store.for_team("unknown", 0) == []
+
+
+def test_resolve_team_prefers_exact_then_unique_substring():
+    store = schedule.ScheduleStore()
+    store.load(MATCHES)
+    assert store.resolve_team("NAVI") == "navi"
+    assert store.resolve_team("spirit") == "teamspirit"
+    assert store.resolve_team("a") is None
+    assert store.matches[0].opponent_of("vitality") == "NAVI"
+
+
+def test_same_list_is_not_reindexed():
+    store = schedule.ScheduleStore()
+    store.load(MATCHES)
+    indexed = store.by_team
+    store.load(MATCHES)
+    assert store.by_team is indexed
+    store.load(MATCHES[:1])
+    assert ids(store.matches) == [3]
+
+
+def test_parse_schedule_reads_unix_time_and_skips_tba():
+    bs4 = pytest.importorskip("bs4")
+    html = """
+    <div class="upcomingMatchesSection">
+      <div class="matchDayHeadline">Saturday - 2024-06-01</div>
+      <div class="upcomingMatch" data-zonedgrouping-entry-unix="1717250400000">
+        <a href="/matches/2372001/vitality-vs-navi"></a>
+        <div class="matchTeam">Vitality</div><div class="matchTeam">NAVI</div>
+        <div class="matchEvent">PGL Major</div>
+      </div>
+      <div class="upcomingMatch">
+        <a href="/matches/2372002/faze-vs-g2"></a>
+        <div class="matchTime">18:30</div>
+        <div class="matchTeam">FaZe</div><div class="matchTeam">G2</div>
+      </div>
+      <div class="upcomingMatch">
+        <div class="matchTeam">TBD</div>
+      </div>
+    </div>
+    """
+    matches = schedule.parse_schedule(bs4.BeautifulSoup(html, "html.parser"), timezone.utc)
+    assert ids(matches) == [2372001, 2372002]
+    assert matches[0].timestamp == 1717250400
+    assert matches[0].event == "PGL Major"
+    assert matches[1].timestamp == 1717266600
+    assert matches[1].event == "Unknown Event"
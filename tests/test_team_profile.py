@@ -0,0 +1,51 @@
+"""get_team_profile 并发调用共享同一次抓取的回归测试
+
+需要 AstrBot 环境（main.py 依赖 astrbot.api），在没有安装 AstrBot 的环境中跳过。
+"""
+import asyncio
+import logging
+
+import pytest
+
+from conftest import load_plugin_module
+
+pytest.importorskip("astrbot")
+
+
+def make_plugin(fetch_team_profile):
+    main = load_plugin_module("main")
+    plugin = main.HLTVQuery.__new__(main.HLTVQuery)
+    plugin.config = {}
+    plugin.logger = logging.getLogger("test_team_profile")
+    plugin.page_cache = load_plugin_module("page_cache").PageCache()
+    plugin._refresh_tasks = {}
+    plugin.fetch_team_profile = fetch_team_profile
+    return plugin
+
+
+def test_concurrent_calls_share_one_fetch():
+    calls = []
+
+    async def fetch_team_profile(team):
+        calls.append(team.id)
+        await asyncio.sleep(0.01)
+        return {"name": team.name, "text": "profile", "card": None, "fingerprint": "abc"}
+
+    async def run():
+        plugin = make_plugin(fetch_team_profile)
+        team = load_plugin_module("records").TeamRecord(4608, "Natus Vincere", "natus-vincere")
+        results = await asyncio.gather(*(plugin.get_team_profile(team) for _ in range(3)), return_exceptions=True)
+        return plugin, results
+
+    plugin, results = asyncio.run(run())
+
+    assert calls == [4608]
+    for result in results:
+        assert not isinstance(result, BaseException), result
+        profile, stale_at = result
+        assert stale_at is None
+        assert profile["text"] == "profile"
+        assert "fingerprint" not in profile
+    entry = plugin.page_cache.get("team:4608")
+    assert entry.fingerprint == "abc"
+    assert entry.value is results[0][0]
@@ -0,0 +1,492 @@
+"""浏览器工作进程池
+
+browser_workers 大于 0 时，页面加载和截图不再占用 AstrBot 主进程，而是交给 N 个独立的
+Python 进程，每个进程各自运行一个 BrowserManager（一个 Chromium），可以利用多个 CPU 核心。
+
+主进程通过子进程的标准输入/输出通信，每条消息是 4 字节长度前缀加 pickle 数据，
+内容只包含基本类型（字典、字符串、bytes），不传递插件内的类：
+
+    主进程 -> 工作进程: ("job", 任务ID, 任务类型, 参数) / ("cancel", 任务ID) / ("stop",)
+    工作进程 -> 主进程: ("part", 任务ID, 片段) / ("done", 任务ID) / ("error", 任务ID, 错误信息)
+                        ("heartbeat", 状态字典)  # 内存、浏览器回收次数等
+
+任务是异步生成器，每产出一个片段（页面内容、一张截图）就立即发回主进程，
+主进程可以边收边发，不必等整个任务结束。工作进程定期发送心跳，
+主进程的监控任务发现进程退出或心跳超时后会结束它并重新启动，进行中的任务以 WorkerError 失败。
+
+限流、重试和熔断仍然在主进程中完成，工作进程每个任务只访问一次页面。
+"""
+import os
+import sys
+import json
+import time
+import zlib
+import pickle
+import struct
+import asyncio
+import logging
+import itertools
+
+if __name__ == "__main__" and not __package__:
+    # 作为文件直接启动：插件目录名不一定是合法的包名（如 astrbot_plugin_hltv-main），
+    # 把插件目录注册为一个内部包，下面的相对导入才能找到同目录的模块
+    import types
+    __package__ = "_hltv_worker"
+    _package = types.ModuleType(__package__)
+    _package.__path__ = [os.path.dirname(os.path.abspath(__file__))]
+    sys.modules[__package__] = _package
+
+from .log import setup_logging
+from .browser import BrowserManager
+from .procfs import process_rss
+from .resilience import Deadline, DeadlineExceeded
+from .capture import (
+    FETCH_CONTEXT, CAPTURE_CONTEXT, REMOVE_BANNERS_SCRIPT,
+    open_page, close_page, prepare_capture, find_section,
+)
+
+logger = logging.getLogger(__name__)
+
+PLUGIN_DIR = os.path.dirname(os.path.abspath(__file__))
+
+_HEADER = struct.Struct("!I")
+
+
+class WorkerError(Exception):
+    """工作进程中的任务失败，或工作进程在任务完成前退出"""
+
+
+def encode_frame(message) -> bytes:
+    body = pickle.dumps(message, protocol=pickle.HIGHEST_PROTOCOL)
+    return _HEADER.pack(len(body)) + body
+
+
+async def read_frame(reader):
+    header = await reader.readexactly(_HEADER.size)
+    (size,) = _HEADER.unpack(header)
+    return pickle.loads(await reader.readexactly(size))
+
+
+# ---------- 主进程 ----------
+
+class WorkerProcess:
+    """主进程中对一个工作进程的记录"""
+
+    def __init__(self, index: int):
+        self.index = index
+        self.process = None
+        self.reader_task = None
+        self.pending = {}        # 任务ID -> 接收片段的队列
+        self.last_seen = 0.0     # 最后一次收到消息的时间
+        self.state = {}          # 最近一次心跳上报的状态
+        self.jobs = 0
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.returncode is None
+
+
+class WorkerPool:
+    """管理 size 个浏览器工作进程，把任务分配给进行中任务最少的进程"""
+
+    def __init__(self, size: int, max_pages: int = 2, storage_path: str = None,
+                 storage_max_age: float = 6 * 3600, log_level: str = "INFO", metrics=None,
+                 heartbeat_interval: float = 5.0, heartbeat_timeout: float = 30.0, job_timeout: float = 120.0,
+                 recycle: dict = None):
+        self.size = max(1, size)
+        self.max_pages = max(1, max_pages)
+        self.metrics = metrics
+        self.heartbeat_interval = heartbeat_interval
+        self.heartbeat_timeout = max(heartbeat_timeout, heartbeat_interval * 2)
+        self.job_timeout = job_timeout
+        self.options = {
+            "max_pages": self.max_pages,
+            "storage_path": storage_path,
+            "storage_max_age": storage_max_age,
+            "log_level": log_level,
+            "heartbeat_interval": heartbeat_interval,
+            "recycle": recycle or {},  # 各工作进程中 BrowserManager 的回收参数
+        }
+        self.workers = [WorkerProcess(index) for index in range(self.size)]
+        self.restarts = 0
+        self._ids = itertools.count(1)
+        self._slots = asyncio.Semaphore(self.size * self.max_pages)
+        self._start_lock = asyncio.Lock()
+        self._monitor_task = None
+        self._closed = False
+
+    @property
+    def alive(self) -> int:
+        return sum(1 for worker in self.workers if worker.alive)
+
+    @property
+    def in_flight(self) -> int:
+        return sum(len(worker.pending) for worker in self.workers)
+
+    async def start(self):
+        """启动所有工作进程和监控任务（已启动时直接返回）"""
+        if self._monitor_task is not None or self._closed:
+            return
+        async with self._start_lock:
+            if self._monitor_task is not None:
+                return
+            await asyncio.gather(*(self._spawn(worker) for worker in self.workers))
+            self._monitor_task = asyncio.get_running_loop().create_task(self._monitor())
+
+    async def _spawn(self, worker: WorkerProcess):
+        # 直接运行 workers.py，不依赖插件目录名能否作为包名导入；
+        # 工作进程只导入浏览器相关的模块，不导入 AstrBot
+        try:
+            process = await asyncio.create_subprocess_exec(
+                sys.executable, os.path.join(PLUGIN_DIR, "workers.py"), json.dumps(self.options),
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                cwd=PLUGIN_DIR,
+            )
+        except Exception as e:
+            logger.error("启动浏览器工作进程 #%d 失败: %s", worker.index, e)
+            worker.process = None
+            return
+        worker.process = process
+        worker.last_seen = time.monotonic()
+        worker.state = {}
+        worker.reader_task = asyncio.get_running_loop().create_task(self._read_loop(worker, process))
+        logger.info("浏览器工作进程 #%d 已启动 (pid %s)", worker.index, process.pid)
+
+    async def _read_loop(self, worker: WorkerProcess, process):
+        try:
+            while True:
+                message = await read_frame(process.stdout)
+                worker.last_seen = time.monotonic()
+                kind = message[0]
+                if kind == "heartbeat":
+                    worker.state = message[1]
+                    continue
+                queue = worker.pending.get(message[1])
+                if queue is None:
+                    continue  # 已经放弃的任务
+                if kind == "part":
+                    queue.put_nowait(("part", message[2]))
+                elif kind == "done":
+                    queue.put_nowait(("done", None))
+                elif kind == "error":
+                    queue.put_nowait(("error", message[2]))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # 数据流已经错位，这个进程不能再用了
+            logger.error("读取浏览器工作进程 #%d 的消息失败: %s", worker.index, e)
+            if process.returncode is None:
+                process.kill()
+        finally:
+            self._fail_pending(worker, "浏览器工作进程已退出")
+
+    def _fail_pending(self, worker: WorkerProcess, reason: str):
+        for queue in worker.pending.values():
+            queue.put_nowait(("error", reason))
+        worker.pending.clear()
+
+    async def _monitor(self):
+        """定期检查工作进程，退出或心跳超时的进程被结束并重新启动"""
+        while not self._closed:
+            await asyncio.sleep(self.heartbeat_interval)
+            now = time.monotonic()
+            for worker in self.workers:
+                if self._closed:
+                    return
+                if worker.alive and now - worker.last_seen <= self.heartbeat_timeout:
+                    continue
+                if worker.alive:
+                    reason = f"{now - worker.last_seen:.0f} 秒没有心跳"
+                elif worker.process is not None:
+                    reason = f"已退出 (返回码 {worker.process.returncode})"
+                else:
+                    reason = "未运行"
+                logger.warning("浏览器工作进程 #%d %s，正在重启", worker.index, reason)
+                try:
+                    await self._restart(worker)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error("重启浏览器工作进程 #%d 失败: %s", worker.index, e)
+
+    async def _restart(self, worker: WorkerProcess):
+        await self._stop_worker(worker, graceful=False)
+        self.restarts += 1
+        if self.metrics:
+            self.metrics.inc("worker.restarts", worker=worker.index)
+        await self._spawn(worker)
+
+    async def _stop_worker(self, worker: WorkerProcess, graceful: bool = True):
+        process = worker.process
+        if process is not None and process.returncode is None:
+            if graceful:
+                try:
+                    process.stdin.write(encode_frame(("stop",)))
+                    process.stdin.close()
+                    await asyncio.wait_for(process.wait(), 10)
+                except Exception:
+                    pass
+            if process.returncode is None:
+                process.kill()
+                try:
+                    await asyncio.wait_for(process.wait(), 5)
+                except asyncio.TimeoutError:
+                    logger.error("浏览器工作进程 #%d (pid %s) 无法结束", worker.index, process.pid)
+        if worker.reader_task is not None:
+            worker.reader_task.cancel()
+            # 等旧的读取任务结束，避免它清理到新进程的任务
+            await asyncio.gather(worker.reader_task, return_exceptions=True)
+            worker.reader_task = None
+        self._fail_pending(worker, "浏览器工作进程已被结束")
+
+    def _pick(self):
+        candidates = [worker for worker in self.workers if worker.alive]
+        return min(candidates, key=lambda worker: len(worker.pending)) if candidates else None
+
+    def _send(self, worker: WorkerProcess, message):
+        try:
+            worker.process.stdin.write(encode_frame(message))
+        except (ConnectionError, RuntimeError, AttributeError) as e:
+            raise WorkerError(f"浏览器工作进程 #{worker.index} 不可用: {e}") from e
+
+    async def run(self, job: str, payload: dict, timeout: float = None):
+        """提交任务，逐个产出工作进程发回的片段；任务失败或超时抛出 WorkerError
+
+        job_timeout（或更短的 timeout）限制的是两个片段之间的间隔，长任务只要持续有进展就不会超时。
+        调用方提前结束迭代时，工作进程中的任务会被取消。
+        """
+        gap = min(self.job_timeout, timeout) if timeout else self.job_timeout
+        await self.start()
+        async with self._slots:
+            worker = self._pick()
+            if worker is None:
+                raise WorkerError("没有可用的浏览器工作进程")
+            job_id = next(self._ids)
+            queue = asyncio.Queue()
+            worker.pending[job_id] = queue
+            worker.jobs += 1
+            finished = False
+            try:
+                self._send(worker, ("job", job_id, job, payload))
+                try:
+                    await worker.process.stdin.drain()
+                except ConnectionError as e:
+                    raise WorkerError(f"浏览器工作进程 #{worker.index} 不可用: {e}") from e
+                while True:
+                    try:
+                        kind, value = await asyncio.wait_for(queue.get(), gap)
+                    except asyncio.TimeoutError:
+                        raise WorkerError(f"{job} 任务超过 {gap:.0f} 秒没有进展") from None
+                    if kind == "part":
+                        yield value
+                        continue
+                    finished = True
+                    if kind == "error":
+                        raise WorkerError(value)
+                    return
+            finally:
+                worker.pending.pop(job_id, None)
+                if not finished and worker.alive:
+                    try:
+                        self._send(worker, ("cancel", job_id))
+                    except WorkerError:
+                        pass
+
+    def snapshot(self) -> dict:
+        """各工作进程的状态，供 /hltv_stats 和指标使用"""
+        return {
+            worker.index: {
+                "pid": worker.process.pid if worker.process else None,
+                "alive": worker.alive,
+                "pending": len(worker.pending),
+                "jobs": worker.jobs,
+                "rss": worker.state.get("rss"),
+                "browser_rss": worker.state.get("browser_rss"),
+                "recycles": worker.state.get("recycles", {}),
+            }
+            for worker in self.workers
+        }
+
+    async def close(self):
+        self._closed = True
+        if self._monitor_task is not None:
+            self._monitor_task.cancel()
+            self._monitor_task = None
+        await asyncio.gather(*(self._stop_worker(worker) for worker in self.workers), return_exceptions=True)
+        logger.info("浏览器工作进程已全部关闭")
+
+
+# ---------- 工作进程 ----------
+
+def _response_meta(response):
+    if response is None:
+        return None, {}
+    return response.status, dict(response.headers)
+
+
+def _job_limits(payload: dict):
+    """任务的单步超时(毫秒)和总截止时间，由主进程按页面类型的加载耗时算好传来"""
+    return payload.get("timeout", 60000), Deadline(payload.get("deadline", 90))
+
+
+async def fetch_job(manager, payload: dict):
+    """只取页面 HTML（列表页），产出一个 {"status", "headers", "html", "elapsed"} 片段"""
+    step, deadline = _job_limits(payload)
+    async with manager.acquire() as browser:
+        context, page = await open_page(manager, browser, FETCH_CONTEXT, timeout=deadline.clamp_ms(step))
+        try:
+            started = time.monotonic()
+            response = await page.goto(payload["url"], wait_until="networkidle", timeout=deadline.clamp_ms(step, "goto"))
+            elapsed = time.monotonic() - started
+            status, headers = _response_meta(response)
+            if status is None or status >= 400:
+                if status == 403:
+                    manager.discard_storage()
+                yield {"status": status, "headers": headers}
+                return
+            await manager.save_storage(page.context)
+            await page.wait_for_load_state("domcontentloaded", timeout=deadline.clamp_ms(step, "domcontentloaded"))
+            await asyncio.sleep(min(2, deadline.remaining()))
+            await page.evaluate(REMOVE_BANNERS_SCRIPT)
+            html = await page.content()
+            yield {"status": status, "headers": headers, "elapsed": elapsed,
+                   "html": zlib.compress(html.encode("utf-8"), 1)}
+        finally:
+            await close_page(context, page)
+
+
+async def capture_job(manager, payload: dict):
+    """打开详情页，先产出页面内容，再逐个产出截图 {"suffix", "png"} 或找不到的区域 {"missing"}"""
+    step, deadline = _job_limits(payload)
+    async with manager.acquire() as browser:
+        context, page = await open_page(manager, browser, CAPTURE_CONTEXT, timeout=deadline.clamp_ms(step))
+        try:
+            started = time.monotonic()
+            response = await page.goto(
+                payload["url"], wait_until="domcontentloaded", timeout=deadline.clamp_ms(step, "goto")
+            )
+            status, headers = _response_meta(response)
+            if status is None or status >= 400:
+                if status == 403:
+                    manager.discard_storage()
+                yield {"status": status, "headers": headers}
+                return
+            await page.wait_for_load_state("networkidle", timeout=deadline.clamp_ms(step, "networkidle"))
+            elapsed = time.monotonic() - started
+            await manager.save_storage(page.context)
+            await prepare_capture(page, min(payload.get("settle", 0), deadline.remaining()))
+            html = await page.content()
+            yield {"status": status, "headers": headers, "elapsed": elapsed,
+                   "html": zlib.compress(html.encode("utf-8"), 1)}
+
+            for suffix, selector, wait in payload.get("sections", ()):
+                element = await find_section(page, selector, wait, timeout=deadline.clamp_ms(step, selector))
+                if not element:
+                    yield {"missing": selector}
+                    continue
+                try:
+                    png = await element.screenshot(timeout=deadline.clamp_ms(step, selector))
+                except DeadlineExceeded:
+                    raise
+                except Exception as e:
+                    logger.warning("截取元素 %s 失败: %s", selector, e)
+                    continue
+                yield {"suffix": suffix, "png": png}
+        finally:
+            await close_page(context, page)
+
+
+JOBS = {
+    "fetch": fetch_job,
+    "capture": capture_job,
+}
+
+
+async def serve(options: dict):
+    """工作进程主循环：从标准输入读任务，结果写到标准输出"""
+    setup_logging(options.get("log_level", "INFO"))
+    manager = BrowserManager(
+        max_pages=options.get("max_pages", 2),
+        storage_path=options.get("storage_path"),
+        storage_max_age=options.get("storage_max_age", 6 * 3600),
+        **options.get("recycle", {}),
+    )
+    loop = asyncio.get_running_loop()
+
+    # 标准输出专用于消息，其他输出（print、第三方库）都转到标准错误
+    out = os.fdopen(os.dup(sys.stdout.fileno()), "wb", buffering=0)
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+
+    reader = asyncio.StreamReader()
+    await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin.buffer)
+    transport, protocol = await loop.connect_write_pipe(asyncio.streams.FlowControlMixin, out)
+    writer = asyncio.StreamWriter(transport, protocol, None, loop)
+    tasks = {}
+
+    async def send(message):
+        writer.write(encode_frame(message))
+        await writer.drain()
+
+    async def run_job(job_id, job, payload):
+        try:
+            handler = JOBS.get(job)
+            if handler is None:
+                raise ValueError(f"未知的任务类型: {job}")
+            parts = handler(manager, payload)
+            try:
+                async for part in parts:
+                    await send(("part", job_id, part))
+            finally:
+                await parts.aclose()
+            await send(("done", job_id))
+        except asyncio.CancelledError:
+            pass  # 主进程已经放弃这个任务
+        except Exception as e:
+            logger.debug("任务 %s 失败", job, exc_info=True)
+            await send(("error", job_id, f"{type(e).__name__}: {e}"))
+        finally:
+            tasks.pop(job_id, None)
+
+    async def heartbeat():
+        interval = options.get("heartbeat_interval", 5.0)
+        while True:
+            await send(("heartbeat", dict(manager.stats(), rss=process_rss(), jobs=len(tasks))))
+            await asyncio.sleep(interval)
+
+    heartbeat_task = loop.create_task(heartbeat())
+    try:
+        while True:
+            try:
+                message = await read_frame(reader)
+            except asyncio.IncompleteReadError:
+                break  # 主进程关闭了管道
+            if message[0] == "job":
+                _, job_id, job, payload = message
+                tasks[job_id] = loop.create_task(run_job(job_id, job, payload))
+            elif message[0] == "cancel":
+                task = tasks.get(message[1])
+                if task:
+                    task.cancel()
+            elif message[0] == "stop":
+                break
+    finally:
+        heartbeat_task.cancel()
+        for task in list(tasks.values()):
+            task.cancel()
+        await asyncio.gather(*list(tasks.values()), return_exceptions=True)
+        await manager.close()
+
+
+def main():
+    options = json.loads(sys.argv[1]) if len(sys.argv) > 1 else {}
+    try:
+        asyncio.run(serve(options))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()